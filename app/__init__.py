@@ -1,6 +1,6 @@
 from flask import Flask, jsonify
 from .config import Config
-from .extensions import db, cors
+from .extensions import db, cors, migrate
 from .utils.validator import Auth0JWTBearerTokenValidator
 from authlib.integrations.flask_oauth2 import ResourceProtector
 import os
@@ -19,12 +19,13 @@ def create_app():
     app.url_map.strict_slashes = False
 
     db.init_app(app)
+    migrate.init_app(app, db)
         
     cors.init_app(
         app, 
         resources={
             r"/api/*": {
-                "origins": ["http://localhost:3000", "http://127.0.0.1:3000", "https://sophsdatabasedomain.duckdns.org", "https://sophsmenu.com", "https://d1jra9qawas673.cloudfront.net", ", https://www.sophsmenu.com"],
+                "origins": Config.CORS_ORIGINS,
                 "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
                 "allow_headers": ["Content-Type", "x-api-key", "Authorization"]
             }},
@@ -34,14 +35,51 @@ def create_app():
     # Import models so SQLAlchemy knows them
     from . import models
 
+    from .utils.events import broker
+    broker.init_app(app)
+
+    from .utils.background import background
+    background.init_app(app)
+
+    from .utils.write_buffer import write_buffer
+    write_buffer.init_app(app)
+
+    from .utils.rate_limit import limiter
+    limiter.init_app(app)
+
+    from .utils.rest_type_registry import rest_type_registry
+    rest_type_registry.init_app(app)
+
+    from .utils.autocomplete import autocomplete
+    autocomplete.init_app(app)
+
+    from .utils.compression import compressor
+    compressor.init_app(app)
+
+    from .utils.snapshots import snapshots
+    snapshots.init_app(app)
+
+    from .utils.statement_cache import statement_cache
+    statement_cache.init_app(app)
+
     # Register blueprints
     from .routes.recipes import bp as recipes_bp
     from .routes.restaurant_types import bp as restaurant_types_bp
     from .routes.reviews import bp as reviews_bp
+    from .routes.profile import bp as profile_bp
+    from .routes.sync import bp as sync_bp
+    from .routes.events import bp as events_bp
+    from .routes.metrics import bp as metrics_bp
+    from .routes.catalog import bp as catalog_bp
 
     app.register_blueprint(recipes_bp, url_prefix="/api/recipes")
     app.register_blueprint(restaurant_types_bp, url_prefix="/api/restaurant-types")
     app.register_blueprint(reviews_bp, url_prefix="/api/reviews")
+    app.register_blueprint(profile_bp, url_prefix="/api/profile")
+    app.register_blueprint(sync_bp, url_prefix="/api/sync")
+    app.register_blueprint(events_bp, url_prefix="/api/events")
+    app.register_blueprint(metrics_bp, url_prefix="/api/metrics")
+    app.register_blueprint(catalog_bp, url_prefix="/api/catalog")
 
     @app.get("/api/health")
     def health():
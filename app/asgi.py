@@ -0,0 +1,300 @@
+# app/asgi.py
+# Async serving mode for the public read endpoints:
+#
+#     uvicorn app.asgi:app --host 127.0.0.1 --port 5001 --workers 2
+#
+# Serves the same GETs as get_all_recipes, get_recipe, get_all_reviews, get_review and
+# get_restaurant_types, running the statements from app/queries on SQLAlchemy's asyncio engine
+# (asyncpg), so one process keeps many queries in flight instead of one per sync worker.
+# Responses are byte-for-byte what the Flask handlers return, compressed the same way
+# (see scripts/asgi_parity.py).
+# Everything else, writes included, stays on gunicorn; nginx decides which process gets a request.
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+from urllib.parse import parse_qs
+
+from authlib.oauth2 import OAuth2Error
+from authlib.oauth2.rfc6749.requests import JsonRequest
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import Headers, MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from . import create_app, require_auth
+from .config import Config
+from .queries.fields import fields_error, parse_fields
+from .queries.recipes import (
+    RECIPE_CARD_FIELDS,
+    RECIPE_DETAIL_FIELDS,
+    RECIPE_INCLUDES,
+    assemble_recipes,
+    parse_include,
+    recipe_card,
+    recipe_cards_stmt,
+    recipe_detail_stmts,
+)
+from .queries.reviews import REVIEW_FIELDS, review_row, review_rows_stmt
+from .utils.background import background
+from .utils.compression import compressor, negotiate
+from .utils.responses import JSON_MIMETYPE, negotiate_mimetype, packb
+from .utils.rest_type_registry import rest_type_registry
+
+# The Flask app is only used for config and an app context for the registry's blocking reload
+flask_app = create_app()
+
+_engine = None
+
+def _get_engine():
+    global _engine
+    if _engine is None:
+        _engine = create_async_engine(
+            Config.ASYNC_DATABASE_URI,
+            pool_size=Config.ASYNC_DB_POOL_SIZE,
+            max_overflow=Config.ASYNC_DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            query_cache_size=Config.DB_QUERY_CACHE_SIZE,
+        )
+    return _engine
+
+class Request:
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = Headers([(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]])
+        self.query_string = scope.get("query_string", b"").decode("latin-1")
+        self.args = parse_qs(self.query_string, keep_blank_values=True)
+
+    def arg(self, name: str):
+        # First value, as Flask's request.args.get() returns
+        values = self.args.get(name)
+        return values[0] if values else None
+
+    @property
+    def uri(self) -> str:
+        return self.path + ("?" + self.query_string if self.query_string else "")
+
+###########
+# HELPERS
+###########
+
+def _jsonify(obj, status: int = 200):
+    # Same encoding as Flask's jsonify outside debug mode
+    body = json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(",", ":")) + "\n"
+    return status, body.encode("utf-8"), [("Content-Type", "application/json")]
+
+def _bad_request(msg: str, status: int = 400):
+    return _jsonify({"message": msg}, status)
+
+def _respond(request: Request, obj):
+    # Same as app.utils.responses.respond(): MessagePack when the client asks for it
+    mimetype = negotiate_mimetype(parse_accept_header(request.headers.get("Accept"), MIMEAccept))
+    if mimetype == JSON_MIMETYPE:
+        status, body, headers = _jsonify(obj)
+    else:
+        status, body, headers = 200, packb(obj), [("Content-Type", mimetype)]
+    return status, body, [*headers, ("Vary", "Accept")]
+
+async def _authorize(request: Request):
+    """
+    Validate the bearer token the way @require_auth(None) does.
+    Returns an error response, or None when the token is good.
+    """
+    auth_request = JsonRequest(request.method, request.uri, request.headers)
+    try:
+        # May fetch the Auth0 key set, so keep it off the event loop
+        await asyncio.to_thread(require_auth.validate_request, None, auth_request)
+    except OAuth2Error as error:
+        body = json.dumps(dict(error.get_body())).encode("utf-8")
+        # get_headers() already carries the JSON Content-Type
+        return error.status_code, body, error.get_headers()
+    return None
+
+def _restaurant_type_names():
+    with flask_app.app_context():
+        return rest_type_registry.names()
+
+###########################
+# GET ENDPOINTS
+###########################
+
+async def get_all_recipes(request: Request):
+    fields = parse_fields(request.arg("fields"), RECIPE_CARD_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(RECIPE_CARD_FIELDS))
+
+    try:
+        async with _get_engine().connect() as conn:
+            rows = [recipe_card(r, fields) for r in await conn.execute(recipe_cards_stmt(fields))]
+
+        return _respond(request, {"body": {"rows": rows}})
+    except Exception as e:
+        return _jsonify({"message": f"There was an error and we could not complete your get all recipes request. Error: {e}"}, 500)
+
+async def get_recipe(request: Request, recipe_id: int):
+    if recipe_id <= 0:
+        return _bad_request("Invalid recipe ID")
+
+    include = parse_include(request.arg("include"))
+    if include is None:
+        return _bad_request(f"include must be a comma separated list of: {', '.join(RECIPE_INCLUDES)}")
+
+    fields = parse_fields(request.arg("fields"), RECIPE_DETAIL_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(RECIPE_DETAIL_FIELDS))
+
+    try:
+        stmts = recipe_detail_stmts(include, fields)
+        params = {"ids": [recipe_id]}
+        async with _get_engine().connect() as conn:
+            rows = {"recipes": (await conn.execute(stmts.pop("recipes"), params)).all()}
+            if rows["recipes"]:
+                for name, stmt in stmts.items():
+                    rows[name] = (await conn.execute(stmt, params)).all()
+        recipes = assemble_recipes(rows, fields)
+        if recipe_id not in recipes:
+            return _respond(request, {"body": []})
+
+        return _respond(request, {"body": [recipes[recipe_id]]})
+
+    except Exception as e:
+        return _jsonify({"message": f"There was an error while fetching the recipe and we could not complete your request. Error: {e}"}, 500)
+
+async def get_all_reviews(request: Request):
+    fields = parse_fields(request.arg("fields"), REVIEW_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(REVIEW_FIELDS))
+
+    try:
+        async with _get_engine().connect() as conn:
+            out_rows = [review_row(r, fields) for r in await conn.execute(review_rows_stmt(fields))]
+
+        return _respond(request, {"body": {"rows": out_rows}})
+
+    except Exception as e:
+        return _jsonify({
+            "message": "There was an error and we could not complete your get all reviews request. Error: " + str(e)
+        }, 500)
+
+async def get_review(request: Request, review_id: int):
+    if review_id <= 0:
+        return _bad_request("Invalid review ID")
+
+    fields = parse_fields(request.arg("fields"), REVIEW_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(REVIEW_FIELDS))
+
+    try:
+        async with _get_engine().connect() as conn:
+            out = [review_row(r, fields) for r in await conn.execute(review_rows_stmt(fields, by_ids=True), {"ids": [review_id]})]
+
+        return _respond(request, {"body": out})
+
+    except Exception as e:
+        return _jsonify({
+            "message": "There was an error while fetching the review and we could not complete your request. Error: " + str(e)
+        }, 500)
+
+async def get_restaurant_types(request: Request):
+    denied = await _authorize(request)
+    if denied is not None:
+        return denied
+
+    try:
+        # Served from memory; a cold or stale registry reloads on a thread with the sync engine
+        restaurant_types = rest_type_registry.cached_names()
+        if restaurant_types is None:
+            restaurant_types = await asyncio.to_thread(_restaurant_type_names)
+        return _jsonify({"body": restaurant_types}, 200)
+
+    except Exception as e:
+        return _jsonify({
+            "message": "There was an error while fetching restaurant types and we could not complete your request. Error: " + str(e)
+        }, 500)
+
+# Trailing slashes are optional, as with the app's strict_slashes = False
+ROUTES = [
+    (re.compile(r"^/api/recipes/?$"), get_all_recipes),
+    (re.compile(r"^/api/recipes/(\d+)/?$"), get_recipe),
+    (re.compile(r"^/api/reviews/?$"), get_all_reviews),
+    (re.compile(r"^/api/reviews/(\d+)/?$"), get_review),
+    (re.compile(r"^/api/restaurant-types/?$"), get_restaurant_types),
+]
+
+###########################
+# ASGI APP
+###########################
+
+def _cors_headers(request: Request):
+    # Mirrors flask_cors for simple requests: echo an allowed Origin back with credentials
+    # (and, like flask_cors, add nothing at all for an origin that isn't allowed)
+    origin = request.headers.get("Origin")
+    if origin is None:
+        return [("Vary", "Origin")]
+    if origin in Config.CORS_ORIGINS:
+        return [("Access-Control-Allow-Origin", origin), ("Access-Control-Allow-Credentials", "true"), ("Vary", "Origin")]
+    return []
+
+def _compress(request: Request, status: int, body: bytes, headers: list):
+    """
+    Same negotiation as compressor's after_request hook. Every GET here depends only on
+    the URL, so all of them share the compressed-body cache.
+    Returns the body and headers to send.
+    """
+    content_type = dict(headers).get("Content-Type")
+    if status != 200 or not compressor.enabled or not compressor.should_compress(content_type, len(body)):
+        return body, headers
+    # Joins a Vary the handler set, as response.vary.add() does
+    vary = [v for k, v in headers if k == "Vary"]
+    headers = [(k, v) for k, v in headers if k != "Vary"]
+    headers.append(("Vary", ", ".join([*vary, "Accept-Encoding"])))
+    encoding = negotiate(request.headers.get("Accept-Encoding"), compressor.encoders)
+    if encoding is None:
+        return body, headers
+    return compressor.compress(body, encoding, request.uri), [*headers, ("Content-Encoding", encoding)]
+
+async def _dispatch(request: Request):
+    for pattern, handler in ROUTES:
+        match = pattern.match(request.path)
+        if match is None:
+            continue
+        if request.method not in ("GET", "HEAD"):
+            return _jsonify({"message": "Method not allowed"}, 405)
+        return await handler(request, *(int(v) for v in match.groups()))
+    return _jsonify({"message": "Not found"}, 404)
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await asyncio.to_thread(_restaurant_type_names)
+            except Exception as e:
+                flask_app.logger.warning("Could not preload restaurant types, falling back to lazy load: %s", e)
+            _get_engine()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(background.drain)
+            if _engine is not None:
+                await _engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    request = Request(scope)
+    status, body, headers = await _dispatch(request)
+    body, headers = _compress(request, status, body, headers)
+    headers = [*headers, ("Content-Length", str(len(body))), *_cors_headers(request)]
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    await send({"type": "http.response.body", "body": b"" if request.method == "HEAD" else body})
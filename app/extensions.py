@@ -1,6 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from flask_migrate import Migrate
 
 db = SQLAlchemy()
 
-cors = CORS()
\ No newline at end of file
+cors = CORS()
+
+migrate = Migrate()
\ No newline at end of file
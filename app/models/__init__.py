@@ -1,5 +1,6 @@
 from .recipe import Recipe, RecipeComment, RecipeInstruction, RecipeIngredient, RecipeRating
 from .restaurant_type import RestaurantType
 from .review import Review, RestTypeReviewRef
+from .change_log import ChangeLog, ChangeLogHorizon
 
-__all__ = ["Recipe", "RecipeComment", "RecipeInstruction", "RecipeIngredient", "RecipeRating", "RestaurantType","Review", "RestTypeReviewRef"]
\ No newline at end of file
+__all__ = ["Recipe", "RecipeComment", "RecipeInstruction", "RecipeIngredient", "RecipeRating", "RestaurantType","Review", "RestTypeReviewRef", "ChangeLog", "ChangeLogHorizon"]
\ No newline at end of file
@@ -0,0 +1,109 @@
+from sqlalchemy import DDL, event
+
+from ..extensions import db
+
+
+class ChangeLog(db.Model):
+    """
+    One row per insert/update/delete on a synced table, written by the record_change()
+    trigger. Read by the /api/sync feed.
+    """
+    __tablename__ = "change_log"
+
+    seq = db.Column(db.BigInteger, primary_key=True)
+    # Writing transaction's id; entries are only served once every older transaction has finished
+    txid = db.Column(db.BigInteger, nullable=False, server_default=db.text("txid_current()"))
+
+    entity = db.Column(db.Text, nullable=False)      # recipe | review | comment | recipe_rating
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.Text, nullable=False)          # insert | update | delete
+    changed_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+    __table_args__ = (
+        db.Index("idx_change_log_txid_seq", "txid", "seq"),
+    )
+
+
+class ChangeLogHorizon(db.Model):
+    """
+    The newest change_log entry that has been pruned (single row, id 1). Sync tokens older
+    than this may have missed deleted entries, so their clients have to resync.
+    """
+    __tablename__ = "change_log_horizon"
+
+    id = db.Column(db.SmallInteger, primary_key=True, default=1)
+    txid = db.Column(db.BigInteger, nullable=False)
+    seq = db.Column(db.BigInteger, nullable=False)
+    pruned_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+    __table_args__ = (
+        db.CheckConstraint("id = 1", name="change_log_horizon_single_row"),
+    )
+
+
+# table -> (entity name, id column recorded in change_log)
+# Ratings are recorded by recipe_id: the feed serves the recipe's average, never individual votes.
+TRACKED_TABLES = {
+    "recipes": ("recipe", "recipe_id"),
+    "reviews": ("review", "review_id"),
+    "recipescomments": ("comment", "comment_id"),
+    "recipe_ratings": ("recipe_rating", "recipe_id"),
+}
+
+# record_change() as each migration installs it. Migrations import their version from here,
+# so never edit one in place: add RECORD_CHANGE_FUNCTION_V<n+1>, a migration that installs it,
+# and point RECORD_CHANGE_FUNCTION (what db.create_all() installs) at it.
+
+# 0003
+RECORD_CHANGE_FUNCTION_V1 = """
+CREATE OR REPLACE FUNCTION record_change() RETURNS trigger AS $$
+DECLARE
+    row_id integer;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := (to_jsonb(OLD) ->> TG_ARGV[1])::integer;
+    ELSE
+        row_id := (to_jsonb(NEW) ->> TG_ARGV[1])::integer;
+    END IF;
+    INSERT INTO change_log (entity, entity_id, op) VALUES (TG_ARGV[0], row_id, lower(TG_OP));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# 0004: each entry is also announced with NOTIFY on the change_log channel (delivered on commit) for /api/events
+RECORD_CHANGE_FUNCTION_V2 = """
+CREATE OR REPLACE FUNCTION record_change() RETURNS trigger AS $$
+DECLARE
+    row_id integer;
+    entry change_log%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_id := (to_jsonb(OLD) ->> TG_ARGV[1])::integer;
+    ELSE
+        row_id := (to_jsonb(NEW) ->> TG_ARGV[1])::integer;
+    END IF;
+    INSERT INTO change_log (entity, entity_id, op) VALUES (TG_ARGV[0], row_id, lower(TG_OP))
+    RETURNING * INTO entry;
+    PERFORM pg_notify('change_log', json_build_object(
+        'txid', entry.txid, 'seq', entry.seq, 'entity', entry.entity, 'id', entry.entity_id, 'op', entry.op
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+RECORD_CHANGE_FUNCTION = RECORD_CHANGE_FUNCTION_V2
+
+def record_change_triggers(tables: dict = TRACKED_TABLES) -> list[str]:
+    return [
+        f"CREATE TRIGGER {table}_record_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION record_change('{entity}', '{id_column}')"
+        for table, (entity, id_column) in tables.items()
+    ]
+
+# db.create_all() on a fresh database installs the triggers too; existing databases get them from migration 0003.
+# DDL() %-formats its statement, so the function's %ROWTYPE has to be escaped
+event.listen(db.metadata, "after_create", DDL(RECORD_CHANGE_FUNCTION.replace("%", "%%")).execute_if(dialect="postgresql"))
+for _statement in record_change_triggers():
+    event.listen(db.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
@@ -1,6 +1,8 @@
 # app/models/recipe.py
 from __future__ import annotations
 
+from sqlalchemy.dialects.postgresql import JSONB
+
 from ..extensions import db
 
 class Recipe(db.Model):
@@ -8,21 +10,32 @@ class Recipe(db.Model):
 
     recipe_id = db.Column(db.Integer, primary_key=True)
     recipe_name = db.Column(db.Text, nullable=False)
-    user_encrypted = db.Column(db.String(64), nullable=False)
+    user_encrypted = db.Column(db.LargeBinary(32), nullable=False)
 
     prep_time_in_min = db.Column(db.Integer, nullable=False)
 
     meal = db.Column(db.Text, nullable=True)
     rec_img_url = db.Column(db.Text, nullable=True)
+    # {"<width>": "<S3 key>"} of the WebP thumbnails generated from rec_img_url (app/utils/images.py)
+    rec_img_variants = db.Column(JSONB, nullable=True)
 
     soph_submitted = db.Column(db.Boolean, nullable=True)
 
+    __table_args__ = (
+        db.Index("idx_recipes_user", "user_encrypted"),
+    )
+
 class RecipeComment(db.Model):
     __tablename__ = "recipescomments"
     comment_id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.recipe_id", ondelete="CASCADE"), nullable=False)
     comment = db.Column(db.String(150), nullable=False)
-    user_encrypted = db.Column(db.String(64), nullable=False)
+    user_encrypted = db.Column(db.LargeBinary(32), nullable=False)
+
+    __table_args__ = (
+        # Serves both recipe_id lookups and keyset pagination by comment_id
+        db.Index("idx_recipescomments_recipe_comment", "recipe_id", "comment_id"),
+    )
 
 class RecipeInstruction(db.Model):
     __tablename__ = "recipe_instructions"
@@ -31,17 +44,25 @@ class RecipeInstruction(db.Model):
     instruction_order = db.Column(db.Integer, nullable=False)
     instruction = db.Column(db.Text, nullable=False)
 
+    __table_args__ = (
+        db.Index("idx_recipe_instructions_recipe_order", "recipe_id", "instruction_order"),
+    )
+
 class RecipeIngredient(db.Model):
     __tablename__ = "recipe_ingredients"
     ingredient_id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.recipe_id"), nullable=False)
     ingredient = db.Column(db.Text, nullable=False)
 
+    __table_args__ = (
+        db.Index("idx_recipe_ingredients_recipe_id", "recipe_id"),
+    )
+
 class RecipeRating(db.Model):
     __tablename__ = "recipe_ratings"
     rating_id = db.Column(db.Integer, primary_key=True)
     recipe_id = db.Column(db.Integer, db.ForeignKey("recipes.recipe_id", ondelete="CASCADE"), nullable=False)
-    user_encrypted = db.Column(db.String(64), nullable=False)
+    user_encrypted = db.Column(db.LargeBinary(32), nullable=False)
     rating = db.Column(db.SmallInteger, nullable=False)
 
     __table_args__ = (
@@ -5,3 +5,7 @@ class RestaurantType(db.Model):
 
     rest_type_id = db.Column(db.Integer, primary_key=True)
     rest_type = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.Index("idx_rest_types_rest_type", "rest_type"),
+    )
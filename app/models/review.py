@@ -17,7 +17,11 @@ class Review(db.Model):
     state_code = db.Column(db.Text, nullable=False)
 
     soph_submitted = db.Column(db.Boolean, nullable=True)
-    user_encrypted = db.Column(db.String(64), nullable=False)
+    user_encrypted = db.Column(db.LargeBinary(32), nullable=False)
+
+    __table_args__ = (
+        db.Index("idx_reviews_user", "user_encrypted"),
+    )
 
 
 class RestTypeReviewRef(db.Model):
@@ -38,4 +42,9 @@ class RestTypeReviewRef(db.Model):
         db.ForeignKey("reviews.review_id", ondelete="CASCADE"),
         primary_key=True,
         nullable=False,
-    )
\ No newline at end of file
+    )
+
+    # The primary key leads with rest_type_id, so lookups by review need their own index
+    __table_args__ = (
+        db.Index("idx_rest_type_review_ref_review_id", "review_id"),
+    )
@@ -0,0 +1,11 @@
+# app/queries/__init__.py
+# select() builders and row serializers for the read endpoints.
+# The builders don't execute SQL, so the Flask routes (db.session) and the async read path
+# (app/asgi.py) run the same statements and produce the same payloads. recipe_cards() and
+# review_rows() run them on db.session for the routes, the sync feed and the catalog snapshots.
+#
+# Statements are built once and reused: the fixed ones are module constants, the ones that
+# vary with ?fields= or ?include= are memoized per combination. Values are bound at execute
+# time (ids through an expanding "ids" parameter), so each request skips building the
+# construct and its cache key, and always hits SQLAlchemy's compiled cache. Execute them on
+# a Core connection (db.session.connection()) to get plain rows without the ORM's overhead.
@@ -0,0 +1,17 @@
+# app/queries/fields.py
+from __future__ import annotations
+
+def parse_fields(raw: str | None, available):
+    """
+    Parse ?fields= into the requested field names, in the order of available.
+    Missing means every field; returns None if it is blank or names an unknown field.
+    """
+    if raw is None:
+        return tuple(available)
+    requested = {part.strip() for part in raw.split(",") if part.strip()}
+    if not requested or not requested.issubset(available):
+        return None
+    return tuple(name for name in available if name in requested)
+
+def fields_error(available) -> str:
+    return f"fields must be a comma separated list of: {', '.join(available)}"
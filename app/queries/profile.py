@@ -0,0 +1,84 @@
+# app/queries/profile.py
+from __future__ import annotations
+
+from decimal import Decimal
+
+from sqlalchemy import LargeBinary, Numeric, cast, desc, func, literal_column, null, select, union_all
+
+from ..extensions import db
+from ..utils.auth import user_hex
+from .recipes import profile_recipes_stmt, rated_recipes_stmt
+from .reviews import profile_reviews_stmt
+
+# Dashboard sections; each is paged by its <section>_limit and <section>_offset params
+PROFILE_SECTIONS = ("recipes", "rated", "reviews")
+
+def _num(v):
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+_recipes = profile_recipes_stmt("recipes_limit", "recipes_offset").subquery()
+_rated = rated_recipes_stmt("rated_limit", "rated_offset").subquery()
+_reviews = profile_reviews_stmt("reviews_limit", "reviews_offset").subquery()
+
+# The three sections of /api/profile in one statement, so the dashboard is a single round trip.
+# Each branch is the section's own paged query; the rows share one shape (name, id,
+# user_encrypted, value) and pos keeps each section's order through the UNION.
+PROFILE_STMT = union_all(
+    select(
+        literal_column("'recipes'").label("section"),
+        func.row_number().over(order_by=(_recipes.c.recipe_name, _recipes.c.recipe_id)).label("pos"),
+        _recipes.c.recipe_name.label("name"),
+        _recipes.c.recipe_id.label("id"),
+        _recipes.c.user_encrypted,
+        _recipes.c.avg_rating.label("value"),
+    ),
+    select(
+        literal_column("'rated'"),
+        func.row_number().over(order_by=(_rated.c.recipe_name, _rated.c.recipe_id)),
+        _rated.c.recipe_name,
+        _rated.c.recipe_id,
+        cast(null(), LargeBinary),
+        cast(_rated.c.rating, Numeric),
+    ),
+    select(
+        literal_column("'reviews'"),
+        func.row_number().over(order_by=desc(_reviews.c.review_id)),
+        _reviews.c.rest_name,
+        _reviews.c.review_id,
+        _reviews.c.user_encrypted,
+        _reviews.c.o_rating,
+    ),
+).order_by("section", "pos")
+
+# Same payloads as profile_recipes(), rated_recipes() and profile_reviews() in the routes
+_ROW_FORMATS = {
+    "recipes": lambda r: {
+        "recipe_name": r.name,
+        "recipe_id": r.id,
+        "user_encrypted": user_hex(r.user_encrypted),
+        "avg_rating": _num(r.value),
+    },
+    "rated": lambda r: {"recipe_name": r.name, "recipe_id": r.id, "rating": int(r.value)},
+    "reviews": lambda r: {
+        "rest_name": r.name,
+        "o_rating": _num(r.value),
+        "user_encrypted": user_hex(r.user_encrypted),
+        "review_id": r.id,
+    },
+}
+
+def profile_sections(user_encrypted: bytes, pages: dict[str, tuple[int | None, int]]) -> dict[str, list[dict]]:
+    """
+    {"recipes": [...], "rated": [...], "reviews": [...]} for the user, each section paged by
+    its (limit, offset) in pages (limit None for the whole section).
+    """
+    params = {"user_encrypted": user_encrypted}
+    for section in PROFILE_SECTIONS:
+        params[f"{section}_limit"], params[f"{section}_offset"] = pages[section]
+
+    sections = {section: [] for section in PROFILE_SECTIONS}
+    for r in db.session.connection().execute(PROFILE_STMT, params):
+        sections[r.section].append(_ROW_FORMATS[r.section](r))
+    return sections
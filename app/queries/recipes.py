@@ -0,0 +1,242 @@
+# app/queries/recipes.py
+from __future__ import annotations
+
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import bindparam, func, select
+
+from ..extensions import db
+from ..models.recipe import (
+    Recipe,
+    RecipeComment,
+    RecipeIngredient,
+    RecipeInstruction,
+    RecipeRating,
+)
+from ..utils.auth import user_hex
+from ..utils.images import image_srcset
+
+# Sub-collections a recipe detail can embed, selected with ?include=
+RECIPE_INCLUDES = ("ingredients", "instructions", "comments", "rating")
+
+def _as_float_or_none(v: Any):
+    if v is None:
+        return None
+    if isinstance(v, Decimal):
+        return float(v)
+    try:
+        return float(v)
+    except Exception:
+        return None
+
+def parse_include(raw: str | None):
+    """
+    Parse ?include= into a set of sub-collection names.
+    Missing means everything; returns None if any name is unknown.
+    """
+    if raw is None:
+        return set(RECIPE_INCLUDES)
+    include = {part.strip() for part in raw.split(",") if part.strip()}
+    if not include.issubset(RECIPE_INCLUDES):
+        return None
+    return include
+
+###########################
+# RECIPE CARDS (LIST VIEW)
+###########################
+
+# Output field -> column it is built from. ?fields= picks from these; only the chosen columns are selected.
+RECIPE_CARD_FIELDS = {
+    "recipe_id": Recipe.recipe_id,
+    "recipe_name": Recipe.recipe_name,
+    "prep_time_in_min": Recipe.prep_time_in_min,
+    "meal": Recipe.meal,
+    "rec_img_url": Recipe.rec_img_url,
+    # Sized WebP thumbnails, e.g. {"160w": url, "320w": url}; None until they are generated
+    "rec_img_srcset": Recipe.rec_img_variants,
+    "soph_submitted": Recipe.soph_submitted,
+}
+
+@lru_cache(maxsize=128)
+def recipe_cards_stmt(fields=tuple(RECIPE_CARD_FIELDS), by_ids: bool = False):
+    """
+    Cards of every recipe, or with by_ids of those in the "ids" parameter. Built once per (fields, by_ids).
+    """
+    stmt = select(*(RECIPE_CARD_FIELDS[name].label(name) for name in fields))
+    if by_ids:
+        stmt = stmt.where(Recipe.recipe_id.in_(bindparam("ids", expanding=True)))
+    return stmt
+
+def recipe_card(r, fields=tuple(RECIPE_CARD_FIELDS)) -> dict:
+    row = r._mapping
+    card = {name: row[name] for name in fields}
+    if "rec_img_srcset" in card:
+        card["rec_img_srcset"] = image_srcset(card["rec_img_srcset"])
+    return card
+
+def recipe_cards(recipe_ids: list[int] | None = None, fields=tuple(RECIPE_CARD_FIELDS)) -> list[dict]:
+    """
+    The list-view fields of every recipe, or only of recipe_ids when given.
+    Shared by GET /, the sync feed and the catalog snapshots.
+    """
+    conn = db.session.connection()
+    if recipe_ids is None:
+        rows = conn.execute(recipe_cards_stmt(fields))
+    else:
+        rows = conn.execute(recipe_cards_stmt(fields, by_ids=True), {"ids": list(recipe_ids)})
+    return [recipe_card(r, fields) for r in rows]
+
+###########################
+# RECIPE DETAIL
+###########################
+
+# Scalar fields of a recipe detail, for ?fields=; sub-collections are chosen with ?include=
+RECIPE_DETAIL_FIELDS = {
+    "recipe_id": Recipe.recipe_id,
+    "recipe_name": Recipe.recipe_name,
+    "user_encrypted": Recipe.user_encrypted,
+    "prep_time_in_min": Recipe.prep_time_in_min,
+    "meal": Recipe.meal,
+    "rec_img_url": Recipe.rec_img_url,
+    "soph_submitted": Recipe.soph_submitted,
+}
+
+# Sub-collections of the recipes in the "ids" parameter, by ?include= name
+RECIPE_INCLUDE_STMTS = {
+    "ingredients": (
+        select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient)
+        .where(RecipeIngredient.recipe_id.in_(bindparam("ids", expanding=True)))
+        .order_by(RecipeIngredient.ingredient_id.asc())
+    ),
+    "instructions": (
+        select(RecipeInstruction.recipe_id, RecipeInstruction.instruction)
+        .where(RecipeInstruction.recipe_id.in_(bindparam("ids", expanding=True)))
+        .order_by(RecipeInstruction.recipe_id, RecipeInstruction.instruction_order.asc())
+    ),
+    "comments": (
+        select(RecipeComment.recipe_id, RecipeComment.comment)
+        .where(RecipeComment.recipe_id.in_(bindparam("ids", expanding=True)))
+        .order_by(RecipeComment.recipe_id, RecipeComment.comment_id.asc())
+    ),
+    "rating": (
+        select(
+            RecipeRating.recipe_id,
+            func.avg(RecipeRating.rating).cast(db.Numeric(3, 1)).label("avg_rating"),
+        )
+        .where(RecipeRating.recipe_id.in_(bindparam("ids", expanding=True)))
+        .group_by(RecipeRating.recipe_id)
+    ),
+}
+
+@lru_cache(maxsize=128)
+def _recipe_detail_stmt(fields):
+    # recipe_id is always selected: the sub-collections are matched up on it
+    columns = ["recipe_id", *(name for name in fields if name != "recipe_id")]
+    return (
+        select(*(RECIPE_DETAIL_FIELDS[name].label(name) for name in columns))
+        .where(Recipe.recipe_id.in_(bindparam("ids", expanding=True)))
+    )
+
+def recipe_detail_stmts(include: set[str], fields=tuple(RECIPE_DETAIL_FIELDS)) -> dict:
+    """
+    One statement for the recipes plus one per included sub-collection, keyed by name.
+    Execute them all with {"ids": [...]} and pass the rows to assemble_recipes() with the same fields.
+    """
+    stmts = {"recipes": _recipe_detail_stmt(fields)}
+    stmts.update({name: stmt for name, stmt in RECIPE_INCLUDE_STMTS.items() if name in include})
+    return stmts
+
+def assemble_recipes(rows: dict, fields=tuple(RECIPE_DETAIL_FIELDS)) -> dict[int, dict]:
+    """
+    Build the detail payload of every recipe found, keyed by recipe_id, from the rows of
+    each statement in recipe_detail_stmts().
+    """
+    combined = {}
+    for r in rows["recipes"]:
+        row = r._mapping
+        recipe = {name: row[name] for name in fields}
+        if "user_encrypted" in recipe:
+            recipe["user_encrypted"] = user_hex(recipe["user_encrypted"])
+        combined[r.recipe_id] = recipe
+
+    for name, column in (("ingredients", "ingredient"), ("instructions", "instruction"), ("comments", "comment")):
+        if name not in rows:
+            continue
+        for recipe in combined.values():
+            recipe[name] = []
+        for row in rows[name]:
+            if row.recipe_id in combined:
+                combined[row.recipe_id][name].append(getattr(row, column))
+
+    if "rating" in rows:
+        for recipe in combined.values():
+            recipe["averageRating"] = None
+        for row in rows["rating"]:
+            if row.recipe_id in combined:
+                combined[row.recipe_id]["averageRating"] = _as_float_or_none(row.avg_rating)
+
+    return combined
+
+###########################
+# COMMENTS AND PROFILE
+###########################
+
+# One page of a recipe's comments, newest first; params recipe_id, limit and, for the
+# cursor variant, cursor (the last comment_id already seen)
+COMMENTS_PAGE_STMT = (
+    select(RecipeComment.comment_id, RecipeComment.comment)
+    .where(RecipeComment.recipe_id == bindparam("recipe_id"))
+    .order_by(RecipeComment.comment_id.desc())
+    .limit(bindparam("limit"))
+)
+COMMENTS_PAGE_AFTER_CURSOR_STMT = COMMENTS_PAGE_STMT.where(RecipeComment.comment_id < bindparam("cursor"))
+
+COMMENT_COUNT_STMT = (
+    select(func.count(RecipeComment.comment_id))
+    .where(RecipeComment.recipe_id == bindparam("recipe_id"))
+)
+
+RECIPE_EXISTS_STMT = select(Recipe.recipe_id).where(Recipe.recipe_id == bindparam("recipe_id"))
+
+USER_RATING_STMT = select(RecipeRating.rating).where(
+    RecipeRating.recipe_id == bindparam("recipe_id"),
+    RecipeRating.user_encrypted == bindparam("user_encrypted"),
+)
+
+def profile_recipes_stmt(limit: str = "limit", offset: str = "offset"):
+    """
+    Recipes created by a user with their average rating, by name. Params user_encrypted and
+    the page's limit (None for all) and offset, bound under the given names.
+    """
+    return (
+        select(
+            Recipe.recipe_name,
+            Recipe.recipe_id,
+            Recipe.user_encrypted,
+            func.coalesce(func.round(func.avg(RecipeRating.rating), 1), 0).label("avg_rating"),
+        )
+        .outerjoin(RecipeRating, Recipe.recipe_id == RecipeRating.recipe_id)
+        .where(Recipe.user_encrypted == bindparam("user_encrypted"))
+        .group_by(Recipe.recipe_id, Recipe.recipe_name, Recipe.user_encrypted)
+        .order_by(Recipe.recipe_name.asc(), Recipe.recipe_id.asc())
+        .limit(bindparam(limit))
+        .offset(bindparam(offset))
+    )
+
+def rated_recipes_stmt(limit: str = "limit", offset: str = "offset"):
+    """
+    Recipes a user has rated with their rating, by name; same params.
+    """
+    return (
+        select(Recipe.recipe_name, Recipe.recipe_id, RecipeRating.rating)
+        .join(RecipeRating, Recipe.recipe_id == RecipeRating.recipe_id)
+        .where(RecipeRating.user_encrypted == bindparam("user_encrypted"))
+        .order_by(Recipe.recipe_name.asc(), Recipe.recipe_id.asc())
+        .limit(bindparam(limit))
+        .offset(bindparam(offset))
+    )
+
+PROFILE_RECIPES_STMT = profile_recipes_stmt()
+RATED_RECIPES_STMT = rated_recipes_stmt()
@@ -0,0 +1,94 @@
+# app/queries/reviews.py
+from __future__ import annotations
+
+from decimal import Decimal
+from functools import lru_cache
+
+from sqlalchemy import bindparam, desc, select
+
+from ..extensions import db
+from ..models.restaurant_type import RestaurantType
+from ..models.review import Review, RestTypeReviewRef
+from ..utils.auth import user_hex
+
+def _num(v):
+    # normalize Decimal -> float for JSON
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+# Output field -> column. ?fields= picks from these; only the chosen columns are selected.
+REVIEW_FIELDS = {
+    "review_id": Review.review_id,
+    "rest_name": Review.rest_name,
+    "o_rating": Review.o_rating,
+    "price": Review.price,
+    "taste": Review.taste,
+    "experience": Review.experience,
+    "description": Review.description,
+    "city": Review.city,
+    "state_code": Review.state_code,
+    "soph_submitted": Review.soph_submitted,
+    "user_encrypted": Review.user_encrypted,
+    "rest_type": RestaurantType.rest_type,  # may be None if no ref row
+}
+
+# Fields that need converting for JSON
+_REVIEW_CONVERTERS = {
+    "o_rating": _num,
+    "taste": _num,
+    "experience": _num,
+    "user_encrypted": user_hex,
+}
+
+@lru_cache(maxsize=128)
+def review_rows_stmt(fields=tuple(REVIEW_FIELDS), by_ids: bool = False):
+    """
+    Every review with its restaurant type, newest first; with by_ids, only those in the "ids"
+    parameter. Selects just the columns for fields; the restaurant type join is skipped when
+    it isn't asked for. Built once per (fields, by_ids).
+    """
+    stmt = select(*(REVIEW_FIELDS[name].label(name) for name in fields))
+    if "rest_type" in fields:
+        stmt = (
+            stmt.select_from(Review)
+            .outerjoin(RestTypeReviewRef, Review.review_id == RestTypeReviewRef.review_id)
+            .outerjoin(RestaurantType, RestTypeReviewRef.rest_type_id == RestaurantType.rest_type_id)
+        )
+    if by_ids:
+        stmt = stmt.where(Review.review_id.in_(bindparam("ids", expanding=True)))
+    return stmt.order_by(desc(Review.review_id))
+
+def review_row(r, fields=tuple(REVIEW_FIELDS)) -> dict:
+    row = r._mapping
+    return {
+        name: _REVIEW_CONVERTERS[name](row[name]) if name in _REVIEW_CONVERTERS else row[name]
+        for name in fields
+    }
+
+def review_rows(review_ids: list[int] | None = None, fields=tuple(REVIEW_FIELDS)) -> list[dict]:
+    """
+    Every review with its restaurant type, newest first, or only those in review_ids when given.
+    Shared by GET /, GET /<id> and the sync feed.
+    """
+    conn = db.session.connection()
+    if review_ids is None:
+        rows = conn.execute(review_rows_stmt(fields))
+    else:
+        rows = conn.execute(review_rows_stmt(fields, by_ids=True), {"ids": list(review_ids)})
+    return [review_row(r, fields) for r in rows]
+
+def profile_reviews_stmt(limit: str = "limit", offset: str = "offset"):
+    """
+    Reviews written by a user, newest first. Params user_encrypted and the page's limit
+    (None for all) and offset, bound under the given names.
+    """
+    return (
+        select(Review.rest_name, Review.o_rating, Review.user_encrypted, Review.review_id)
+        .where(Review.user_encrypted == bindparam("user_encrypted"))
+        .order_by(desc(Review.review_id))
+        .limit(bindparam(limit))
+        .offset(bindparam(offset))
+    )
+
+PROFILE_REVIEWS_STMT = profile_reviews_stmt()
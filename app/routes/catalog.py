@@ -0,0 +1,19 @@
+from __future__ import annotations
+from flask import Blueprint, jsonify
+from ..utils.snapshots import snapshots
+
+bp = Blueprint("catalog", __name__)
+
+###############################
+# GET CATALOG
+# Where to download the public catalog (recipe cards, restaurant types) without going through
+# the API: fetch manifest_url, then each shard "path" in it, relative to the manifest.
+# Then keep up to date with /api/sync?since=<the manifest's sync_token>.
+###############################
+@bp.get("/")
+def get_catalog():
+    manifest_url = snapshots.manifest_url()
+    if manifest_url is None:
+        return jsonify({"message": "Catalog snapshots are not enabled"}), 404
+
+    return jsonify({"body": {"manifest_url": manifest_url}}), 200
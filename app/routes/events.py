@@ -0,0 +1,63 @@
+from __future__ import annotations
+import queue
+from flask import Blueprint, Response, current_app, jsonify, request
+from ..utils.events import RESYNC, broker, cooperative_worker
+
+bp = Blueprint("events", __name__)
+
+# Comment line sent when nothing happened, so proxies and clients keep the connection open
+HEARTBEAT_SECONDS = 15
+
+def _format(event) -> str:
+    name, event_id, data = event
+    lines = [f"event: {name}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+###############################
+# GET EVENTS (SERVER-SENT EVENTS)
+# Streams `review` (new review), `comment` (new comment) and `rating` (recipe's new
+# averageRating) events. Reconnects send Last-Event-ID (or ?lastEventId=) to resume; if that
+# id is too old the stream sends `resync` and closes, and the client should catch up via
+# /api/sync before reconnecting.
+###############################
+@bp.get("/")
+def stream_events():
+    # A sync worker would be tied up for the whole life of the stream
+    if not (cooperative_worker() or current_app.debug):
+        return jsonify({"message": "The event stream is not available on this server"}), 503
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+
+    def stream():
+        # Subscribed on first read, so a response that is never sent can't leak a subscriber
+        sub, replay = broker.subscribe(last_event_id)
+        try:
+            yield "retry: 5000\n\n"
+            for event in replay:
+                yield _format(event)
+                if event is RESYNC:
+                    return
+            while True:
+                try:
+                    event = sub.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                yield _format(event)
+                if event is RESYNC:
+                    return
+        finally:
+            broker.unsubscribe(sub)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
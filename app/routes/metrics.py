@@ -0,0 +1,46 @@
+from __future__ import annotations
+from flask import Blueprint, jsonify, request
+from ..utils.autocomplete import autocomplete
+from ..utils.background import background
+from ..utils.compression import compressor
+from ..utils.events import broker
+from ..utils.rest_type_registry import rest_type_registry
+from ..utils.snapshots import snapshots
+from ..utils.statement_cache import statement_cache
+from ..utils.write_buffer import write_buffer
+
+bp = Blueprint("metrics", __name__)
+
+LOOPBACK = {"127.0.0.1", "::1"}
+
+def _is_local_request() -> bool:
+    # Nginx always adds X-Forwarded-For, so anything proxied from outside is refused
+    return request.remote_addr in LOOPBACK and "X-Forwarded-For" not in request.headers
+
+###############################
+# GET METRICS
+# Internal counters of this worker process. Only answered on direct requests from the host
+# itself, e.g. `curl http://127.0.0.1:5000/api/metrics`; each gunicorn worker has its own.
+###############################
+@bp.get("/")
+def get_metrics():
+    if not _is_local_request():
+        return jsonify({"message": "Not found"}), 404
+
+    try:
+        body = {
+            "autocomplete": autocomplete.stats(),
+            "background": background.stats(),
+            "compression": compressor.stats(),
+            "rest_type_registry": rest_type_registry.stats(),
+            "event_subscribers": broker.subscriber_count(),
+            "snapshots": snapshots.stats(),
+            "statement_cache": statement_cache.stats(),
+            "write_buffer": write_buffer.stats(),
+        }
+        return jsonify({"body": body}), 200
+
+    except Exception as e:
+        return jsonify({
+            "message": "There was an error while collecting metrics and we could not complete your request. Error: " + str(e)
+        }), 500
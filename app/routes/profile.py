@@ -0,0 +1,67 @@
+from __future__ import annotations
+from flask import Blueprint, jsonify, request
+from ..queries.profile import PROFILE_SECTIONS, profile_sections
+from ..utils.auth import current_user_encrypted
+from .. import require_auth
+
+bp = Blueprint("profile", __name__)
+
+# Largest page a single section can ask for
+PROFILE_SECTION_MAX = 100
+
+def _bad_request(msg: str, status: int = 400):
+    return jsonify({"message": msg}), status
+
+def _page_args(section: str):
+    """
+    Read ?<section>_limit= and ?<section>_offset=. No limit means the whole section.
+    Returns (limit, offset), or raises ValueError with a message for the client.
+    """
+    limit = request.args.get(f"{section}_limit")
+    offset = request.args.get(f"{section}_offset", "0")
+    try:
+        limit = int(limit) if limit is not None else None
+        offset = int(offset)
+    except ValueError:
+        raise ValueError(f"{section}_limit and {section}_offset must be numbers")
+    if limit is not None and (limit <= 0 or limit > PROFILE_SECTION_MAX):
+        raise ValueError(f"{section}_limit must be between 1 and {PROFILE_SECTION_MAX}")
+    if offset < 0:
+        raise ValueError(f"{section}_offset cannot be negative")
+    return limit, offset
+
+###############################
+# GET PROFILE DASHBOARD
+# Everything the profile page renders in one authenticated call: the user's recipes,
+# the recipes they rated and their reviews. Each section pages independently with
+# ?recipes_limit=&recipes_offset=, ?rated_limit=&rated_offset=, ?reviews_limit=&reviews_offset=
+###############################
+@bp.route("/", methods=["OPTIONS"])
+def preflight_profile():
+    return "", 200
+
+@bp.route("/", methods=["GET"])
+@require_auth(None)
+def get_profile():
+    # Token validation and hashing happen once for all three sections
+    user_encrypted = current_user_encrypted()
+
+    try:
+        pages = {section: _page_args(section) for section in PROFILE_SECTIONS}
+    except ValueError as e:
+        return _bad_request(str(e))
+
+    try:
+        # All three sections come back from one statement, in one round trip
+        sections = profile_sections(user_encrypted, pages)
+        body = {
+            "recipes": sections["recipes"],
+            "rated_recipes": sections["rated"],
+            "reviews": sections["reviews"],
+        }
+        return jsonify({"body": body}), 200
+
+    except Exception as e:
+        return jsonify({
+            "message": "There was an error while fetching the profile and we could not complete your request. Error: " + str(e)
+        }), 500
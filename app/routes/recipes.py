@@ -4,12 +4,8 @@ from __future__ import annotations
 import json
 import os
 from decimal import Decimal
-from typing import Any
 
-import boto3
-from botocore.exceptions import BotoCoreError, ClientError
-from flask import Blueprint, jsonify, request, g
-from sqlalchemy import func
+from flask import Blueprint, jsonify, request
 import uuid
 
 from ..extensions import db
@@ -20,11 +16,41 @@ from ..models.recipe import (
     RecipeInstruction,
     RecipeRating,
 )
-from ..utils.auth import encrypt_user
+from ..queries.fields import fields_error, parse_fields
+from ..queries.recipes import (
+    COMMENT_COUNT_STMT,
+    COMMENTS_PAGE_AFTER_CURSOR_STMT,
+    COMMENTS_PAGE_STMT,
+    PROFILE_RECIPES_STMT,
+    RATED_RECIPES_STMT,
+    RECIPE_CARD_FIELDS,
+    RECIPE_DETAIL_FIELDS,
+    RECIPE_EXISTS_STMT,
+    RECIPE_INCLUDES,
+    USER_RATING_STMT,
+    assemble_recipes,
+    parse_include,
+    recipe_cards,
+    recipe_detail_stmts,
+)
+from ..utils.auth import current_user_encrypted, user_hex
+from ..utils.compression import cache_compressed
+from ..utils.images import ImageTooLarge, check_upload_size, cloudfront_url, schedule_thumbnails
+from ..utils.rate_limit import rate_limited
+from ..utils.responses import respond
+from ..utils.s3 import s3_client
+from ..utils.snapshots import snapshots
+from ..utils.write_buffer import WriteNotConfirmed, write_buffer
 from .. import require_auth
 
 bp = Blueprint("recipes", __name__)
 
+# Most recipes GET /batch will load in one request
+RECIPE_BATCH_MAX = 50
+
+COMMENTS_PAGE_DEFAULT = 20
+COMMENTS_PAGE_MAX = 100
+
 ###########
 # HELPERS
 ###########
@@ -32,44 +58,18 @@ bp = Blueprint("recipes", __name__)
 def _bad_request(msg: str, status: int = 400):
     return jsonify({"message": msg}), status
 
-def _as_float_or_none(v: Any):
-    if v is None:
-        return None
-    if isinstance(v, Decimal):
-        return float(v)
-    try:
-        return float(v)
-    except Exception:
-        return None
-    
-def _build_cloudfront_url(key: str) -> str:
-    """
-    Build the public CloudFront URL for a given S3 key.
-    """
-    base = os.environ.get("CLOUDFRONT_IMG_BASE_URL")
-    return f"{base}/{key.lstrip('/')}"
-
-def _upload_to_s3(file_storage, key: str) -> str:
+def _load_recipes(recipe_ids: list[int], include: set[str], fields=tuple(RECIPE_DETAIL_FIELDS)) -> dict[int, dict]:
     """
-    Uploads to S3 and returns the public URL matching your Next.js URL format.
-    Requires AWS creds available via env/instance role.
+    Build the detail payload for every existing recipe in recipe_ids, keyed by recipe_id.
+    Runs one query per included sub-collection regardless of how many recipes are asked for.
     """
-    bucket = os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs")
-    region = os.environ.get("AWS_REGION")
-
-    s3 = boto3.client("s3", region_name=region)
-
-    # Optional: set content type
-    extra_args = {}
-    if getattr(file_storage, "mimetype", None):
-        extra_args["ContentType"] = file_storage.mimetype
-
-    try:
-        s3.upload_fileobj(file_storage.stream, bucket, key, ExtraArgs=extra_args)
-    except (BotoCoreError, ClientError) as e:
-        raise RuntimeError(f"S3 upload failed: {e}")
-
-    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
+    stmts = recipe_detail_stmts(include, fields)
+    params = {"ids": list(set(recipe_ids))}
+    conn = db.session.connection()
+    rows = {"recipes": conn.execute(stmts.pop("recipes"), params).all()}
+    if rows["recipes"]:
+        rows.update({name: conn.execute(stmt, params).all() for name, stmt in stmts.items()})
+    return assemble_recipes(rows, fields)
 
 ###########################
 ###########################
@@ -79,94 +79,138 @@ def _upload_to_s3(file_storage, key: str) -> str:
 
 ###########################
 # GET ALL RECIPES
+# ?fields=recipe_id,recipe_name limits each card to those fields (default: all)
 ###########################
 @bp.get("/")
+@cache_compressed
 def get_all_recipes():
+    fields = parse_fields(request.args.get("fields"), RECIPE_CARD_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(RECIPE_CARD_FIELDS))
+
     try:
-        recipes = Recipe.query.with_entities(
-            Recipe.recipe_id,
-            Recipe.recipe_name,
-            Recipe.prep_time_in_min,
-            Recipe.meal,
-            Recipe.rec_img_url,
-            Recipe.soph_submitted,
-        ).all()
-
-        rows = []
-        for r in recipes:
-            rows.append({
-                "recipe_id": r.recipe_id,
-                "recipe_name": r.recipe_name,
-                "prep_time_in_min": r.prep_time_in_min,
-                "meal": r.meal,
-                "rec_img_url": r.rec_img_url,
-                "soph_submitted": r.soph_submitted,
-            })
-
-        return jsonify({"body": {"rows": rows}}), 200
+        rows = recipe_cards(fields=fields)
+
+        return respond({"body": {"rows": rows}}), 200
     except Exception as e:
         return jsonify({"message": f"There was an error and we could not complete your get all recipes request. Error: {e}"}), 500
 
 ######################
 # GET SINGLE RECIPE
+# ?include=ingredients,instructions,comments,rating picks the sub-collections to embed (default: all)
+# ?fields=recipe_name,meal picks the recipe's own fields (default: all)
 ######################
 @bp.get("/<int:recipe_id>")
+@cache_compressed
 def get_recipe(recipe_id: int):
     if recipe_id <= 0:
         return _bad_request("Invalid recipe ID")
 
+    include = parse_include(request.args.get("include"))
+    if include is None:
+        return _bad_request(f"include must be a comma separated list of: {', '.join(RECIPE_INCLUDES)}")
+
+    fields = parse_fields(request.args.get("fields"), RECIPE_DETAIL_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(RECIPE_DETAIL_FIELDS))
+
     try:
-        recipe = Recipe.query.filter_by(recipe_id=recipe_id).first()
-        if not recipe:
-            return jsonify({"body": []}), 200
-
-        instructions = (
-            db.session.query(RecipeInstruction.instruction)
-            .filter(RecipeInstruction.recipe_id == recipe_id)
-            .order_by(RecipeInstruction.instruction_order.asc())
-            .all()
-        )
-        instruction_list = [row.instruction for row in instructions]
+        recipes = _load_recipes([recipe_id], include, fields)
+        if recipe_id not in recipes:
+            return respond({"body": []}), 200
 
-        ingredients = (
-            db.session.query(RecipeIngredient.ingredient)
-            .filter(RecipeIngredient.recipe_id == recipe_id)
-            .all()
-        )
-        ingredient_list = [row.ingredient for row in ingredients]
+        return respond({"body": [recipes[recipe_id]]}), 200
 
-        comments = (
-            db.session.query(RecipeComment.comment)
-            .filter(RecipeComment.recipe_id == recipe_id)
-            .all()
-        )
-        comment_list = [row.comment for row in comments]
+    except Exception as e:
+        return jsonify({"message": f"There was an error while fetching the recipe and we could not complete your request. Error: {e}"}), 500
 
-        avg_rating = (
-            db.session.query(func.avg(RecipeRating.rating).cast(db.Numeric(3, 1)))
-            .filter(RecipeRating.recipe_id == recipe_id)
-            .scalar()
-        )
-        average_rating = _as_float_or_none(avg_rating)
-
-        combined = {
-            "recipe_id": recipe.recipe_id,
-            "recipe_name": recipe.recipe_name,
-            "user_encrypted": recipe.user_encrypted,
-            "prep_time_in_min": recipe.prep_time_in_min,
-            "meal": recipe.meal,
-            "rec_img_url": recipe.rec_img_url,
-            "soph_submitted": recipe.soph_submitted,
-            "ingredients": ingredient_list,
-            "instructions": instruction_list,
-            "comments": comment_list,
-            "averageRating": average_rating,
-        }
+#####################################
+# GET/POST BATCH: MANY RECIPES AT ONCE
+# GET /batch?ids=1,2,3 or POST /batch with {"ids": [1, 2, 3]}; ?include= and ?fields= work as for a single recipe.
+# Results keep the requested order; ids that don't exist come back as {"recipe_id": id, "missing": true}.
+#####################################
+@bp.route("/batch", methods=["OPTIONS"])
+def preflight_get_recipes_batch():
+    return "", 200
+
+@bp.route("/batch", methods=["GET", "POST"])
+def get_recipes_batch():
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        raw_ids = body.get("ids")
+    else:
+        raw_ids = [part for part in request.args.get("ids", "").split(",") if part.strip()]
+
+    if not isinstance(raw_ids, list) or len(raw_ids) == 0:
+        return _bad_request("ids is required")
+    if len(raw_ids) > RECIPE_BATCH_MAX:
+        return _bad_request(f"At most {RECIPE_BATCH_MAX} ids can be requested at once")
+    try:
+        recipe_ids = [int(v) for v in raw_ids]
+    except (ValueError, TypeError):
+        return _bad_request("ids must be numbers")
+    if any(v <= 0 for v in recipe_ids):
+        return _bad_request("Invalid recipe ID")
+
+    include = parse_include(request.args.get("include"))
+    if include is None:
+        return _bad_request(f"include must be a comma separated list of: {', '.join(RECIPE_INCLUDES)}")
 
-        return jsonify({"body": [combined]}), 200
+    fields = parse_fields(request.args.get("fields"), RECIPE_DETAIL_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(RECIPE_DETAIL_FIELDS))
+
+    try:
+        recipes = _load_recipes(recipe_ids, include, fields)
+        out = [
+            recipes.get(recipe_id, {"recipe_id": recipe_id, "missing": True})
+            for recipe_id in recipe_ids
+        ]
+        return respond({"body": out}), 200
 
     except Exception as e:
-        return jsonify({"message": f"There was an error while fetching the recipe and we could not complete your request. Error: {e}"}), 500
+        return jsonify({"message": f"There was an error while fetching the recipes and we could not complete your request. Error: {e}"}), 500
+
+#################################
+# GET [ID]/COMMENTS (PAGINATED)
+# Newest first. Pass the returned next_cursor as ?cursor= to get the next (older) page.
+#################################
+@bp.get("/<int:recipe_id>/comments")
+def get_recipe_comments(recipe_id: int):
+    if recipe_id <= 0:
+        return _bad_request("Invalid recipe ID")
+
+    try:
+        limit = int(request.args.get("limit", COMMENTS_PAGE_DEFAULT))
+        cursor = request.args.get("cursor")
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return _bad_request("limit and cursor must be numbers")
+    if limit <= 0 or limit > COMMENTS_PAGE_MAX:
+        return _bad_request(f"limit must be between 1 and {COMMENTS_PAGE_MAX}")
+
+    try:
+        conn = db.session.connection()
+        # Fetch one extra row to know whether there is another page
+        params = {"recipe_id": recipe_id, "limit": limit + 1}
+        if cursor is None:
+            rows = conn.execute(COMMENTS_PAGE_STMT, params).all()
+        else:
+            rows = conn.execute(COMMENTS_PAGE_AFTER_CURSOR_STMT, {**params, "cursor": cursor}).all()
+
+        comment_count = conn.execute(COMMENT_COUNT_STMT, {"recipe_id": recipe_id}).scalar()
+
+        page = rows[:limit]
+        next_cursor = page[-1].comment_id if len(rows) > limit else None
+
+        return jsonify({"body": {
+            "comments": [{"comment_id": r.comment_id, "comment": r.comment} for r in page],
+            "comment_count": comment_count,
+            "next_cursor": next_cursor,
+        }}), 200
+
+    except Exception as e:
+        return jsonify({"message": f"There was an error while fetching the comments and we could not complete your request. Error: {e}"}), 500
 
 
 #############################
@@ -175,6 +219,47 @@ def get_recipe(recipe_id: int):
 #############################
 #############################
 
+def profile_recipes(user_encrypted: bytes, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """
+    Recipes created by the user with their average rating, by name.
+    Shared by /profile-recipes and the /api/profile dashboard.
+    """
+    rows = db.session.connection().execute(PROFILE_RECIPES_STMT, {
+        "user_encrypted": user_encrypted,
+        "limit": limit,
+        "offset": offset,
+    })
+
+    return [
+        {
+            "recipe_name": r.recipe_name,
+            "recipe_id": r.recipe_id,
+            "user_encrypted": user_hex(r.user_encrypted),
+            "avg_rating": float(r.avg_rating) if isinstance(r.avg_rating, Decimal) else r.avg_rating,
+        }
+        for r in rows
+    ]
+
+def rated_recipes(user_encrypted: bytes, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """
+    Recipes the user has rated with their rating, by name.
+    Shared by /rated-recipes and the /api/profile dashboard.
+    """
+    rows = db.session.connection().execute(RATED_RECIPES_STMT, {
+        "user_encrypted": user_encrypted,
+        "limit": limit,
+        "offset": offset,
+    })
+
+    return [
+        {
+            "recipe_name": r.recipe_name,
+            "recipe_id": r.recipe_id,
+            "rating": int(r.rating),
+        }
+        for r in rows
+    ]
+
 ###############################
 # GET ALL PROFILE RECIPES
 ###############################
@@ -187,43 +272,10 @@ def preflight_profile_recipes():
 @require_auth(None)
 def get_profile_recipes():
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
     
     try:
-        rows = (
-            db.session.query(
-                Recipe.recipe_name,
-                Recipe.recipe_id,
-                Recipe.user_encrypted,
-                func.coalesce(
-                    func.round(func.avg(RecipeRating.rating), 1),
-                    0
-                ).label("avg_rating")
-            )
-            .outerjoin(
-                RecipeRating,
-                Recipe.recipe_id == RecipeRating.recipe_id
-            )
-            .filter(Recipe.user_encrypted == user_encrypted)
-            .group_by(
-                Recipe.recipe_id,
-                Recipe.recipe_name,
-                Recipe.user_encrypted
-            )
-            .order_by(Recipe.recipe_name.asc())
-            .all()
-        )
-
-        result = []
-        for r in rows:
-            result.append({
-                "recipe_name": r.recipe_name,
-                "recipe_id": r.recipe_id,
-                "user_encrypted": r.user_encrypted,
-                "avg_rating": float(r.avg_rating) if isinstance(r.avg_rating, Decimal) else r.avg_rating,
-            })
+        result = profile_recipes(user_encrypted)
 
         return jsonify({"body": result}), 200
 
@@ -244,31 +296,10 @@ def preflight_rated_recipes():
 @require_auth(None)
 def get_rated_recipes():
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     try:
-        rows = (
-            db.session.query(
-                Recipe.recipe_name,
-                Recipe.recipe_id,
-                RecipeRating.rating,
-            )
-            .join(RecipeRating, Recipe.recipe_id == RecipeRating.recipe_id)
-            .filter(RecipeRating.user_encrypted == user_encrypted)
-            .order_by(Recipe.recipe_name.asc())
-            .all()
-        )
-
-        result = [
-            {
-                "recipe_name": r.recipe_name,
-                "recipe_id": r.recipe_id,
-                "rating": int(r.rating),
-            }
-            for r in rows
-        ]
+        result = rated_recipes(user_encrypted)
 
         return jsonify({"body": result}), 200
 
@@ -288,11 +319,10 @@ def preflight_create_recipe():
 
 @bp.route("/", methods=["PUT"])
 @require_auth(None)
+@rate_limited("create_recipe")
 def create_recipe():
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     # Parse JSON request body
     try:
@@ -376,6 +406,12 @@ def create_recipe():
     except Exception as e:
         return jsonify({"message": f"Failed to parse request: {e}"}), 400
 
+    # A presigned PUT can't limit the upload's size, so oversized images are refused here
+    try:
+        check_upload_size(sanitized_img_public_url)
+    except ImageTooLarge as e:
+        return _bad_request(str(e))
+
     ##################
     # TRY INFO UPLOAD
     ##################
@@ -411,6 +447,11 @@ def create_recipe():
                     ingredient=sanitized_ingredient,
                 ))
 
+            # The upload is confirmed once the recipe points at it; thumbnails are made off the request
+            schedule_thumbnails(recipe_id, sanitized_img_public_url)
+
+        snapshots.schedule()
+
         return jsonify({"message": "Recipe created successfully", "recipe_id": recipe_id}), 200
 
     except Exception as e:
@@ -427,14 +468,13 @@ def preflight_add_comment(recipe_id: int):
 
 @bp.route("/<int:recipe_id>", methods=["PUT"])
 @require_auth(None)
+@rate_limited("add_comment")
 def add_comment(recipe_id: int):
     if recipe_id <= 0:
         return _bad_request("Invalid recipe ID")
 
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     try:
         body = request.get_json(silent=True) or {}
@@ -446,10 +486,16 @@ def add_comment(recipe_id: int):
         sanitized_comment = comment.strip()[:150]
 
         # Ensure recipe exists (optional but helpful)
-        exists = db.session.query(Recipe.recipe_id).filter(Recipe.recipe_id == recipe_id).first()
+        exists = db.session.connection().execute(RECIPE_EXISTS_STMT, {"recipe_id": recipe_id}).first()
         if not exists:
             return jsonify({"message": "Invalid recipe ID"}), 400
 
+        if write_buffer.accepting:
+            # Inserted together with other buffered comments; returns once committed
+            db.session.rollback()  # don't hold the read transaction open while waiting
+            write_buffer.submit_comment(recipe_id, user_encrypted, sanitized_comment).result(write_buffer.ack_timeout)
+            return jsonify({"message": "Comment added successfully"}), 200
+
         db.session.add(RecipeComment(
             recipe_id=recipe_id,
             comment=sanitized_comment,
@@ -459,6 +505,8 @@ def add_comment(recipe_id: int):
 
         return jsonify({"message": "Comment added successfully"}), 200
 
+    except WriteNotConfirmed as e:
+        return jsonify({"message": f"There was an error while sending the comment. Error: {e}"}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": f"There was an error while sending the comment. Error: {e}"}), 500
@@ -479,14 +527,13 @@ def preflight_submit_rating(recipe_id: int):
 
 @bp.route("/<int:recipe_id>/rating", methods=["PUT"])
 @require_auth(None)
+@rate_limited("submit_rating")
 def submit_rating(recipe_id: int):
     if recipe_id <= 0:
         return _bad_request("Invalid recipe ID")
 
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     body = request.get_json(silent=True) or {}
     rating = body.get("rating")
@@ -496,6 +543,11 @@ def submit_rating(recipe_id: int):
         return _bad_request("Rating must be a number between 1 and 5")
 
     try:
+        if write_buffer.accepting:
+            # Upserted together with other buffered votes; returns once committed
+            write_buffer.submit_rating(recipe_id, user_encrypted, rating).result(write_buffer.ack_timeout)
+            return jsonify({"message": "Rating submitted successfully"}), 200
+
         existing = RecipeRating.query.filter_by(recipe_id=recipe_id, user_encrypted=user_encrypted).first()
         if existing:
             existing.rating = rating
@@ -505,6 +557,8 @@ def submit_rating(recipe_id: int):
         db.session.commit()
         return jsonify({"message": "Rating submitted successfully"}), 200
 
+    except WriteNotConfirmed as e:
+        return jsonify({"message": f"There was an error while submitting the rating. Error: {e}"}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": f"There was an error while submitting the rating. Error: {e}"}), 500
@@ -524,15 +578,13 @@ def get_users_rating(recipe_id: int):
         return _bad_request("Invalid recipe ID")
 
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     try:
-        row = RecipeRating.query.with_entities(RecipeRating.rating).filter_by(
-            recipe_id=recipe_id,
-            user_encrypted=user_encrypted,
-        ).first()
+        row = db.session.connection().execute(USER_RATING_STMT, {
+            "recipe_id": recipe_id,
+            "user_encrypted": user_encrypted,
+        }).first()
 
         if not row:
             return jsonify({"usersRating": 0}), 200
@@ -556,11 +608,13 @@ def preflight_presign_image_upload():
 
 @bp.route("/presign-image-upload", methods=["POST"])
 @require_auth(None)
+@rate_limited("presign_recipe_image_upload")
 def presign_recipe_image_upload():
+    # Imported on first use, like the S3 client itself, so importing the app stays fast
+    from botocore.exceptions import BotoCoreError, ClientError
+
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     body = request.get_json(silent=True) or {}
     content_type = body.get("contentType")
@@ -571,7 +625,6 @@ def presign_recipe_image_upload():
         return _bad_request(f"Invalid or missing contentType. Allowed: {sorted(list(allowed))}")
 
     bucket = os.environ.get("S3_BUCKET_NAME")
-    region = os.environ.get("AWS_REGION")
     prefix = os.environ.get("S3_UPLOAD_PREFIX")
 
     # Choose extension based on content type
@@ -584,9 +637,9 @@ def presign_recipe_image_upload():
     ext = ext_map[content_type]
 
     # Key like: imgs/<user_encrypted>/<uuid>.jpg
-    key = f"{prefix}/{user_encrypted}/{uuid.uuid4().hex}.{ext}"
+    key = f"{prefix}/{user_hex(user_encrypted)}/{uuid.uuid4().hex}.{ext}"
 
-    s3 = boto3.client("s3", region_name=region)
+    s3 = s3_client()
 
     try:
         upload_url = s3.generate_presigned_url(
@@ -601,7 +654,7 @@ def presign_recipe_image_upload():
     except (BotoCoreError, ClientError) as e:
         return jsonify({"message": f"Failed to generate presigned URL: {e}"}), 500
 
-    img_public_url = _build_cloudfront_url(key)
+    img_public_url = cloudfront_url(key)
 
     return jsonify({
         "uploadUrl": upload_url,
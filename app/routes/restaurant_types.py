@@ -1,20 +1,17 @@
 from flask import Blueprint, jsonify
-from ..models.restaurant_type import RestaurantType
+from ..utils.compression import cache_compressed
+from ..utils.rest_type_registry import rest_type_registry
 from .. import require_auth
 
 bp = Blueprint("restaurant_types", __name__)
 
 @bp.get("/")
 @require_auth(None)
+@cache_compressed
 def get_restaurant_types():
     try:
-        rows = (
-            RestaurantType.query
-            .with_entities(RestaurantType.rest_type)
-            .order_by(RestaurantType.rest_type.asc())
-            .all()
-        )
-        restaurant_types = [r.rest_type for r in rows]
+        # Served from memory; only touches the DB when the registry is cold or stale
+        restaurant_types = rest_type_registry.names()
         return jsonify({"body": restaurant_types}), 200
 
     except Exception as e:
@@ -1,11 +1,16 @@
 from __future__ import annotations
-from flask import Blueprint, jsonify, request, g
-from sqlalchemy import desc
+from flask import Blueprint, current_app, jsonify, request
 from decimal import Decimal
 from ..extensions import db
 from ..models.review import Review, RestTypeReviewRef
-from ..models.restaurant_type import RestaurantType
-from ..utils.auth import encrypt_user
+from ..queries.fields import fields_error, parse_fields
+from ..queries.reviews import PROFILE_REVIEWS_STMT, REVIEW_FIELDS, review_rows
+from ..utils.auth import current_user_encrypted, user_hex
+from ..utils.autocomplete import FIELDS as AUTOCOMPLETE_FIELDS, autocomplete
+from ..utils.compression import cache_compressed
+from ..utils.rate_limit import rate_limited
+from ..utils.responses import respond
+from ..utils.rest_type_registry import rest_type_registry
 from .. import require_auth
 
 bp = Blueprint("reviews", __name__)
@@ -21,39 +26,19 @@ def _num(v):
 
 ###############################
 # GET ALL REVIEWS
+# ?fields=review_id,rest_name,o_rating limits each review to those fields (default: all)
 ###############################
 @bp.get("/")
+@cache_compressed
 def get_all_reviews():
+    fields = parse_fields(request.args.get("fields"), REVIEW_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(REVIEW_FIELDS))
+
     try:
-        rows = (
-            db.session.query(
-                Review,
-                RestaurantType.rest_type,
-            )
-            .outerjoin(RestTypeReviewRef, Review.review_id == RestTypeReviewRef.review_id)
-            .outerjoin(RestaurantType, RestTypeReviewRef.rest_type_id == RestaurantType.rest_type_id)
-            .order_by(desc(Review.review_id))
-            .all()
-        )
-
-        out_rows = []
-        for review, rest_type in rows:
-            out_rows.append({
-                "review_id": review.review_id,
-                "rest_name": review.rest_name,
-                "o_rating": _num(review.o_rating),
-                "price": review.price,
-                "taste": _num(review.taste),
-                "experience": _num(review.experience),
-                "description": review.description,
-                "city": review.city,
-                "state_code": review.state_code,
-                "soph_submitted": review.soph_submitted,
-                "user_encrypted": review.user_encrypted,
-                "rest_type": rest_type,  # may be None if no ref row
-            })
-
-        return jsonify({"body": {"rows": out_rows}}), 200
+        out_rows = review_rows(fields=fields)
+
+        return respond({"body": {"rows": out_rows}}), 200
 
     except Exception as e:
         return jsonify({
@@ -70,11 +55,10 @@ def preflight_create_review():
 
 @bp.route("/", methods=["PUT"])
 @require_auth(None)
+@rate_limited("create_review")
 def create_review():
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     try:
         body = request.get_json(silent=True) or {}
@@ -119,7 +103,12 @@ def create_review():
         sanitized_state_code = str(state_code).strip()[:2]
         sanitized_rest_type = str(rest_type).strip()
 
-        # Transaction: insert review + lookup rest_type_id + insert junction row
+        # Resolved from the in-memory registry; a name it doesn't know is looked up again before it's refused
+        rest_type_id = rest_type_registry.id_for(sanitized_rest_type)
+        if rest_type_id is None:
+            return _bad_request("Invalid restaurant type")
+
+        # Transaction: insert review + insert junction row
         with db.session.begin():
             review = Review(
                 rest_name=sanitized_rest_name,
@@ -136,23 +125,11 @@ def create_review():
             db.session.add(review)
             db.session.flush()  # gets review.review_id
 
-            # lookup restaurant type id
-            rt = (
-                db.session.query(RestaurantType)
-                .filter(RestaurantType.rest_type == sanitized_rest_type)
-                .first()
-            )
-            if not rt:
-                # Raising causes rollback via session.begin()
-                raise ValueError("Invalid restaurant type")
-
             db.session.add(RestTypeReviewRef(
-                rest_type_id=rt.rest_type_id,
+                rest_type_id=rest_type_id,
                 review_id=review.review_id,
             ))
 
-        return jsonify({"message": "Review created successfully"}), 200
-
     except ValueError as e:
         # Invalid restaurant type or other controlled validation failure
         return jsonify({"message": str(e)}), 400
@@ -160,45 +137,66 @@ def create_review():
         db.session.rollback()
         return jsonify({"message": "Failed to create review"}), 500
 
+    # The review is saved; suggestions are best effort and catch up on the next reload anyway
+    try:
+        autocomplete.add({"rest_name": sanitized_rest_name, "city": sanitized_city})
+    except Exception as e:
+        current_app.logger.warning("Autocomplete update failed: %s", e)
+
+    return jsonify({"message": "Review created successfully"}), 200
+
+
+###############################
+# GET AUTOCOMPLETE SUGGESTIONS
+# ?field=rest_name|city&prefix=jo[&limit=10] -> existing values starting with prefix (any case),
+# most reviewed first, so the review form can offer a spelling that's already in use
+###############################
+@bp.get("/autocomplete")
+def get_autocomplete():
+    field = request.args.get("field")
+    if field not in AUTOCOMPLETE_FIELDS:
+        return _bad_request(f"field must be one of: {', '.join(AUTOCOMPLETE_FIELDS)}")
+
+    prefix = request.args.get("prefix", "")
+    if len(prefix) > 100:
+        return _bad_request("prefix must be at most 100 characters")
+
+    try:
+        limit = int(request.args.get("limit", 10))
+    except ValueError:
+        return _bad_request("limit must be a number between 1-25")
+    if limit <= 0 or limit > 25:
+        return _bad_request("limit must be a number between 1-25")
+
+    try:
+        suggestions = autocomplete.search(field, prefix, limit)
+
+        return jsonify({"body": suggestions}), 200
+
+    except Exception as e:
+        return jsonify({
+            "message": "There was an error while fetching suggestions and we could not complete your request. Error: " + str(e)
+        }), 500
+
 
 ###############################
 # GET REVIEW BY ID
+# ?fields= as for GET /
 ###############################
 @bp.get("/<int:review_id>")
+@cache_compressed
 def get_review(review_id: int):
     if review_id <= 0:
         return _bad_request("Invalid review ID")
 
+    fields = parse_fields(request.args.get("fields"), REVIEW_FIELDS)
+    if fields is None:
+        return _bad_request(fields_error(REVIEW_FIELDS))
+
     try:
-        rows = (
-            db.session.query(
-                Review,
-                RestaurantType.rest_type,
-            )
-            .outerjoin(RestTypeReviewRef, Review.review_id == RestTypeReviewRef.review_id)
-            .outerjoin(RestaurantType, RestTypeReviewRef.rest_type_id == RestaurantType.rest_type_id)
-            .filter(Review.review_id == review_id)
-            .all()
-        )
-
-        out = []
-        for review, rest_type in rows:
-            out.append({
-                "review_id": review.review_id,
-                "rest_name": review.rest_name,
-                "o_rating": _num(review.o_rating),
-                "price": review.price,
-                "taste": _num(review.taste),
-                "experience": _num(review.experience),
-                "description": review.description,
-                "city": review.city,
-                "state_code": review.state_code,
-                "soph_submitted": review.soph_submitted,
-                "user_encrypted": review.user_encrypted,
-                "rest_type": rest_type,
-            })
+        out = review_rows([review_id], fields)
 
-        return jsonify({"body": out}), 200
+        return respond({"body": out}), 200
 
     except Exception as e:
         return jsonify({
@@ -206,6 +204,24 @@ def get_review(review_id: int):
         }), 500
 
 
+def profile_reviews(user_encrypted: bytes, limit: int | None = None, offset: int = 0) -> list[dict]:
+    """
+    Reviews written by the user, newest first.
+    Shared by /profile-reviews and the /api/profile dashboard.
+    """
+    rows = db.session.connection().execute(PROFILE_REVIEWS_STMT, {
+        "user_encrypted": user_encrypted,
+        "limit": limit,
+        "offset": offset,
+    })
+
+    return [{
+        "rest_name": r.rest_name,
+        "o_rating": _num(r.o_rating),
+        "user_encrypted": user_hex(r.user_encrypted),
+        "review_id": r.review_id,
+    } for r in rows]
+
 ###############################
 # GET PROFILE REVIEWS
 ###############################
@@ -217,28 +233,10 @@ def preflight_profile_reviews():
 @require_auth(None)
 def get_profile_reviews():  
     # Get user information from token
-    token = g.authlib_server_oauth2_token
-    user_sub = token.sub
-    user_encrypted = encrypt_user(user_sub)
+    user_encrypted = current_user_encrypted()
 
     try:
-        rows = (
-            db.session.query(
-                Review.rest_name,
-                Review.o_rating,
-                Review.user_encrypted,
-                Review.review_id,
-            )
-            .filter(Review.user_encrypted == user_encrypted)
-            .all()
-        )
-
-        out = [{
-            "rest_name": r.rest_name,
-            "o_rating": _num(r.o_rating),
-            "user_encrypted": r.user_encrypted,
-            "review_id": r.review_id,
-        } for r in rows]
+        out = profile_reviews(user_encrypted)
 
         return jsonify({"body": out}), 200
 
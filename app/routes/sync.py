@@ -0,0 +1,51 @@
+from __future__ import annotations
+from flask import Blueprint, jsonify, request
+from ..utils.changes import InvalidToken, TokenExpired, entries_since, head_token, load_changes
+
+bp = Blueprint("sync", __name__)
+
+SYNC_PAGE_DEFAULT = 500
+SYNC_PAGE_MAX = 1000
+
+def _bad_request(msg: str, status: int = 400):
+    return jsonify({"message": msg}), status
+
+###############################
+# GET SYNC
+# Without ?since=: returns only a starting token. Get it first, then download the catalog
+# from the list endpoints, then keep calling with ?since=<next> to receive what changed.
+# With ?since=: returns up to ?limit= changes, each either
+#   {"entity", "id", "data": {...current row...}} or {"entity", "id", "deleted": true}
+# for entity in recipe | review | comment | recipe_rating (data is the recipe's averageRating).
+# Keep paging while has_more is true.
+# If the token is older than the pruned change log (CHANGE_LOG_RETENTION_DAYS), the response
+# has "resync": true and no changes: download the catalog again, then sync from its "next".
+###############################
+@bp.get("/")
+def get_changes():
+    since = request.args.get("since")
+
+    try:
+        limit = int(request.args.get("limit", SYNC_PAGE_DEFAULT))
+    except ValueError:
+        return _bad_request("limit must be a number")
+    if limit <= 0 or limit > SYNC_PAGE_MAX:
+        return _bad_request(f"limit must be between 1 and {SYNC_PAGE_MAX}")
+
+    try:
+        if since is None:
+            return jsonify({"body": {"changes": [], "next": head_token(), "has_more": False}}), 200
+
+        try:
+            entries, next_token, has_more = entries_since(since, limit)
+        except TokenExpired:
+            return jsonify({"body": {"changes": [], "next": head_token(), "has_more": False, "resync": True}}), 200
+        changes = load_changes(entries)
+        return jsonify({"body": {"changes": changes, "next": next_token, "has_more": has_more}}), 200
+
+    except InvalidToken as e:
+        return _bad_request(str(e))
+    except Exception as e:
+        return jsonify({
+            "message": "There was an error while fetching changes and we could not complete your request. Error: " + str(e)
+        }), 500
@@ -0,0 +1,60 @@
+# app/startup.py
+from __future__ import annotations
+
+import importlib
+import time
+from contextlib import contextmanager
+
+# name -> seconds, filled in by preload() so scripts/startup_report.py can show init costs
+timings: dict[str, float] = {}
+
+@contextmanager
+def _timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def preload(app):
+    """
+    Build heavy, fork-safe state once. Under gunicorn with preload_app this runs in the
+    master, so every worker inherits it copy-on-write instead of paying for it on boot.
+    Anything skipped or failing here is still loaded lazily on first use.
+    """
+    from . import validator
+    from .utils.autocomplete import autocomplete
+    from .utils.rest_type_registry import rest_type_registry
+
+    with _timed("import boto3"):
+        # Module only; S3 clients are created per worker
+        importlib.import_module("boto3")
+
+    with _timed("fetch auth0 jwks"):
+        try:
+            validator.load_key_set()
+        except Exception as e:
+            app.logger.warning("Could not preload Auth0 keys, falling back to lazy load: %s", e)
+
+    with _timed("load restaurant types"):
+        try:
+            with app.app_context():
+                rest_type_registry.load()
+        except Exception as e:
+            app.logger.warning("Could not preload restaurant types, falling back to lazy load: %s", e)
+
+    with _timed("build autocomplete index"):
+        try:
+            with app.app_context():
+                autocomplete.load()
+        except Exception as e:
+            app.logger.warning("Could not build the autocomplete index, falling back to lazy load: %s", e)
+
+def after_fork(app):
+    """
+    Drop any pooled DB connections inherited from the master; sockets can't be shared across processes.
+    """
+    from .extensions import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,31 +1,50 @@
 # app/utils/auth.py
+from __future__ import annotations
+
 import hashlib
 import hmac
 import os
 
-def encrypt_user(email: str) -> str:
+from flask import g
+
+def encrypt_user(email: str) -> bytes:
     """
-    Create a deterministic 64-character hash using HMAC-SHA256.
-    Returns exactly 64 hex characters.
+    Create a deterministic 32-byte hash using HMAC-SHA256.
+    This is the form stored in the bytea user_encrypted columns;
+    use user_hex() when it has to leave the API.
     """
     try:
         # Validate that encryption key exists
         encryption_key = os.environ.get('ENCRYPTION_SECRET_KEY')
         if not encryption_key:
             raise ValueError('ENCRYPTION_SECRET_KEY environment variable is not set')
-        
-        # Create a deterministic 64-character hash
-        # Use HMAC-SHA256 which produces 32 bytes = 64 hex characters
+
+        # Create a deterministic 32-byte hash
         text = email.strip().lower()
         hash_obj = hmac.new(
             encryption_key.encode('utf-8'),
             text.encode('utf-8'),
             hashlib.sha256
         )
-        hash_value = hash_obj.hexdigest()
-        
-        # Return exactly 64 characters
-        return hash_value
+        return hash_obj.digest()
     except Exception as error:
         print(f'Encryption error: {error}')
-        raise ValueError('Encryption failed')
\ No newline at end of file
+        raise ValueError('Encryption failed')
+
+def user_hex(user_encrypted) -> str | None:
+    """
+    Format a stored user_encrypted value as the 64 hex characters clients have always received.
+    """
+    if user_encrypted is None:
+        return None
+    return bytes(user_encrypted).hex()
+
+def current_user_encrypted() -> bytes:
+    """
+    encrypt_user() of the authenticated request's token subject. Computed once per request
+    and kept on g, so @rate_limited and the view share the HMAC.
+    """
+    if "user_encrypted" not in g:
+        # The token is a dict of claims; attribute access only worked on older Authlib
+        g.user_encrypted = encrypt_user(g.authlib_server_oauth2_token["sub"])
+    return g.user_encrypted
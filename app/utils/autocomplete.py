@@ -0,0 +1,238 @@
+# app/utils/autocomplete.py
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+
+from sqlalchemy import func, select
+
+from ..extensions import db
+from ..models.review import Review
+from .background import background
+from .refresh import due_for_refresh, own_connection
+
+# field name -> column the suggestions come from
+FIELDS = {
+    "rest_name": Review.rest_name,
+    "city": Review.city,
+}
+
+# Prefixes matching more values than this have their ranking kept per snapshot, so a
+# one-letter prefix isn't re-ranked on every keystroke
+RANK_CACHE_THRESHOLD = 256
+
+# Sorts after every character a prefix can be followed by
+_PREFIX_END = "\U0010ffff"
+
+def normalize(value: str) -> str:
+    """
+    Key values are matched and grouped on: lowercased, whitespace collapsed.
+    "Joe's  Pizza" and "joe's pizza" are the same restaurant. str.lower() rather than
+    casefold() so keys match lower() in _search_postgres.
+    """
+    return " ".join(value.split()).lower()
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+# Values added since the index was built are kept in a small overlay; past this many the
+# overlay is folded into a new base, so add() costs O(OVERLAY_MAX) per review plus one
+# O(values) rebuild every OVERLAY_MAX reviews, instead of a full copy per review
+OVERLAY_MAX = 256
+
+class FieldIndex:
+    """
+    Immutable prefix index over one field's distinct values: normalized keys in a sorted
+    list (a prefix is a contiguous range, found with two bisects) and, per key, the most
+    common spelling and how many reviews use it. Values added later (with_value) live in a
+    small overlay on top of the shared base.
+    """
+
+    def __init__(self, spellings: dict[str, Counter]):
+        self.keys = sorted(spellings)
+        self.entries = {key: _entry(counter) for key, counter in spellings.items()}
+        # Overlay: sorted keys not in the base, and entries that replace the base's
+        self.added_keys: list[str] = []
+        self.overrides: dict[str, tuple[str, int]] = {}
+        self._ranked: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self.added_keys)
+
+    def search(self, prefix: str, limit: int) -> list[dict]:
+        keys = self._range(self.keys, prefix) + self._range(self.added_keys, prefix)
+        if len(keys) > RANK_CACHE_THRESHOLD:
+            ranked = self._ranked.get(prefix)
+            if ranked is None or len(ranked) < limit:
+                ranked = self._ranked[prefix] = self._rank(keys, limit)
+        else:
+            ranked = self._rank(keys, limit)
+        return [{"value": self._entry(key)[0], "count": self._entry(key)[1]} for key in ranked[:limit]]
+
+    def _range(self, keys: list[str], prefix: str) -> list[str]:
+        lo = bisect_left(keys, prefix)
+        return keys[lo:bisect_left(keys, prefix + _PREFIX_END, lo)]
+
+    def _entry(self, key: str) -> tuple[str, int]:
+        return self.overrides.get(key) or self.entries[key]
+
+    def _rank(self, keys: list[str], limit: int) -> list[str]:
+        # Most used first, alphabetical among equals
+        return heapq.nsmallest(limit, keys, key=lambda key: (-self._entry(key)[1], key))
+
+    def with_value(self, key: str, counter: Counter) -> FieldIndex:
+        """
+        A copy with key's entry replaced; the old index stays valid for readers holding it.
+        """
+        index = FieldIndex.__new__(FieldIndex)
+        index.keys = self.keys
+        index.entries = self.entries
+        index.added_keys = self.added_keys
+        if key not in self.entries and key not in self.overrides:
+            index.added_keys = list(self.added_keys)
+            insort(index.added_keys, key)
+        index.overrides = {**self.overrides, key: _entry(counter)}
+        index._ranked = {}
+        if len(index.overrides) > OVERLAY_MAX:
+            index._compact()
+        return index
+
+    def _compact(self):
+        # Fold the overlay into a new base
+        self.keys = sorted(self.keys + self.added_keys) if self.added_keys else self.keys
+        self.entries = {**self.entries, **self.overrides}
+        self.added_keys = []
+        self.overrides = {}
+
+def _entry(counter: Counter) -> tuple[str, int]:
+    # Ties go to the first spelling in sort order, as with mode() in _search_postgres
+    spelling, _ = min(counter.items(), key=lambda item: (-item[1], item[0]))
+    return spelling, sum(counter.values())
+
+class AutocompleteIndex:
+    """
+    In-memory suggestions for review fields (restaurant name, city), ranked by how many
+    reviews use a value. Built at startup (see app/startup.py) or on first use from the
+    distinct values in reviews, updated in place by add() when this worker creates a
+    review and reloaded every AUTOCOMPLETE_TTL_SECONDS to pick up other workers' reviews.
+
+    While a worker's index is still cold, search() answers from Postgres (the same
+    normalization and prefix match, narrowed by the trigram indexes from migration 0006) and
+    loads the index in the background.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        # field -> normalized key -> Counter of the spellings used; only touched under the lock
+        self._spellings: dict[str, dict[str, Counter]] = {}
+        # (field -> FieldIndex, loaded_at); replaced as a whole so readers never need the lock
+        self._snapshot = None
+        self._loading = False
+        self._stats = {"memory": 0, "postgres": 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl_seconds = float(app.config.get("AUTOCOMPLETE_TTL_SECONDS", 300))
+
+    def search(self, field: str, prefix: str, limit: int) -> list[dict]:
+        """
+        Up to limit {"value", "count"} suggestions for values of field starting with prefix.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            self._load_in_background()
+            self._stats["postgres"] += 1
+            return _search_postgres(field, prefix, limit)
+
+        if due_for_refresh(snapshot[1], self.ttl_seconds):
+            self._load_in_background()
+        self._stats["memory"] += 1
+        return snapshot[0][field].search(normalize(prefix), limit)
+
+    def add(self, values: dict[str, str]):
+        """
+        Count one more review with these field values, e.g. {"rest_name": ..., "city": ...}.
+        Call after the review is committed. A no-op until the index is loaded, since the load
+        will include it.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            indexes = dict(snapshot[0])
+            for field, value in values.items():
+                key = normalize(value)
+                if not key:
+                    continue
+                counter = self._spellings[field].setdefault(key, Counter())
+                counter[value] += 1
+                indexes[field] = indexes[field].with_value(key, counter)
+            self._snapshot = (indexes, snapshot[1])
+
+    def load(self):
+        """
+        (Re)build the index from the reviews table. Needs an app context.
+        """
+        spellings = {}
+        with own_connection() as conn:
+            for field, column in FIELDS.items():
+                counters: dict[str, Counter] = {}
+                for value, count in conn.execute(select(column, func.count()).group_by(column)):
+                    key = normalize(value)
+                    if key:
+                        counters.setdefault(key, Counter())[value] += count
+                spellings[field] = counters
+
+        indexes = {field: FieldIndex(counters) for field, counters in spellings.items()}
+        with self._lock:
+            # Reviews this worker adds while the query runs may be missing until the next load
+            self._spellings = spellings
+            self._snapshot = (indexes, time.monotonic())
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "age_seconds": round(time.monotonic() - snapshot[1], 1) if snapshot else None,
+            "values": {field: len(index) for field, index in snapshot[0].items()} if snapshot else {},
+            "served_from": dict(self._stats),
+        }
+
+    def _load_in_background(self):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+        if not background.submit("autocomplete_load", self._load_task):
+            self._loading = False
+
+    def _load_task(self):
+        try:
+            self.load()
+        finally:
+            self._loading = False
+
+def _search_postgres(field: str, prefix: str, limit: int) -> list[dict]:
+    column = FIELDS[field]
+    # Normalized like normalize(): whitespace runs collapsed and trimmed, compared case-insensitively
+    normalized = func.btrim(func.regexp_replace(column, r"\s+", " ", "g"))
+    key = func.lower(normalized)
+    words = prefix.split()
+    stmt = (
+        # mode() picks the most common spelling within each group, like the in-memory index.
+        # Ties are broken in code point order (COLLATE "C"), as Python sorts strings
+        select(func.mode().within_group(column.collate("C")).label("value"), func.count().label("count"))
+        # Every word of the prefix appears in the raw value: lets the trigram index narrow the rows
+        .where(*(column.ilike("%" + _escape_like(word) + "%", escape="\\") for word in words))
+        .where(normalized.ilike(_escape_like(" ".join(words)) + "%", escape="\\"))
+        .group_by(key)
+        .order_by(func.count().desc(), key.collate("C"))
+        .limit(limit)
+    )
+    return [{"value": r.value, "count": r.count} for r in db.session.execute(stmt)]
+
+autocomplete = AutocompleteIndex()
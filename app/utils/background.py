@@ -0,0 +1,202 @@
+# app/utils/background.py
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import event
+
+from ..extensions import db
+
+# Put on the queue once per thread to stop it
+_STOP = object()
+
+class TaskStats:
+    def __init__(self):
+        self.completed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def as_dict(self) -> dict:
+        done = self.completed + self.failed
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_total / done * 1000, 2) if done else None,
+            "avg_run_ms": round(self.run_total / done * 1000, 2) if done else None,
+            "max_run_ms": round(self.run_max * 1000, 2) if done else None,
+        }
+
+class BackgroundExecutor:
+    """
+    Bounded thread pool for work that shouldn't hold up the response: S3 calls, image
+    processing, cache warmups. Each task runs in its own app context; failures are logged.
+
+    submit() blocks for up to BACKGROUND_SUBMIT_TIMEOUT seconds when the queue is full and
+    then drops the task (returns False), so a slow dependency can't grow memory without bound.
+    Threads start on first use, so gunicorn's master never owns any; the queue is drained
+    when the worker exits. With BACKGROUND_EXECUTOR_MODE=sync tasks run inline instead,
+    which makes their effects visible as soon as the request returns (scripts, debugging).
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._threads: list[threading.Thread] = []
+        self._queue = None
+        self._pid = None
+        self._accepting = True
+        self._submitted = 0
+        self._rejected = 0
+        self._tasks: dict[str, TaskStats] = {}
+
+    def init_app(self, app):
+        self.app = app
+        self.mode = app.config.get("BACKGROUND_EXECUTOR_MODE", "thread")
+        self.workers = int(app.config.get("BACKGROUND_WORKERS", 2))
+        self.queue_size = int(app.config.get("BACKGROUND_QUEUE_SIZE", 200))
+        self.submit_timeout = float(app.config.get("BACKGROUND_SUBMIT_TIMEOUT", 0.05))
+
+        # Tasks registered with after_commit() run once the session commits, or never.
+        # db.session outlives the app, so a second create_app() in the same process must not
+        # register the hooks again and run every task twice
+        if not event.contains(db.session, "after_commit", self._on_commit):
+            event.listen(db.session, "after_commit", self._on_commit)
+        if not event.contains(db.session, "after_soft_rollback", self._on_rollback):
+            event.listen(db.session, "after_soft_rollback", self._on_rollback)
+
+    def submit(self, name: str, fn, *args, **kwargs) -> bool:
+        """
+        Run fn(*args, **kwargs) in the background. Returns False if it was dropped because
+        the executor is full or shutting down.
+        """
+        if self.mode == "sync":
+            self._run(name, fn, args, kwargs, time.monotonic())
+            return True
+
+        if not self._accepting:
+            self._reject(name)
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put((name, fn, args, kwargs, time.monotonic()), timeout=self.submit_timeout)
+        except queue.Full:
+            self._reject(name)
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def after_commit(self, name: str, fn, *args, **kwargs):
+        """
+        Submit fn once the current db.session transaction commits; dropped on rollback.
+        """
+        session = db.session()
+        # Tie the task to a transaction even if nothing has touched the database yet, or a
+        # rollback() now would have nothing to roll back and the task would wait for a later commit
+        if not session.in_transaction():
+            session.begin()
+        session.info.setdefault("background_tasks", []).append((name, fn, args, kwargs))
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """
+        Stop taking tasks and wait up to timeout seconds for the queued ones to finish.
+        Returns whether everything finished.
+        """
+        self._accepting = False
+        threads = self._threads if self._pid == os.getpid() else []
+        if not threads:
+            return True
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                # Behind whatever is still queued
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        finished = not any(thread.is_alive() for thread in threads)
+        if not finished:
+            self.app.logger.warning("Background executor stopped with %s task(s) still queued", self._queue.qsize())
+        return finished
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+                "queue_size": self.queue_size,
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "tasks": {name: stats.as_dict() for name, stats in sorted(self._tasks.items())},
+            }
+
+    def _on_commit(self, session):
+        for name, fn, args, kwargs in session.info.pop("background_tasks", []):
+            self.submit(name, fn, *args, **kwargs)
+
+    def _on_rollback(self, session, previous_transaction):
+        # A savepoint rolling back leaves the outer transaction, and its tasks, alive
+        if previous_transaction.parent is None:
+            session.info.pop("background_tasks", None)
+
+    def _reject(self, name: str):
+        with self._lock:
+            self._rejected += 1
+        self.app.logger.warning("Background executor full or stopping, dropped %s task", name)
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use in this process (threads and queues don't survive a fork)
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._threads = [
+                threading.Thread(target=self._work, name=f"background-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+        atexit.register(self.drain)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            name, fn, args, kwargs, queued_at = item
+            self._run(name, fn, args, kwargs, queued_at)
+
+    def _run(self, name, fn, args, kwargs, queued_at):
+        started = time.monotonic()
+        ok = True
+        with self.app.app_context():
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                ok = False
+                db.session.rollback()
+                self.app.logger.warning("Background task %s failed: %s", name, e)
+        finished = time.monotonic()
+
+        with self._lock:
+            stats = self._tasks.setdefault(name, TaskStats())
+            if ok:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+            stats.wait_total += started - queued_at
+            stats.run_total += finished - started
+            stats.run_max = max(stats.run_max, finished - started)
+
+background = BackgroundExecutor()
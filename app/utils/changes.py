@@ -0,0 +1,195 @@
+# app/utils/changes.py
+from __future__ import annotations
+
+from datetime import timedelta
+from decimal import Decimal
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db
+from ..models.change_log import ChangeLog, ChangeLogHorizon
+from ..models.recipe import Recipe, RecipeComment, RecipeRating
+from ..queries.recipes import recipe_cards
+from ..queries.reviews import review_rows
+
+# Tokens are "<txid>.<seq>" of the last change_log entry a client has seen.
+# Entries are ordered by (txid, seq) and only served once txid is older than every
+# running transaction, so a transaction that commits late can never land behind a token
+# that was already handed out.
+# Entries older than CHANGE_LOG_RETENTION_DAYS are pruned (prune_change_log()); tokens from
+# before the newest pruned entry have expired, and their clients must download the catalog again.
+START_TOKEN = "0.0"
+
+class InvalidToken(ValueError):
+    pass
+
+class TokenExpired(Exception):
+    pass
+
+def parse_token(token: str) -> tuple[int, int]:
+    try:
+        txid, seq = token.split(".")
+        return int(txid), int(seq)
+    except (AttributeError, ValueError):
+        raise InvalidToken("Invalid sync token")
+
+def format_token(txid: int, seq: int) -> str:
+    return f"{txid}.{seq}"
+
+def _stable_xmin():
+    # Oldest transaction still running; everything with a smaller txid is committed or rolled back
+    return func.txid_snapshot_xmin(func.txid_current_snapshot())
+
+def _horizon() -> tuple[int, int] | None:
+    row = db.session.query(ChangeLogHorizon.txid, ChangeLogHorizon.seq).filter(ChangeLogHorizon.id == 1).first()
+    return (row.txid, row.seq) if row else None
+
+def head_token() -> str:
+    """
+    Token for "now": a client that downloads the catalog after getting this token can
+    sync from it without missing anything.
+    """
+    row = (
+        db.session.query(ChangeLog.txid, ChangeLog.seq)
+        .filter(ChangeLog.txid < _stable_xmin())
+        .order_by(ChangeLog.txid.desc(), ChangeLog.seq.desc())
+        .first()
+    )
+    if row:
+        return format_token(row.txid, row.seq)
+    # Everything has been pruned; the horizon is the last entry there was
+    horizon = _horizon()
+    return format_token(*horizon) if horizon else START_TOKEN
+
+def token_expired(token: str) -> bool:
+    """
+    Whether entries after token may have been pruned.
+    """
+    horizon = _horizon()
+    return horizon is not None and parse_token(token) < horizon
+
+def entries_since(token: str, limit: int):
+    """
+    Up to `limit` change_log entries after token, in order.
+    Returns (entries, next token, whether more entries are ready).
+    Raises TokenExpired if entries after token may have been pruned.
+    """
+    txid, seq = parse_token(token)
+    if token_expired(token):
+        raise TokenExpired(token)
+    rows = (
+        db.session.query(ChangeLog.txid, ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .filter(tuple_(ChangeLog.txid, ChangeLog.seq) > tuple_(txid, seq))
+        .filter(ChangeLog.txid < _stable_xmin())
+        .order_by(ChangeLog.txid.asc(), ChangeLog.seq.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    page = rows[:limit]
+    next_token = format_token(page[-1].txid, page[-1].seq) if page else token
+    return page, next_token, len(rows) > limit
+
+def load_changes(entries) -> list[dict]:
+    """
+    Collapse entries to the latest change per entity and attach each entity's current data.
+    Deleted (or since vanished) entities become tombstones: {"entity", "id", "deleted": True}.
+    """
+    latest = {}
+    for entry in entries:
+        # Re-inserting moves the key to the end, so output follows each entity's last change
+        latest.pop((entry.entity, entry.entity_id), None)
+        latest[(entry.entity, entry.entity_id)] = entry.op
+
+    ids = {"recipe": [], "review": [], "comment": [], "recipe_rating": []}
+    for (entity, entity_id), op in latest.items():
+        if op != "delete" or entity == "recipe_rating":
+            ids.setdefault(entity, []).append(entity_id)
+
+    current = {}
+    if ids["recipe"]:
+        current.update({("recipe", r["recipe_id"]): r for r in recipe_cards(ids["recipe"])})
+    if ids["review"]:
+        current.update({("review", r["review_id"]): r for r in review_rows(ids["review"])})
+    if ids["comment"]:
+        rows = (
+            db.session.query(RecipeComment.comment_id, RecipeComment.recipe_id, RecipeComment.comment)
+            .filter(RecipeComment.comment_id.in_(ids["comment"]))
+            .all()
+        )
+        current.update({
+            ("comment", r.comment_id): {"comment_id": r.comment_id, "recipe_id": r.recipe_id, "comment": r.comment}
+            for r in rows
+        })
+    if ids["recipe_rating"]:
+        # A removed vote is still a change to the average, so ratings are always re-read
+        existing = (
+            db.session.query(Recipe.recipe_id)
+            .filter(Recipe.recipe_id.in_(ids["recipe_rating"]))
+            .all()
+        )
+        for r in existing:
+            current[("recipe_rating", r.recipe_id)] = {"recipe_id": r.recipe_id, "averageRating": None}
+        rows = (
+            db.session.query(
+                RecipeRating.recipe_id,
+                func.avg(RecipeRating.rating).cast(db.Numeric(3, 1)).label("avg_rating"),
+            )
+            .filter(RecipeRating.recipe_id.in_(ids["recipe_rating"]))
+            .group_by(RecipeRating.recipe_id)
+            .all()
+        )
+        for r in rows:
+            if ("recipe_rating", r.recipe_id) in current:
+                avg = float(r.avg_rating) if isinstance(r.avg_rating, Decimal) else r.avg_rating
+                current[("recipe_rating", r.recipe_id)]["averageRating"] = avg
+
+    changes = []
+    for (entity, entity_id), op in latest.items():
+        data = current.get((entity, entity_id))
+        if data is None:
+            changes.append({"entity": entity, "id": entity_id, "deleted": True})
+        else:
+            changes.append({"entity": entity, "id": entity_id, "data": data})
+    return changes
+
+def prune_change_log(retention_days: float, batch_size: int = 5000) -> dict:
+    """
+    Delete change_log entries older than retention_days, in committed batches, after moving
+    the horizon up to the newest of them. Returns {"horizon": token or None, "deleted": count}.
+    """
+    cutoff = (
+        db.session.query(ChangeLog.txid, ChangeLog.seq)
+        .filter(ChangeLog.changed_at < func.now() - timedelta(days=retention_days))
+        .filter(ChangeLog.txid < _stable_xmin())
+        .order_by(ChangeLog.txid.desc(), ChangeLog.seq.desc())
+        .first()
+    )
+    if cutoff is None:
+        db.session.commit()
+        horizon = _horizon()
+        return {"horizon": format_token(*horizon) if horizon else None, "deleted": 0}
+
+    # Move the horizon first, so a token is expired before any entry after it is gone
+    stmt = pg_insert(ChangeLogHorizon).values(id=1, txid=cutoff.txid, seq=cutoff.seq)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ChangeLogHorizon.id],
+        set_={"txid": stmt.excluded.txid, "seq": stmt.excluded.seq, "pruned_at": func.now()},
+        where=tuple_(ChangeLogHorizon.txid, ChangeLogHorizon.seq) < tuple_(stmt.excluded.txid, stmt.excluded.seq),
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+    deleted = 0
+    while True:
+        batch = (
+            select(ChangeLog.seq)
+            .where(tuple_(ChangeLog.txid, ChangeLog.seq) <= tuple_(cutoff.txid, cutoff.seq))
+            .limit(batch_size)
+        )
+        count = db.session.execute(delete(ChangeLog).where(ChangeLog.seq.in_(batch))).rowcount
+        db.session.commit()
+        deleted += count
+        if count < batch_size:
+            break
+    return {"horizon": format_token(cutoff.txid, cutoff.seq), "deleted": deleted}
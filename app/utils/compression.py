@@ -0,0 +1,176 @@
+# app/utils/compression.py
+from __future__ import annotations
+
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import g, request
+
+# Below this many bytes compression costs more than it saves
+DEFAULT_MIN_BYTES = 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-msgpack", "text/")
+
+def _gzip(level: int):
+    # mtime=0 keeps the output identical for identical input
+    return lambda body: gzip.compress(body, compresslevel=level, mtime=0)
+
+def _load_encoders() -> dict:
+    """
+    encoding -> (compress on the fly, compress for the cache), best first.
+    brotli and zstandard are optional; without them only gzip is offered.
+    """
+    encoders = {}
+    try:
+        import brotli
+        encoders["br"] = (
+            lambda body: brotli.compress(body, quality=4),
+            lambda body: brotli.compress(body, quality=9),
+        )
+    except ImportError:
+        pass
+    try:
+        import zstandard
+        encoders["zstd"] = (
+            zstandard.ZstdCompressor(level=3).compress,
+            zstandard.ZstdCompressor(level=12).compress,
+        )
+    except ImportError:
+        pass
+    encoders["gzip"] = (_gzip(6), _gzip(9))
+    return encoders
+
+def negotiate(accept_encoding: str | None, offered) -> str | None:
+    """
+    The first of `offered` (in our order of preference) the client accepts, or None for identity.
+    """
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in offered:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+class Compressor:
+    """
+    Compresses JSON and text responses per Accept-Encoding (br, zstd, gzip).
+    Responses of views marked @cache_compressed are compressed once per distinct body: the
+    result is kept in an LRU keyed by (path, encoding, digest of the body), so a list that
+    hasn't changed is never compressed twice, and a new version simply gets a new entry.
+    Streamed responses (the event stream) are left alone.
+    """
+
+    def __init__(self):
+        self.encoders = _load_encoders()
+        self.enabled = False
+        self.min_bytes = DEFAULT_MIN_BYTES
+        self.cache_bytes = 16 * 1024 * 1024
+        self._cache: OrderedDict = OrderedDict()
+        self._cached_size = 0
+        self._lock = threading.Lock()
+        self._stats = {"compressed": 0, "cache_hits": 0, "cache_misses": 0, "bytes_in": 0, "bytes_out": 0}
+
+    def init_app(self, app):
+        self.min_bytes = int(app.config.get("COMPRESSION_MIN_BYTES", DEFAULT_MIN_BYTES))
+        self.cache_bytes = int(app.config.get("COMPRESSION_CACHE_BYTES", self.cache_bytes))
+        self.enabled = bool(app.config.get("COMPRESSION_ENABLED", True))
+        if self.enabled:
+            app.after_request(self._after_request)
+
+    def should_compress(self, mimetype: str | None, size: int) -> bool:
+        return size >= self.min_bytes and bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+    def compress(self, body: bytes, encoding: str, cache_key: str | None = None) -> bytes:
+        """
+        body compressed with encoding; reused from the cache when cache_key is given.
+        """
+        on_the_fly, for_cache = self.encoders[encoding]
+        if cache_key is None:
+            out = on_the_fly(body)
+            self._count(body, out)
+            return out
+
+        key = (cache_key, encoding, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            out = self._cache.get(key)
+            if out is not None:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return out
+            self._stats["cache_misses"] += 1
+
+        out = for_cache(body)
+        self._count(body, out)
+        with self._lock:
+            if key not in self._cache and len(out) <= self.cache_bytes:
+                self._cache[key] = out
+                self._cached_size += len(out)
+                while self._cached_size > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_size -= len(evicted)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "encodings": list(self.encoders),
+                "cache_entries": len(self._cache),
+                "cache_bytes": self._cached_size,
+            }
+
+    def _count(self, body: bytes, out: bytes):
+        with self._lock:
+            self._stats["compressed"] += 1
+            self._stats["bytes_in"] += len(body)
+            self._stats["bytes_out"] += len(out)
+
+    def _after_request(self, response):
+        if (
+            response.is_streamed
+            or response.direct_passthrough
+            or response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or not self.should_compress(response.mimetype, response.content_length or 0)
+        ):
+            return response
+
+        # Whatever we send, caches must keep the variants apart
+        response.vary.add("Accept-Encoding")
+        encoding = negotiate(request.headers.get("Accept-Encoding"), self.encoders)
+        if encoding is None:
+            return response
+
+        cache_key = request.full_path if g.get("cache_compressed") else None
+        response.set_data(self.compress(response.get_data(), encoding, cache_key))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+compressor = Compressor()
+
+def cache_compressed(f):
+    """
+    Keep this view's compressed bodies so an unchanged response is compressed only once.
+    For views whose output depends only on the URL, not on the user.
+    """
+    @functools.wraps(f)
+    def decorated(*args, **kwargs):
+        g.cache_compressed = True
+        return f(*args, **kwargs)
+
+    return decorated
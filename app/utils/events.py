@@ -0,0 +1,175 @@
+# app/utils/events.py
+from __future__ import annotations
+
+import json
+import queue
+import select
+import sys
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+from ..extensions import db
+
+# (change_log entity, op) -> SSE event name; anything else isn't pushed to clients
+EVENT_TYPES = {
+    ("review", "insert"): "review",
+    ("comment", "insert"): "comment",
+    ("recipe_rating", "insert"): "rating",
+    ("recipe_rating", "update"): "rating",
+    ("recipe_rating", "delete"): "rating",
+}
+
+CHANNEL = "change_log"
+
+# Sent instead of an event when a subscriber fell behind or can't be resumed; clients should
+# catch up through /api/sync and reconnect
+RESYNC = ("resync", None, "{}")
+
+def cooperative_worker() -> bool:
+    """
+    True when running under gevent (gunicorn -k gevent), where an idle stream costs a greenlet
+    instead of a whole worker.
+    """
+    gevent_monkey = sys.modules.get("gevent.monkey")
+    return bool(gevent_monkey and gevent_monkey.is_module_patched("socket"))
+
+class Subscription:
+    def __init__(self, maxsize: int):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+class EventBroker:
+    """
+    Fans Postgres NOTIFYs out to Server-Sent Events subscribers.
+    One listener thread (and one DB connection) per worker process serves every open stream.
+    Recent events are kept so a reconnecting client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._history: deque = deque()
+        self._listener = None
+
+    def init_app(self, app):
+        self.app = app
+        self.history_size = int(app.config.get("EVENTS_HISTORY_SIZE", 1000))
+        self.queue_size = int(app.config.get("EVENTS_SUBSCRIBER_QUEUE_SIZE", 100))
+        self._history = deque(maxlen=self.history_size)
+
+    def subscribe(self, last_event_id: str | None = None):
+        """
+        Returns (subscription, events to replay first).
+        """
+        self._ensure_listener()
+        sub = Subscription(self.queue_size)
+        with self._lock:
+            replay = []
+            if last_event_id:
+                ids = [event[1] for event in self._history]
+                if last_event_id in ids:
+                    replay = list(self._history)[ids.index(last_event_id) + 1:]
+                else:
+                    replay = [RESYNC]
+            self._subscribers.add(sub)
+        return sub, replay
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _publish(self, events):
+        with self._lock:
+            if events and events[0] is not RESYNC:
+                self._history.extend(events)
+            for sub in list(self._subscribers):
+                try:
+                    for event in events:
+                        sub.queue.put_nowait(event)
+                except queue.Full:
+                    # Too slow to keep up: drop it and let the client resync
+                    self._subscribers.discard(sub)
+                    _drain(sub.queue)
+                    sub.queue.put_nowait(RESYNC)
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._listener.is_alive():
+            return
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen_forever, name="event-listener", daemon=True)
+                self._listener.start()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                self.app.logger.warning("Event listener disconnected, reconnecting in %ss: %s", backoff, e)
+            # Anything sent while disconnected is lost, so tell everyone to catch up
+            with self._lock:
+                self._history.clear()
+            self._publish([RESYNC])
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _listen(self):
+        import psycopg2
+
+        with self.app.app_context():
+            url = db.engine.url
+        conn = psycopg2.connect(**url.translate_connect_args(username="user", database="dbname"))
+        try:
+            conn.autocommit = True
+            conn.cursor().execute(f"LISTEN {CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                entries = []
+                while conn.notifies:
+                    payload = json.loads(conn.notifies.pop(0).payload)
+                    entries.append(SimpleNamespace(
+                        token=f"{payload['txid']}.{payload['seq']}",
+                        entity=payload["entity"],
+                        entity_id=payload["id"],
+                        op=payload["op"],
+                    ))
+                entries = [e for e in entries if (e.entity, e.op) in EVENT_TYPES]
+                if entries:
+                    self._publish(self._build_events(entries))
+        finally:
+            conn.close()
+
+    def _build_events(self, entries):
+        from .changes import load_changes
+
+        with self.app.app_context():
+            changes = load_changes(entries)
+
+        # load_changes collapses repeats, so each event takes the id of that entity's last entry
+        last = {}
+        for entry in entries:
+            last[(entry.entity, entry.entity_id)] = entry
+        events = []
+        for change in changes:
+            entry = last[(change["entity"], change["id"])]
+            if "data" not in change:
+                continue  # gone again before we could read it
+            events.append((EVENT_TYPES[(entry.entity, entry.op)], entry.token, json.dumps(change["data"])))
+        return events
+
+def _drain(q: queue.Queue):
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+
+broker = EventBroker()
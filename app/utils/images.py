@@ -0,0 +1,161 @@
+# app/utils/images.py
+from __future__ import annotations
+
+import io
+import os
+
+from flask import current_app
+
+from ..extensions import db
+from ..models.recipe import Recipe
+from .background import background
+from .s3 import s3_client, upload_to_s3
+
+class ImageTooLarge(ValueError):
+    pass
+
+def cloudfront_url(key: str) -> str:
+    """
+    Build the public CloudFront URL for a given S3 key.
+    """
+    base = os.environ.get("CLOUDFRONT_IMG_BASE_URL")
+    return f"{base}/{key.lstrip('/')}"
+
+def image_srcset(variants: dict | None) -> dict | None:
+    """
+    {"160w": url, "320w": url, ...} for a recipe's rec_img_variants, smallest first,
+    or None until its thumbnails exist.
+    """
+    if not variants:
+        return None
+    return {
+        f"{width}w": cloudfront_url(key)
+        for width, key in sorted(variants.items(), key=lambda item: int(item[0]))
+    }
+
+def key_from_url(url: str) -> str | None:
+    """
+    The S3 key behind a recipe image URL, or None if the image isn't in our bucket.
+    """
+    bases = []
+    cloudfront_base = os.environ.get("CLOUDFRONT_IMG_BASE_URL")
+    if cloudfront_base:
+        bases.append(cloudfront_base.rstrip("/") + "/")
+    bucket = os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs")
+    bases.append(f"https://{bucket}.s3.{os.environ.get('AWS_REGION')}.amazonaws.com/")
+
+    for base in bases:
+        if url.startswith(base) and len(url) > len(base):
+            return url[len(base):]
+    return None
+
+def variant_key(key: str, width: int) -> str:
+    # imgs/<user>/<uuid>.jpg -> imgs/<user>/<uuid>_w320.webp
+    return f"{key.rsplit('.', 1)[0]}_w{width}.webp"
+
+def render_thumbnails(data: bytes) -> dict[int, bytes]:
+    """
+    Encode the image at each of THUMBNAIL_WIDTHS as WebP, keeping the aspect ratio, keyed by
+    actual width. Images are never upscaled: widths larger than the original are skipped,
+    except that an image smaller than every width still gets one variant at its own size.
+    Needs an app context. Raises ImageTooLarge for images over THUMBNAIL_MAX_PIXELS.
+    """
+    from PIL import Image, ImageOps
+
+    max_pixels = current_app.config["THUMBNAIL_MAX_PIXELS"]
+    out = {}
+    try:
+        # Only reads the header; pixels are decoded later
+        source = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    with source as img:
+        if img.width * img.height > max_pixels:
+            raise ImageTooLarge(f"{img.width}x{img.height} image is over THUMBNAIL_MAX_PIXELS ({max_pixels})")
+        # Phone photos are often stored sideways with an EXIF rotation
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or "A" in img.getbands() else "RGB")
+
+        for width in current_app.config["THUMBNAIL_WIDTHS"]:
+            if width >= img.width and out:
+                break
+            target = min(width, img.width)
+            height = max(1, round(img.height * target / img.width))
+            thumb = img.resize((target, height), Image.LANCZOS)
+
+            buf = io.BytesIO()
+            thumb.save(buf, "WEBP", quality=current_app.config["THUMBNAIL_QUALITY"], method=4)
+            out[target] = buf.getvalue()
+    return out
+
+def generate_thumbnails(recipe_id: int, img_url: str) -> dict | None:
+    """
+    Make and upload the thumbnails of a recipe's image and store their keys on the recipe.
+    Needs an app context. Returns the stored variants, or None when the image isn't ours or
+    the recipe has since moved to another image. Raises ImageTooLarge for objects over
+    RECIPE_IMAGE_MAX_BYTES (without downloading them) or images over THUMBNAIL_MAX_PIXELS.
+    """
+    from werkzeug.datastructures import FileStorage
+
+    key = key_from_url(img_url)
+    if key is None:
+        return None
+
+    bucket = os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs")
+    max_bytes = current_app.config["RECIPE_IMAGE_MAX_BYTES"]
+    obj = s3_client().get_object(Bucket=bucket, Key=key)
+    if obj["ContentLength"] > max_bytes:
+        obj["Body"].close()
+        raise ImageTooLarge(f"{key} is {obj['ContentLength']} bytes, over RECIPE_IMAGE_MAX_BYTES ({max_bytes})")
+    original = obj["Body"].read(max_bytes + 1)
+    if len(original) > max_bytes:
+        raise ImageTooLarge(f"{key} is over RECIPE_IMAGE_MAX_BYTES ({max_bytes})")
+
+    variants = {}
+    for width, data in render_thumbnails(original).items():
+        thumb_key = variant_key(key, width)
+        upload_to_s3(FileStorage(stream=io.BytesIO(data), content_type="image/webp"), thumb_key)
+        variants[str(width)] = thumb_key
+
+    updated = (
+        db.session.query(Recipe)
+        .filter(Recipe.recipe_id == recipe_id, Recipe.rec_img_url == img_url)
+        .update({Recipe.rec_img_variants: variants}, synchronize_session=False)
+    )
+    db.session.commit()
+    if not updated:
+        return None
+    # The recipe cards in the catalog snapshot now have a srcset
+    from .snapshots import snapshots
+    snapshots.schedule()
+    return variants
+
+def check_upload_size(img_url: str):
+    """
+    Raise ImageTooLarge if the uploaded image behind img_url is over RECIPE_IMAGE_MAX_BYTES.
+    Presigned PUT URLs can't limit what gets uploaded, so this runs before a recipe may point
+    at an upload. Images outside our bucket, or that S3 can't report on right now, pass:
+    the thumbnailer checks the size again before it downloads anything.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    key = key_from_url(img_url)
+    if key is None:
+        return
+    bucket = os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs")
+    max_bytes = current_app.config["RECIPE_IMAGE_MAX_BYTES"]
+    try:
+        size = s3_client().head_object(Bucket=bucket, Key=key)["ContentLength"]
+    except (BotoCoreError, ClientError) as e:
+        current_app.logger.warning("Could not check the size of %s: %s", key, e)
+        return
+    if size > max_bytes:
+        raise ImageTooLarge(f"Image is larger than the {max_bytes / (1024 * 1024):g}MB limit")
+
+def schedule_thumbnails(recipe_id: int, img_url: str):
+    """
+    Generate a recipe's thumbnails once the current transaction commits. Until they exist
+    (or if that fails) the recipe keeps serving just the original image.
+    """
+    background.after_commit("thumbnails", generate_thumbnails, recipe_id, img_url)
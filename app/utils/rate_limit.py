@@ -0,0 +1,195 @@
+# app/utils/rate_limit.py
+from __future__ import annotations
+
+import fcntl
+import functools
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, jsonify, request
+
+from .auth import current_user_encrypted
+
+# One bucket per slot: key hash, tokens left, last update (CLOCK_MONOTONIC is system-wide on
+# Linux, so every worker on the host agrees on it)
+SLOT = struct.Struct("=Qdd")
+
+# Requests proxied by Nginx come from here; the client address is then in X-Real-IP
+TRUSTED_PROXIES = {"127.0.0.1", "::1"}
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """
+    "20/3600" -> (capacity 20, refill 20/3600 tokens per second).
+    """
+    count, seconds = spec.split("/")
+    count, seconds = float(count), float(seconds)
+    if count <= 0 or seconds <= 0:
+        raise ValueError(f"Invalid rate limit {spec!r}")
+    return count, count / seconds
+
+class RateLimiter:
+    """
+    Token buckets shared by every worker on the host through a memory-mapped file
+    (in /dev/shm by default). Buckets live in a fixed table of slots addressed by a hash
+    of (route, user or IP); each decision locks just its slot, with an fcntl record lock
+    across processes and a striped lock across threads. When two keys collide in a slot,
+    the newer one takes it over and the older starts from a full bucket next time, so
+    collisions can only let requests through, never block them.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.limits: dict[str, dict[str, tuple[float, float]]] = {}
+        self._mm = None
+        self._fd = None
+        self._pid = None
+        self._open_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(64)]
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get("RATE_LIMIT_ENABLED", True))
+        self.slots = int(app.config.get("RATE_LIMIT_SLOTS", 65536))
+        self.path = app.config.get("RATE_LIMIT_FILE") or _default_path()
+        self.limits = {}
+        for route, kinds in app.config.get("RATE_LIMITS", {}).items():
+            self.limits[route] = {}
+            for kind, spec in kinds.items():
+                # e.g. RATE_LIMIT_ADD_COMMENT_USER=10/60 overrides the default for that route
+                spec = os.environ.get(f"RATE_LIMIT_{route.upper()}_{kind.upper()}", spec)
+                if spec:
+                    self.limits[route][kind] = parse_limit(spec)
+
+    def check(self, route: str, keys: dict[str, str | bytes]) -> float:
+        """
+        Take a token from each of route's buckets for the given keys, e.g.
+        {"user": user_encrypted, "ip": "1.2.3.4"}. Returns 0 when allowed, otherwise the
+        seconds until the request would be. A refused request costs nothing: tokens taken
+        from the buckets that allowed it are put back.
+        """
+        wait = 0.0
+        taken = []
+        for kind, (capacity, rate) in self.limits.get(route, {}).items():
+            ident = keys.get(kind)
+            if ident is None:
+                continue
+            key = _key_hash(route, kind, ident)
+            bucket_wait = self._take(key, capacity, rate)
+            if bucket_wait > 0:
+                wait = max(wait, bucket_wait)
+            else:
+                taken.append((key, capacity))
+        if wait > 0:
+            for key, capacity in taken:
+                self._refund(key, capacity)
+        return wait
+
+    def _take(self, key: int, capacity: float, rate: float) -> float:
+        with self._slot(key) as (mm, offset):
+            now = time.monotonic()
+            stored_key, tokens, updated = SLOT.unpack_from(mm, offset)
+            if stored_key != key or updated > now:
+                tokens = capacity
+            else:
+                tokens = min(capacity, tokens + (now - updated) * rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / rate
+            SLOT.pack_into(mm, offset, key, tokens, now)
+        return wait
+
+    def _refund(self, key: int, capacity: float):
+        with self._slot(key) as (mm, offset):
+            stored_key, tokens, updated = SLOT.unpack_from(mm, offset)
+            # Taken over by a colliding key in the meantime: that one starts full anyway
+            if stored_key == key:
+                SLOT.pack_into(mm, offset, key, min(capacity, tokens + 1), updated)
+
+    @contextmanager
+    def _slot(self, key: int):
+        """
+        Hold key's slot locked against other threads and processes; yields (mmap, offset).
+        """
+        mm, fd = self._table()
+        slot = key % self.slots
+        offset = slot * SLOT.size
+        with self._stripes[slot % len(self._stripes)]:
+            fcntl.lockf(fd, fcntl.LOCK_EX, SLOT.size, offset)
+            try:
+                yield mm, offset
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, SLOT.size, offset)
+
+    def _table(self):
+        if self._pid == os.getpid():
+            return self._mm, self._fd
+        with self._open_lock:
+            if self._pid != os.getpid():
+                # Opened per process: the mapping is shared, but fcntl locks belong to the opener
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                size = self.slots * SLOT.size
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                self._mm = mmap.mmap(fd, size, mmap.MAP_SHARED)
+                self._fd = fd
+                self._pid = os.getpid()
+        return self._mm, self._fd
+
+def _default_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "sophs-rate-limit")
+
+def _key_hash(route: str, kind: str, ident: str | bytes) -> int:
+    if isinstance(ident, str):
+        ident = ident.encode()
+    digest = hashlib.blake2b(f"{route}:{kind}:".encode() + ident, digest_size=8).digest()
+    # 0 marks an empty slot
+    return int.from_bytes(digest, "little") or 1
+
+def client_ip() -> str | None:
+    if request.remote_addr in TRUSTED_PROXIES:
+        return request.headers.get("X-Real-IP") or request.remote_addr
+    return request.remote_addr
+
+limiter = RateLimiter()
+
+def rate_limited(route: str):
+    """
+    Limit a view per user and per client IP with the buckets configured for route in
+    RATE_LIMITS. Goes below @require_auth so the user is known; answers 429 with Retry-After.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated(*args, **kwargs):
+            if limiter.enabled:
+                authenticated = getattr(g, "authlib_server_oauth2_token", None) is not None
+                keys = {
+                    # Kept on g for the view, which needs the same hash
+                    "user": current_user_encrypted() if authenticated else None,
+                    "ip": client_ip(),
+                }
+                try:
+                    wait = limiter.check(route, keys)
+                except OSError as e:
+                    # Never turn a limiter problem into an outage
+                    limiter.app.logger.warning("Rate limiter unavailable, allowing request: %s", e)
+                    wait = 0.0
+                if wait > 0:
+                    return jsonify({"message": "Too many requests, please try again later"}), 429, {
+                        "Retry-After": str(math.ceil(wait)),
+                    }
+            return f(*args, **kwargs)
+
+        return decorated
+    return decorator
@@ -0,0 +1,24 @@
+# app/utils/refresh.py
+# Shared by the per-worker in-memory copies of tables (rest_type_registry.py, autocomplete.py)
+from __future__ import annotations
+
+import time
+
+from ..extensions import db
+
+# Past this fraction of the TTL, reads still use the snapshot but trigger a background reload,
+# so requests don't wait on the DB when it expires
+REFRESH_AHEAD_FRACTION = 0.8
+
+def due_for_refresh(loaded_at: float, ttl_seconds: float) -> bool:
+    """
+    Whether a snapshot loaded at loaded_at (time.monotonic()) should be reloaded ahead of expiry.
+    """
+    return time.monotonic() - loaded_at >= ttl_seconds * REFRESH_AHEAD_FRACTION
+
+def own_connection():
+    """
+    A connection straight from the engine for loading a snapshot, so callers' sessions aren't
+    left with an open transaction. Use as a context manager; needs an app context.
+    """
+    return db.engine.connect()
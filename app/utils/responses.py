@@ -0,0 +1,39 @@
+# app/utils/responses.py
+from __future__ import annotations
+
+from flask import current_app, jsonify, request
+from werkzeug.datastructures import MIMEAccept
+
+# Optional: without msgpack installed every response is JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+def negotiate_mimetype(accept: MIMEAccept) -> str:
+    """
+    The body format to send for an Accept header: JSON unless the client prefers MessagePack.
+    """
+    if msgpack is None:
+        return JSON_MIMETYPE
+    # On a tie (e.g. */*) the first offer wins, so JSON stays the default
+    return accept.best_match((JSON_MIMETYPE, *MSGPACK_MIMETYPES), default=JSON_MIMETYPE)
+
+def packb(obj) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+def respond(obj):
+    """
+    Like jsonify(obj), but sent as MessagePack when the request has Accept: application/msgpack.
+    For successful payloads of the read endpoints; errors stay JSON.
+    """
+    mimetype = negotiate_mimetype(request.accept_mimetypes)
+    if mimetype == JSON_MIMETYPE:
+        response = jsonify(obj)
+    else:
+        response = current_app.response_class(packb(obj), mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,123 @@
+# app/utils/rest_type_registry.py
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import select
+
+from ..models.restaurant_type import RestaurantType
+from .background import background
+from .refresh import due_for_refresh, own_connection
+
+class RestaurantTypeRegistry:
+    """
+    Process-wide, in-memory copy of rest_types.
+    Loaded once on first use and reloaded after REST_TYPE_REGISTRY_TTL_SECONDS, so reads
+    never touch the DB while the registry is warm. Loading needs an app context.
+    Reads close to expiry refresh it ahead of time on the background executor, and a name
+    that isn't in the copy is looked up again before it is reported as unknown.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.ttl_seconds = 300.0
+        self._lock = threading.Lock()
+        # (sorted names, name -> id, loaded_at); replaced as a whole so readers never need the lock
+        self._snapshot = None
+        self._refreshing = False
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl_seconds = float(app.config.get("REST_TYPE_REGISTRY_TTL_SECONDS", 300))
+
+    def names(self) -> list[str]:
+        """
+        All restaurant type names, in the DB's ORDER BY rest_type order.
+        """
+        return self._current()[0]
+
+    def cached_names(self) -> list[str] | None:
+        """
+        Like names(), but returns None instead of loading when the registry is cold or stale.
+        Lets async callers decide where the blocking reload runs.
+        """
+        snapshot = self._snapshot
+        if not self._is_fresh(snapshot):
+            return None
+        self._maybe_refresh_ahead(snapshot)
+        return snapshot[0]
+
+    def id_for(self, name: str) -> int | None:
+        """
+        The id of the restaurant type called name, or None if there is none. A miss reloads
+        the registry first, so a type added by another process is found before the TTL is up.
+        """
+        snapshot = self._current()
+        rest_type_id = snapshot[1].get(name)
+        if rest_type_id is not None:
+            return rest_type_id
+        with self._lock:
+            # Skip the reload if another thread already did one while we waited
+            if self._snapshot is snapshot:
+                self._load_locked()
+            return self._snapshot[1].get(name)
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "loaded": snapshot is not None,
+            "fresh": self._is_fresh(snapshot),
+            "age_seconds": round(time.monotonic() - snapshot[2], 1) if snapshot else None,
+            "count": len(snapshot[0]) if snapshot else 0,
+        }
+
+    def load(self):
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        with own_connection() as conn:
+            rows = conn.execute(
+                select(RestaurantType.rest_type_id, RestaurantType.rest_type)
+                .order_by(RestaurantType.rest_type.asc())
+            ).all()
+        names = [r.rest_type for r in rows]
+        ids = {r.rest_type: r.rest_type_id for r in rows}
+        self._snapshot = (names, ids, time.monotonic())
+        return self._snapshot
+
+    def _is_fresh(self, snapshot) -> bool:
+        return (
+            snapshot is not None
+            and time.monotonic() - snapshot[2] < self.ttl_seconds
+        )
+
+    def _maybe_refresh_ahead(self, snapshot):
+        if self._refreshing or not due_for_refresh(snapshot[2], self.ttl_seconds):
+            return
+        self._refreshing = True
+        if not background.submit("rest_type_registry_refresh", self._refresh, snapshot):
+            self._refreshing = False
+
+    def _refresh(self, snapshot):
+        try:
+            with self._lock:
+                # Skip if a reader already reloaded it
+                if self._snapshot is snapshot:
+                    self._load_locked()
+        finally:
+            self._refreshing = False
+
+    def _current(self):
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self._maybe_refresh_ahead(snapshot)
+            return snapshot
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if self._is_fresh(self._snapshot):
+                return self._snapshot
+            return self._load_locked()
+
+rest_type_registry = RestaurantTypeRegistry()
@@ -0,0 +1,51 @@
+# app/utils/s3.py
+from __future__ import annotations
+
+import os
+import threading
+
+# boto3/botocore are imported on first use so importing the app stays fast
+_s3 = None
+_s3_lock = threading.Lock()
+
+def s3_client():
+    """
+    Returns the process-wide S3 client, creating it on first use.
+    Clients are thread-safe but not fork-safe, so this must not be called before gunicorn forks.
+    """
+    global _s3
+    if _s3 is None:
+        with _s3_lock:
+            if _s3 is None:
+                import boto3
+                # S3_ENDPOINT_URL points at a local S3 stand-in (MinIO, moto) during development
+                _s3 = boto3.client(
+                    "s3",
+                    region_name=os.environ.get("AWS_REGION"),
+                    endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+                )
+    return _s3
+
+def upload_to_s3(file_storage, key: str) -> str:
+    """
+    Uploads to S3 and returns the public URL matching your Next.js URL format.
+    Requires AWS creds available via env/instance role.
+    """
+    from botocore.exceptions import BotoCoreError, ClientError
+
+    bucket = os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs")
+    region = os.environ.get("AWS_REGION")
+
+    s3 = s3_client()
+
+    # Optional: set content type
+    extra_args = {}
+    if getattr(file_storage, "mimetype", None):
+        extra_args["ContentType"] = file_storage.mimetype
+
+    try:
+        s3.upload_fileobj(file_storage.stream, bucket, key, ExtraArgs=extra_args)
+    except (BotoCoreError, ClientError) as e:
+        raise RuntimeError(f"S3 upload failed: {e}")
+
+    return f"https://{bucket}.s3.{region}.amazonaws.com/{key}"
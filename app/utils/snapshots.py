@@ -0,0 +1,302 @@
+# app/utils/snapshots.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+
+from ..extensions import db
+from ..queries.recipes import recipe_cards
+from .background import background
+from .images import cloudfront_url
+from .s3 import s3_client
+
+# pg_advisory_lock key, so only one process on any host publishes at a time ("snap")
+SNAPSHOT_LOCK_KEY = 0x736E6170
+
+MANIFEST_NAME = "manifest.json"
+
+# Shards are content-addressed and never rewritten; the manifest is what changes
+SHARD_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=60"
+
+def _encode(obj) -> bytes:
+    # Same encoding as jsonify, so a shard holds exactly what the API would return
+    return (json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+###########
+# BACKENDS
+###########
+
+class LocalBackend:
+    """
+    Writes snapshot files under a directory, e.g. for tests or when nginx serves them itself.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def read(self, key: str) -> bytes | None:
+        try:
+            return (self.directory / key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, body: bytes, content_type: str, cache_control: str, content_encoding: str | None = None):
+        path = self.directory / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see half a file
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+
+class S3Backend:
+    """
+    Writes snapshot files to the image bucket under prefix, served by the same CloudFront distribution.
+    """
+
+    def __init__(self, bucket: str, prefix: str):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def read(self, key: str) -> bytes | None:
+        from botocore.exceptions import ClientError
+        try:
+            obj = s3_client().get_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+        return obj["Body"].read()
+
+    def write(self, key: str, body: bytes, content_type: str, cache_control: str, content_encoding: str | None = None):
+        extra = {"ContentEncoding": content_encoding} if content_encoding else {}
+        s3_client().put_object(
+            Bucket=self.bucket,
+            Key=self._key(key),
+            Body=body,
+            ContentType=content_type,
+            CacheControl=cache_control,
+            **extra,
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+#############
+# PUBLISHER
+#############
+
+class SnapshotPublisher:
+    """
+    Publishes the public catalog (recipe cards and restaurant types) as static files, so
+    anonymous clients can read it from the CDN instead of the API:
+
+        manifest.json                       which shards make up the current version
+        recipes/0003.<hash>.json.gz         cards of recipe_id 750-999 with the default SNAPSHOT_SHARD_SIZE
+        restaurant-types.<hash>.json.gz
+
+    Shards hold {"rows": [...]} exactly as the list endpoints return them, gzipped, and are
+    named by a hash of their content. A publish only uploads shards whose content changed and
+    only rewrites the manifest when at least one did, so a new recipe costs one shard. The
+    manifest also carries a sync token taken before the data was read: clients load the
+    shards, then follow /api/sync?since=<token> for what changed afterwards.
+
+    Writes call schedule(); publishes are debounced per worker (SNAPSHOT_DEBOUNCE_SECONDS
+    after the last write, SNAPSHOT_MAX_DELAY_SECONDS at most) and serialized across workers
+    and hosts with a Postgres advisory lock. scripts/publish_catalog.py publishes on a schedule.
+    Old shards are left in place for clients still reading an older manifest.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._timer = None
+        self._first_at = None
+        self._last_at = None
+        self._stats = {"publishes": 0, "unchanged": 0, "failures": 0, "last": None}
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get("SNAPSHOT_ENABLED", False))
+        self.shard_size = int(app.config.get("SNAPSHOT_SHARD_SIZE", 250))
+        self.debounce_seconds = float(app.config.get("SNAPSHOT_DEBOUNCE_SECONDS", 10))
+        self.max_delay_seconds = float(app.config.get("SNAPSHOT_MAX_DELAY_SECONDS", 60))
+        self.lock_timeout_ms = int(float(app.config.get("SNAPSHOT_LOCK_TIMEOUT_SECONDS", 60)) * 1000)
+        self.backend_name = app.config.get("SNAPSHOT_BACKEND", "s3")
+        self.prefix = app.config.get("SNAPSHOT_PREFIX", "catalog")
+        self.directory = app.config.get("SNAPSHOT_DIR")
+        self.base_url = app.config.get("SNAPSHOT_BASE_URL")
+
+    def backend(self):
+        if self.backend_name == "local":
+            return LocalBackend(self.directory)
+        return S3Backend(os.environ.get("S3_BUCKET_NAME", "sophs-menu-imgs"), self.prefix)
+
+    def manifest_url(self) -> str | None:
+        """
+        Public URL of the manifest; shard paths in it are relative to this.
+        """
+        if not self.enabled:
+            return None
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{MANIFEST_NAME}"
+        if self.backend_name == "local":
+            return (Path(self.directory).resolve() / MANIFEST_NAME).as_uri()
+        return cloudfront_url(f"{self.prefix}/{MANIFEST_NAME}")
+
+    def schedule(self):
+        """
+        Publish soon: once writes have stopped for SNAPSHOT_DEBOUNCE_SECONDS, or after
+        SNAPSHOT_MAX_DELAY_SECONDS if they don't. Call after the write is committed.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._last_at = now
+            if self._timer is None:
+                self._first_at = now
+                self._start_timer(self.debounce_seconds)
+
+    def publish(self) -> dict:
+        """
+        Render the catalog and upload what changed. Needs an app context.
+        Returns a summary: manifest version, shards written and unchanged, whether a new
+        manifest was written, seconds taken.
+        """
+        started = time.monotonic()
+        # Session-level lock on a connection of our own, held until the manifest is written
+        with db.engine.connect() as lock_conn:
+            # SET LOCAL: the pooled connection goes back with its usual settings
+            lock_conn.execute(text(f"SET LOCAL lock_timeout = {self.lock_timeout_ms}"))
+            lock_conn.execute(select(func.pg_advisory_lock(SNAPSHOT_LOCK_KEY)))
+            lock_conn.commit()
+            try:
+                summary = self._publish_locked()
+            finally:
+                lock_conn.execute(select(func.pg_advisory_unlock(SNAPSHOT_LOCK_KEY)))
+                lock_conn.commit()
+
+        summary["seconds"] = round(time.monotonic() - started, 3)
+        with self._lock:
+            self._stats["publishes" if summary["manifest_written"] else "unchanged"] += 1
+            self._stats["last"] = summary
+        return summary
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "pending": self._timer is not None,
+                **self._stats,
+            }
+
+    def _publish_locked(self) -> dict:
+        from .changes import head_token, token_expired
+        from .rest_type_registry import rest_type_registry
+
+        backend = self.backend()
+        previous = backend.read(MANIFEST_NAME)
+        previous = json.loads(previous) if previous else None
+        known = {
+            shard["path"]
+            for dataset in (previous or {}).get("datasets", {}).values()
+            for shard in dataset["shards"]
+        }
+
+        # Taken before reading, so the data already includes everything up to the token
+        sync_token = head_token()
+        db.session.commit()
+
+        shards = {}
+        for card in sorted(recipe_cards(), key=lambda card: card["recipe_id"]):
+            shards.setdefault(card["recipe_id"] // self.shard_size, []).append(card)
+        datasets = {
+            "recipes": [(f"recipes/{index:04d}", rows) for index, rows in sorted(shards.items())],
+            "restaurant_types": [("restaurant-types", rest_type_registry.load()[0])],
+        }
+        db.session.commit()
+
+        written = unchanged = 0
+        manifest_datasets = {}
+        for name, parts in datasets.items():
+            entries = []
+            for stem, rows in parts:
+                body = _encode({"rows": rows})
+                digest = hashlib.sha256(body).hexdigest()
+                path = f"{stem}.{digest[:16]}.json.gz"
+                if path in known:
+                    unchanged += 1
+                else:
+                    # mtime=0 keeps the file identical for identical content
+                    backend.write(
+                        path,
+                        gzip.compress(body, compresslevel=9, mtime=0),
+                        content_type="application/json",
+                        content_encoding="gzip",
+                        cache_control=SHARD_CACHE_CONTROL,
+                    )
+                    written += 1
+                entries.append({"path": path, "sha256": digest, "count": len(rows)})
+            manifest_datasets[name] = {"count": sum(e["count"] for e in entries), "shards": entries}
+
+        same_shards = previous is not None and {
+            name: [s["path"] for s in dataset["shards"]] for name, dataset in previous["datasets"].items()
+        } == {
+            name: [s["path"] for s in dataset["shards"]] for name, dataset in manifest_datasets.items()
+        }
+        # A manifest whose token has been pruned past would send every client into a resync loop
+        if same_shards and not token_expired(previous["sync_token"]):
+            return {"version": previous["version"], "written": 0, "unchanged": unchanged, "manifest_written": False}
+
+        manifest = {
+            "version": (previous["version"] + 1) if previous else 1,
+            "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "sync_token": sync_token,
+            "shard_size": self.shard_size,
+            "datasets": manifest_datasets,
+        }
+        backend.write(
+            MANIFEST_NAME,
+            json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"),
+            content_type="application/json",
+            cache_control=MANIFEST_CACHE_CONTROL,
+        )
+        return {"version": manifest["version"], "written": written, "unchanged": unchanged, "manifest_written": True}
+
+    def _start_timer(self, delay: float):
+        # Called with the lock held
+        self._timer = threading.Timer(delay, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            now = time.monotonic()
+            quiet_at = self._last_at + self.debounce_seconds
+            deadline = self._first_at + self.max_delay_seconds
+            if now < min(quiet_at, deadline):
+                # More writes came in; wait for them to stop
+                self._start_timer(min(quiet_at, deadline) - now)
+                return
+            self._timer = None
+        background.submit("catalog_snapshot", self._publish_task)
+
+    def _publish_task(self):
+        try:
+            self.publish()
+        except Exception:
+            with self._lock:
+                self._stats["failures"] += 1
+            raise
+
+snapshots = SnapshotPublisher()
@@ -0,0 +1,114 @@
+# app/utils/statement_cache.py
+from __future__ import annotations
+
+import threading
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, default
+
+# ExecutionContext.cache_hit -> counter name
+_OUTCOMES = {
+    default.CACHE_HIT: "hits",
+    default.CACHE_MISS: "misses",
+    default.CACHING_DISABLED: "disabled",
+    default.NO_CACHE_KEY: "no_key",
+    default.NO_DIALECT_SUPPORT: "no_dialect_support",
+}
+
+# Outcome names, in the order of each thread's counts list
+_NAMES = list(_OUTCOMES.values())
+_INDEX = {cache_hit: _NAMES.index(name) for cache_hit, name in _OUTCOMES.items()}
+
+class _ThreadCounts:
+    """
+    One thread's counts. Lives in a threading.local, so it goes away with its thread (or
+    greenlet, under gevent) and a finalizer moves its counts into the retired totals.
+    """
+
+    __slots__ = ("counts", "__weakref__")
+
+    def __init__(self):
+        self.counts = [0] * len(_NAMES)
+
+class StatementCacheStats:
+    """
+    Counts how the statements this worker executes fared in SQLAlchemy's compiled cache
+    (Engine query_cache_size, DB_QUERY_CACHE_SIZE): a hit reuses the SQL string compiled for
+    an earlier execution of an equivalent statement, a miss compiles it. SQL run with
+    exec_driver_sql() isn't compiled and isn't counted. Covers every engine in the process,
+    including the async read path's.
+
+    Each thread counts into its own list without locking; stats() adds them up when
+    /api/metrics is read, so totals can trail executions still in flight by a few.
+
+    Statements that build their construct per request still hit once warm; a steady trickle
+    of misses or no_key executions points at a query whose structure changes per call (e.g.
+    literal values instead of bound parameters), see app/queries.
+    """
+
+    def __init__(self):
+        self.app = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # id(_ThreadCounts) -> its counts list, for every thread that has counted and is alive
+        self._live: dict[int, list[int]] = {}
+        # Counts of threads that have exited
+        self._retired = [0] * len(_NAMES)
+        # Totals at the last reset(), subtracted from stats()
+        self._baseline = [0] * len(_NAMES)
+
+    def init_app(self, app):
+        self.app = app
+        # Listening on the Engine class covers engines created later too; contains() keeps a
+        # second create_app() (scripts, app/asgi.py) from counting every execution twice
+        if not event.contains(Engine, "after_cursor_execute", self._after_cursor_execute):
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def stats(self) -> dict:
+        totals = self._totals()
+        counts = {name: total - base for name, total, base in zip(_NAMES, totals, self._baseline)}
+        counted = counts["hits"] + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": round(counts["hits"] / counted, 4) if counted else None,
+        }
+
+    def reset(self):
+        self._baseline = self._totals()
+
+    def _totals(self) -> list[int]:
+        with self._lock:
+            totals = list(self._retired)
+            for counts in self._live.values():
+                for i, n in enumerate(counts):
+                    totals[i] += n
+        return totals
+
+    def _thread_counts(self) -> list[int]:
+        owner = _ThreadCounts()
+        key = id(owner)
+        with self._lock:
+            self._live[key] = owner.counts
+        weakref.finalize(owner, self._retire, key)
+        self._local.owner = owner
+        return owner.counts
+
+    def _retire(self, key: int):
+        with self._lock:
+            counts = self._live.pop(key)
+            for i, n in enumerate(counts):
+                self._retired[i] += n
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is None or context.compiled is None:
+            return
+        index = _INDEX.get(context.cache_hit)
+        if index is None:
+            return
+        owner = getattr(self._local, "owner", None)
+        counts = owner.counts if owner is not None else self._thread_counts()
+        # Only this thread writes to its list
+        counts[index] += 1
+
+statement_cache = StatementCacheStats()
@@ -1,20 +1,46 @@
 import json
+import threading
 from urllib.request import urlopen
 from authlib.oauth2.rfc7523 import JWTBearerTokenValidator
 from authlib.jose.rfc7517.jwk import JsonWebKey
 
 class Auth0JWTBearerTokenValidator(JWTBearerTokenValidator):
+    """
+    Validates Auth0 access tokens against the tenant's JWKS.
+    The key set is fetched on first use (or by load_key_set() during preload),
+    so importing the app never blocks on the network.
+    """
     def __init__(self, domain, audience):
         issuer = f"https://{domain}/"
-        jsonurl = urlopen(f"{issuer}.well-known/jwks.json")
-        public_key = JsonWebKey.import_key_set(
-            json.loads(jsonurl.read())
-        )
+        self.jwks_url = f"{issuer}.well-known/jwks.json"
+        self._key_set = None
+        self._key_lock = threading.Lock()
         super(Auth0JWTBearerTokenValidator, self).__init__(
-            public_key
+            None
         )
         self.claims_options = {
             "exp": {"essential": True},
             "aud": {"essential": True, "value": audience},
             "iss": {"essential": True, "value": issuer},
-        }
\ No newline at end of file
+        }
+
+    @property
+    def public_key(self):
+        if self._key_set is None:
+            self.load_key_set()
+        return self._key_set
+
+    @public_key.setter
+    def public_key(self, value):
+        # The base class assigns the key in __init__; None means "fetch lazily"
+        if value is not None:
+            self._key_set = value
+
+    def load_key_set(self):
+        with self._key_lock:
+            if self._key_set is None:
+                jsonurl = urlopen(self.jwks_url)
+                self._key_set = JsonWebKey.import_key_set(
+                    json.loads(jsonurl.read())
+                )
+        return self._key_set
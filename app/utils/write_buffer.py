@@ -0,0 +1,258 @@
+# app/utils/write_buffer.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db
+from ..models.recipe import RecipeComment, RecipeRating
+
+class WriteNotConfirmed(Exception):
+    """
+    The write wasn't flushed within the ack timeout; it may or may not land.
+    """
+
+class PendingWrite:
+    def __init__(self):
+        self._done = threading.Event()
+        self._error = None
+
+    def resolve(self, error: Exception | None = None):
+        self._error = error
+        self._done.set()
+
+    def result(self, timeout: float):
+        """
+        Block until the write is committed. Raises the flush error, or WriteNotConfirmed on timeout.
+        """
+        if not self._done.wait(timeout):
+            raise WriteNotConfirmed("The write could not be confirmed in time")
+        if self._error is not None:
+            raise self._error
+
+class FlushStats:
+    def __init__(self):
+        self.flushes = 0
+        self.items = 0
+        self.coalesced = 0
+        self.fallbacks = 0
+        self.failed_items = 0
+        self.size_max = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "items": self.items,
+            "coalesced": self.coalesced,
+            "fallbacks": self.fallbacks,
+            "failed_items": self.failed_items,
+            "avg_size": round(self.items / self.flushes, 2) if self.flushes else None,
+            "max_size": self.size_max,
+            "avg_latency_ms": round(self.latency_total / self.flushes * 1000, 2) if self.flushes else None,
+            "max_latency_ms": round(self.latency_max * 1000, 2) if self.flushes else None,
+        }
+
+class WriteBuffer:
+    """
+    Optional write-behind buffer for ratings and comments (WRITE_BEHIND_ENABLED=1).
+
+    Handlers submit already-validated writes and wait on the returned PendingWrite, so a
+    client only gets its 200 once the row is committed. A flusher thread per worker commits
+    everything buffered every WRITE_BEHIND_FLUSH_MS or as soon as WRITE_BEHIND_MAX_ITEMS are
+    waiting, in one transaction: ratings as a single multi-row upsert where the last vote per
+    (recipe_id, user_encrypted) wins, comments as a single multi-row insert. If that
+    transaction fails, each write is retried on its own so one bad row only fails its own request.
+
+    Coalescing needs concurrent requests in the same process, i.e. gevent or gthread workers;
+    with sync workers every write would just wait out the interval alone.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self._cond = threading.Condition()
+        self._ratings: dict[tuple[int, bytes], tuple[int, list[PendingWrite]]] = {}
+        self._comments: list[tuple[int, bytes, str, PendingWrite]] = []
+        self._first_at = None
+        self._thread = None
+        self._pid = None
+        self._closing = False
+        self._stats = FlushStats()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = bool(app.config.get("WRITE_BEHIND_ENABLED", False))
+        self.flush_seconds = float(app.config.get("WRITE_BEHIND_FLUSH_MS", 50)) / 1000
+        self.max_items = int(app.config.get("WRITE_BEHIND_MAX_ITEMS", 100))
+        self.ack_timeout = float(app.config.get("WRITE_BEHIND_ACK_TIMEOUT", 5))
+
+    @property
+    def accepting(self) -> bool:
+        """
+        Whether writes should go through the buffer; False once close() has been called, so
+        requests still finishing during shutdown write directly instead.
+        """
+        return self.enabled and not self._closing
+
+    def submit_rating(self, recipe_id: int, user_encrypted: bytes, rating: int) -> PendingWrite:
+        pending = PendingWrite()
+        with self._cond:
+            if self._closing:
+                pending.resolve(WriteNotConfirmed("The write buffer is closed"))
+                return pending
+            key = (recipe_id, user_encrypted)
+            waiters = self._ratings[key][1] if key in self._ratings else []
+            if waiters:
+                self._stats.coalesced += 1
+            # Every request for the key is acked by the flush of the latest vote
+            self._ratings[key] = (rating, waiters + [pending])
+            self._added()
+        return pending
+
+    def submit_comment(self, recipe_id: int, user_encrypted: bytes, comment: str) -> PendingWrite:
+        pending = PendingWrite()
+        with self._cond:
+            if self._closing:
+                pending.resolve(WriteNotConfirmed("The write buffer is closed"))
+                return pending
+            self._comments.append((recipe_id, user_encrypted, comment, pending))
+            self._added()
+        return pending
+
+    def close(self, timeout: float = 10.0):
+        """
+        Flush whatever is buffered and stop the flusher thread. Later submissions are
+        refused straight away.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._pid == os.getpid():
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "buffered": len(self._ratings) + len(self._comments),
+                **self._stats.as_dict(),
+            }
+
+    def _size(self) -> int:
+        return len(self._ratings) + len(self._comments)
+
+    def _added(self):
+        # Called with the condition held
+        self._ensure_started()
+        if self._first_at is None:
+            # Starts the flush interval; wakes the flusher if it was idle
+            self._first_at = time.monotonic()
+            self._cond.notify()
+        elif self._size() >= self.max_items:
+            self._cond.notify()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        # Threads don't survive a fork; start one for this process
+        self._thread = threading.Thread(target=self._flush_forever, name="write-buffer", daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    def _flush_forever(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._closing or self._size() >= self.max_items:
+                        break
+                    if self._first_at is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._first_at + self.flush_seconds - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                ratings, self._ratings = self._ratings, {}
+                comments, self._comments = self._comments, []
+                self._first_at = None
+                closing = self._closing
+
+            if ratings or comments:
+                self._flush(ratings, comments)
+            if closing:
+                return
+
+    def _flush(self, ratings: dict, comments: list):
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                with db.session.begin():
+                    if ratings:
+                        db.session.execute(_rating_upsert([
+                            {"recipe_id": recipe_id, "user_encrypted": user, "rating": rating}
+                            for (recipe_id, user), (rating, _) in ratings.items()
+                        ]))
+                    if comments:
+                        db.session.execute(insert(RecipeComment), [
+                            {"recipe_id": recipe_id, "user_encrypted": user, "comment": comment}
+                            for recipe_id, user, comment, _ in comments
+                        ])
+                failed = 0
+                for _, waiters in ratings.values():
+                    for pending in waiters:
+                        pending.resolve()
+                for *_, pending in comments:
+                    pending.resolve()
+            except Exception as e:
+                self.app.logger.warning("Write buffer flush of %s item(s) failed, retrying one by one: %s", len(ratings) + len(comments), e)
+                failed = self._flush_each(ratings, comments)
+                with self._cond:
+                    self._stats.fallbacks += 1
+
+        elapsed = time.monotonic() - started
+        size = len(ratings) + len(comments)
+        with self._cond:
+            stats = self._stats
+            stats.flushes += 1
+            stats.items += size
+            stats.failed_items += failed
+            stats.size_max = max(stats.size_max, size)
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+
+    def _flush_each(self, ratings: dict, comments: list) -> int:
+        failed = 0
+        for (recipe_id, user), (rating, waiters) in ratings.items():
+            error = _commit_one(_rating_upsert([{"recipe_id": recipe_id, "user_encrypted": user, "rating": rating}]))
+            failed += error is not None
+            for pending in waiters:
+                pending.resolve(error)
+        for recipe_id, user, comment, pending in comments:
+            error = _commit_one(insert(RecipeComment).values(recipe_id=recipe_id, user_encrypted=user, comment=comment))
+            failed += error is not None
+            pending.resolve(error)
+        return failed
+
+def _rating_upsert(rows: list[dict]):
+    stmt = pg_insert(RecipeRating).values(rows)
+    return stmt.on_conflict_do_update(
+        constraint="unique_user_recipe_rating",
+        set_={"rating": stmt.excluded.rating},
+    )
+
+def _commit_one(stmt) -> Exception | None:
+    try:
+        with db.session.begin():
+            db.session.execute(stmt)
+    except Exception as e:
+        db.session.rollback()
+        return e
+    return None
+
+write_buffer = WriteBuffer()
@@ -0,0 +1,60 @@
+# gunicorn.conf.py
+# Usage: gunicorn -c gunicorn.conf.py run:app
+import os
+
+# "gevent" lets each worker hold thousands of idle /api/events streams
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+if worker_class == "gevent":
+    # Patch before anything else is imported. With preload_app the master imports the app, and
+    # every module-level threading.Lock in app/utils is created then; created unpatched, a
+    # greenlet waiting on one (e.g. while another greenlet holds it across a DB query) blocks
+    # the OS thread and freezes the whole worker. The worker's own patch_all() after the fork
+    # is too late for those. psycogreen makes psycopg2 wait cooperatively as well.
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+
+bind = os.environ.get("GUNICORN_BIND", "127.0.0.1:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "3"))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "2000"))
+
+# Load the app once in the master and fork workers from it, so imports and
+# warmed state (see app/startup.py) are shared copy-on-write. Safe with gevent only
+# because of the monkey patching above; the two are coupled, keep them together.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    if not preload_app:
+        return
+    from run import app
+    from app import startup
+
+    startup.preload(app)
+    for name, seconds in startup.timings.items():
+        server.log.info("preload %s: %.1f ms", name, seconds * 1000)
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    from run import app
+    from app import startup
+
+    startup.after_fork(app)
+
+
+def worker_exit(server, worker):
+    # Commit buffered writes and let queued background tasks (thumbnails, cache refreshes)
+    # finish before the worker goes away
+    from app.utils.background import background
+    from app.utils.write_buffer import write_buffer
+
+    write_buffer.close()
+    background.drain(timeout=float(os.environ.get("BACKGROUND_DRAIN_TIMEOUT", "10")))
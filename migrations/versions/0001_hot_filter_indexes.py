@@ -0,0 +1,40 @@
+"""index hot filter columns
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    ("idx_reviews_user", "reviews", ["user_encrypted"]),
+    ("idx_recipes_user", "recipes", ["user_encrypted"]),
+    ("idx_recipe_instructions_recipe_order", "recipe_instructions", ["recipe_id", "instruction_order"]),
+    ("idx_recipe_ingredients_recipe_id", "recipe_ingredients", ["recipe_id"]),
+    ("idx_recipescomments_recipe_id", "recipescomments", ["recipe_id"]),
+    ("idx_rest_type_review_ref_review_id", "rest_type_review_ref", ["review_id"]),
+    ("idx_rest_types_rest_type", "rest_types", ["rest_type"]),
+]
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside a transaction, and doesn't block reads or writes while building
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
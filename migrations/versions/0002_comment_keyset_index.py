@@ -0,0 +1,51 @@
+"""index comments for keyset pagination
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (recipe_id, comment_id) also covers plain recipe_id lookups, so it replaces the single-column index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_recipescomments_recipe_comment",
+            "recipescomments",
+            ["recipe_id", "comment_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "idx_recipescomments_recipe_id",
+            table_name="recipescomments",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_recipescomments_recipe_id",
+            "recipescomments",
+            ["recipe_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "idx_recipescomments_recipe_comment",
+            table_name="recipescomments",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
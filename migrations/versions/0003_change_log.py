@@ -0,0 +1,53 @@
+"""change log for delta sync
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.change_log import RECORD_CHANGE_FUNCTION_V1, record_change_triggers
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+# Tables tracked as of this revision; tables added to the model's TRACKED_TABLES later get
+# their triggers from the migration that adds them
+TRACKED_TABLES = {
+    "recipes": ("recipe", "recipe_id"),
+    "reviews": ("review", "review_id"),
+    "recipescomments": ("comment", "comment_id"),
+    "recipe_ratings": ("recipe_rating", "recipe_id"),
+}
+
+
+def upgrade():
+    op.create_table(
+        "change_log",
+        sa.Column("seq", sa.BigInteger(), primary_key=True),
+        sa.Column("txid", sa.BigInteger(), nullable=False, server_default=sa.text("txid_current()")),
+        sa.Column("entity", sa.Text(), nullable=False),
+        sa.Column("entity_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.Text(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("idx_change_log_txid_seq", "change_log", ["txid", "seq"])
+
+    op.execute(RECORD_CHANGE_FUNCTION_V1)
+    # CREATE TRIGGER only takes a brief SHARE ROW EXCLUSIVE lock; no table rewrite
+    for statement in record_change_triggers(TRACKED_TABLES):
+        op.execute(statement)
+
+
+def downgrade():
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_record_change ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS record_change()")
+    op.drop_index("idx_change_log_txid_seq", table_name="change_log")
+    op.drop_table("change_log")
@@ -0,0 +1,27 @@
+"""notify change_log entries for the event stream
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.change_log import RECORD_CHANGE_FUNCTION_V1, RECORD_CHANGE_FUNCTION_V2
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same function as 0003, plus a NOTIFY on the change_log channel; the triggers pick it up as-is
+    op.execute(RECORD_CHANGE_FUNCTION_V2)
+
+
+def downgrade():
+    op.execute(RECORD_CHANGE_FUNCTION_V1)
@@ -0,0 +1,26 @@
+"""store generated thumbnail keys per recipe image
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable with no default, so this is a metadata-only change on a live table
+    op.add_column("recipes", sa.Column("rec_img_variants", postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("recipes", "rec_img_variants")
@@ -0,0 +1,47 @@
+"""trigram indexes for review name and city autocomplete
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serve the autocomplete fallback's ILIKE 'prefix%' (any case) while a worker's in-memory index is cold
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_reviews_rest_name_trgm",
+            "reviews",
+            ["rest_name"],
+            postgresql_using="gin",
+            postgresql_ops={"rest_name": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "idx_reviews_city_trgm",
+            "reviews",
+            ["city"],
+            postgresql_using="gin",
+            postgresql_ops={"city": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    # The extension is left installed; other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index("idx_reviews_city_trgm", table_name="reviews", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("idx_reviews_rest_name_trgm", table_name="reviews", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,32 @@
+"""change log pruning horizon
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Single row: the newest change_log entry removed by scripts/prune_change_log.py
+    op.create_table(
+        "change_log_horizon",
+        sa.Column("id", sa.SmallInteger(), primary_key=True),
+        sa.Column("txid", sa.BigInteger(), nullable=False),
+        sa.Column("seq", sa.BigInteger(), nullable=False),
+        sa.Column("pruned_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.CheckConstraint("id = 1", name="change_log_horizon_single_row"),
+    )
+
+
+def downgrade():
+    op.drop_table("change_log_horizon")
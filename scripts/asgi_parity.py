@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+Check that the async read path (app/asgi.py) answers exactly like the Flask handlers.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/asgi_parity.py [--verbose]
+
+Every request below is sent in-process to both the Flask app and the ASGI app against the
+same database, and status, Content-Type, Content-Encoding, Vary, CORS headers and body bytes are compared.
+Bearer tokens for /api/restaurant-types are signed with a throwaway key that both apps trust
+for the duration of the run. 500 responses embed driver error text, so only their status
+is compared. Exits non-zero if any request differs.
+
+tests/test_asgi_parity.py makes the same comparisons against the test fixture database;
+this script runs them against real data, e.g. a staging copy before switching nginx over.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from authlib.jose import JsonWebKey, jwt
+from sqlalchemy import func, select
+from werkzeug.datastructures import Headers
+
+from app import validator
+from app.asgi import app as asgi_app, flask_app
+from app.extensions import db
+from app.models import Recipe, Review
+
+ORIGIN = "https://sophsmenu.com"
+
+def _token(**claims) -> str:
+    key = validator._test_key
+    now = int(time.time())
+    payload = {
+        "sub": "parity|user",
+        "iss": validator.claims_options["iss"]["value"],
+        "aud": validator.claims_options["aud"]["value"],
+        "iat": now,
+        "exp": now + 300,
+    }
+    payload.update(claims)
+    return jwt.encode({"alg": "RS256", "kid": key.kid}, payload, key).decode()
+
+def _trust_test_key():
+    key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": "parity"})
+    jwks = {"keys": [key.as_dict(is_private=False)]}
+    validator._test_key = key
+    try:
+        # Newer Authlib verifies tokens with joserfc and wants its key types
+        from joserfc.jwk import KeySet
+        validator.public_key = KeySet.import_key_set(jwks)
+    except ImportError:
+        validator.public_key = JsonWebKey.import_key_set(jwks)
+
+def _cases():
+    with flask_app.app_context():
+        recipe_id = db.session.execute(select(func.min(Recipe.recipe_id))).scalar() or 1
+        review_id = db.session.execute(select(func.min(Review.review_id))).scalar() or 1
+        db.session.remove()
+
+    cases = [
+        ("/api/recipes", {}),
+        ("/api/recipes/", {}),
+        (f"/api/recipes/{recipe_id}", {}),
+        (f"/api/recipes/{recipe_id}/", {}),
+        (f"/api/recipes/{recipe_id}?include=", {}),
+        (f"/api/recipes/{recipe_id}?include=rating", {}),
+        (f"/api/recipes/{recipe_id}?include=ingredients,comments", {}),
+        (f"/api/recipes/{recipe_id}?include=rating&include=comments", {}),
+        (f"/api/recipes/{recipe_id}?include=bogus", {}),
+        ("/api/recipes/0", {}),
+        ("/api/recipes/2147483000", {}),
+        ("/api/reviews", {}),
+        (f"/api/reviews/{review_id}", {}),
+        ("/api/reviews/0", {}),
+        ("/api/reviews/2147483000", {}),
+        ("/api/restaurant-types", {}),
+        ("/api/restaurant-types", {"Authorization": "Bearer"}),
+        ("/api/restaurant-types", {"Authorization": "Basic abc"}),
+        ("/api/restaurant-types", {"Authorization": "Bearer " + _token(exp=int(time.time()) - 60)}),
+        ("/api/restaurant-types", {"Authorization": "Bearer " + _token(aud="someone-else")}),
+        ("/api/restaurant-types", {"Authorization": "Bearer " + _token()}),
+    ]
+    # Same requests from an allowed and a foreign origin, for the CORS headers
+    cases += [(path, {"Origin": ORIGIN}) for path, headers in cases[:2]]
+    cases += [(path, {"Origin": "https://example.com"}) for path, headers in cases[:2]]
+    # Sparse fieldsets, and MessagePack bodies
+    cases += [
+        ("/api/recipes?fields=recipe_id,recipe_name", {}),
+        ("/api/recipes?fields=rec_img_srcset", {}),
+        ("/api/recipes?fields=", {}),
+        ("/api/recipes?fields=recipe_id,bogus", {}),
+        (f"/api/recipes/{recipe_id}?fields=recipe_name&include=ingredients", {}),
+        (f"/api/recipes/{recipe_id}?fields=user_encrypted,meal&include=", {}),
+        ("/api/reviews?fields=rest_name,o_rating", {}),
+        ("/api/reviews?fields=rest_type", {}),
+        (f"/api/reviews/{review_id}?fields=review_id,user_encrypted,rest_type", {}),
+        ("/api/reviews?fields=description,nope", {}),
+    ]
+    for accept in ("application/msgpack", "application/x-msgpack", "application/json;q=0.5, application/msgpack", "*/*"):
+        cases += [(path, {"Accept": accept}) for path in ("/api/recipes", "/api/reviews?fields=rest_name", f"/api/recipes/{recipe_id}", f"/api/reviews/{review_id}", "/api/recipes/0")]
+    cases.append(("/api/reviews", {"Accept": "application/msgpack", "Accept-Encoding": "gzip"}))
+    # Content negotiation: both sides must pick the same encoding and produce the same bytes
+    for accept in ("gzip", "br", "zstd", "gzip;q=0.5, br;q=0", "identity", "*"):
+        cases += [(path, {"Accept-Encoding": accept}) for path in ("/api/recipes", "/api/reviews", f"/api/recipes/{recipe_id}", "/api/recipes/0")]
+    return cases
+
+def _call_flask(client, path: str, headers: dict):
+    resp = client.get(path, headers=headers)
+    return resp.status_code, resp.headers, resp.get_data()
+
+async def _call_asgi(path: str, headers: dict):
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": raw_path,
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    start, body = sent
+    resp_headers = Headers([(k.decode(), v.decode()) for k, v in start["headers"]])
+    return start["status"], resp_headers, body["body"]
+
+COMPARED_HEADERS = ("content-type", "content-encoding", "vary", "www-authenticate", "access-control-allow-origin", "access-control-allow-credentials")
+
+async def main(verbose: bool) -> int:
+    _trust_test_key()
+    client = flask_app.test_client()
+    failures = 0
+
+    for path, headers in _cases():
+        f_status, f_headers, f_body = _call_flask(client, path, headers)
+        a_status, a_headers, a_body = await _call_asgi(path, headers)
+
+        problems = []
+        if f_status != a_status:
+            problems.append(f"status {f_status} != {a_status}")
+        if f_status != 500 and f_body != a_body:
+            problems.append(f"body differs:\n    flask: {f_body[:300]!r}\n    asgi:  {a_body[:300]!r}")
+        for name in COMPARED_HEADERS:
+            # flask_cors echoes the configured origins when no Origin was sent; browsers never do that
+            if name.startswith("access-control") and "Origin" not in headers:
+                continue
+            # Vary may be sent more than once
+            if f_headers.getlist(name) != a_headers.getlist(name):
+                problems.append(f"{name}: {f_headers.getlist(name)!r} != {a_headers.getlist(name)!r}")
+
+        label = f"{path} {sorted(headers)}"
+        if problems:
+            failures += 1
+            print(f"FAIL {label}")
+            for p in problems:
+                print(f"  {p}")
+        elif verbose:
+            print(f"ok   {label} -> {f_status}, {len(f_body)} bytes")
+
+    if failures:
+        print(f"\n{failures} request(s) differ between Flask and ASGI")
+        return 1
+    print("Flask and ASGI responses match")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="list every request, not just mismatches")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.verbose)))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Compare read throughput of the gunicorn (sync) and uvicorn (async) servers.
+
+Usage, with both servers running against the same database:
+    gunicorn -c gunicorn.conf.py run:app                        # 127.0.0.1:5000
+    uvicorn app.asgi:app --host 127.0.0.1 --port 5001 --workers 1
+    python scripts/bench_read_path.py --sync http://127.0.0.1:5000 --async http://127.0.0.1:5001
+
+Each target gets the same mix of GETs from --concurrency client threads for --seconds, and
+requests/s plus latency percentiles are printed per target. Give both servers the same
+number of processes to compare like for like (e.g. GUNICORN_WORKERS=1 and --workers 1).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+DEFAULT_PATHS = [
+    "/api/recipes",
+    "/api/recipes/1",
+    "/api/recipes/2?include=rating",
+    "/api/reviews",
+    "/api/reviews/1",
+]
+
+def _run(base_url: str, paths: list[str], concurrency: int, seconds: float):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    counter = itertools.count()
+
+    def client():
+        nonlocal errors
+        mine = []
+        failed = 0
+        while time.monotonic() < deadline:
+            path = paths[next(counter) % len(paths)]
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=30) as resp:
+                    resp.read()
+            except (urllib.error.URLError, OSError):
+                failed += 1
+                continue
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors, time.monotonic() - started
+
+def _report(name: str, latencies: list[float], errors: int, elapsed: float):
+    if not latencies:
+        print(f"{name:>5}: no successful requests ({errors} errors)")
+        return
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>5}: {len(latencies) / elapsed:8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms   "
+        f"errors {errors}"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sync", dest="sync_url", default="http://127.0.0.1:5000", help="gunicorn base URL")
+    parser.add_argument("--async", dest="async_url", default="http://127.0.0.1:5001", help="uvicorn base URL")
+    parser.add_argument("--concurrency", type=int, default=32, help="client threads per target")
+    parser.add_argument("--seconds", type=float, default=10, help="how long to load each target")
+    parser.add_argument("--path", action="append", dest="paths", help="path to request (repeatable)")
+    args = parser.parse_args()
+
+    paths = args.paths or DEFAULT_PATHS
+    print(f"{args.concurrency} clients, {args.seconds:g}s per target, paths: {', '.join(paths)}")
+    for name, url in (("sync", args.sync_url), ("async", args.async_url)):
+        _report(name, *_run(url.rstrip("/"), paths, args.concurrency, args.seconds))
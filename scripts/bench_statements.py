@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Measure the CPU the prebuilt statements in app/queries save per request.
+
+Usage, against a database with some recipes and reviews:
+    python scripts/bench_statements.py
+    python scripts/bench_statements.py --iterations 5000 --recipe-id 3 --review-id 7
+
+For each hot read it runs the query --iterations times two ways and reports process CPU
+time per call (database time spent waiting on the socket isn't counted):
+    built  : the construct built per call and run through the ORM session, as the routes used to
+    cached : the prebuilt statement with bound parameters, run on the session's Core connection
+plus how the executions fared in SQLAlchemy's compiled cache (app/utils/statement_cache.py).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import desc, func, select
+
+from app import create_app
+from app.extensions import db
+from app.models.recipe import Recipe, RecipeComment, RecipeIngredient, RecipeInstruction, RecipeRating
+from app.models.review import RestTypeReviewRef, Review
+from app.models.restaurant_type import RestaurantType
+from app.queries.recipes import PROFILE_RECIPES_STMT, RECIPE_INCLUDES, recipe_detail_stmts
+from app.queries.reviews import REVIEW_FIELDS, review_rows_stmt
+from app.utils.statement_cache import statement_cache
+
+########################
+# BUILT PER CALL
+########################
+
+def _built_review(review_id: int):
+    stmt = (
+        select(*(column.label(name) for name, column in REVIEW_FIELDS.items()))
+        .select_from(Review)
+        .outerjoin(RestTypeReviewRef, Review.review_id == RestTypeReviewRef.review_id)
+        .outerjoin(RestaurantType, RestTypeReviewRef.rest_type_id == RestaurantType.rest_type_id)
+        .where(Review.review_id.in_([review_id]))
+        .order_by(desc(Review.review_id))
+    )
+    return db.session.execute(stmt).all()
+
+def _built_recipe(recipe_id: int):
+    ids = [recipe_id]
+    stmts = [
+        select(
+            Recipe.recipe_id, Recipe.recipe_name, Recipe.user_encrypted, Recipe.prep_time_in_min,
+            Recipe.meal, Recipe.rec_img_url, Recipe.soph_submitted,
+        ).where(Recipe.recipe_id.in_(ids)),
+        select(RecipeIngredient.recipe_id, RecipeIngredient.ingredient)
+        .where(RecipeIngredient.recipe_id.in_(ids))
+        .order_by(RecipeIngredient.ingredient_id.asc()),
+        select(RecipeInstruction.recipe_id, RecipeInstruction.instruction)
+        .where(RecipeInstruction.recipe_id.in_(ids))
+        .order_by(RecipeInstruction.recipe_id, RecipeInstruction.instruction_order.asc()),
+        select(RecipeComment.recipe_id, RecipeComment.comment)
+        .where(RecipeComment.recipe_id.in_(ids))
+        .order_by(RecipeComment.recipe_id, RecipeComment.comment_id.asc()),
+        select(RecipeRating.recipe_id, func.avg(RecipeRating.rating).cast(db.Numeric(3, 1)).label("avg_rating"))
+        .where(RecipeRating.recipe_id.in_(ids))
+        .group_by(RecipeRating.recipe_id),
+    ]
+    return [db.session.execute(stmt).all() for stmt in stmts]
+
+def _built_profile(user_encrypted: bytes):
+    return (
+        db.session.query(
+            Recipe.recipe_name,
+            Recipe.recipe_id,
+            Recipe.user_encrypted,
+            func.coalesce(func.round(func.avg(RecipeRating.rating), 1), 0).label("avg_rating"),
+        )
+        .outerjoin(RecipeRating, Recipe.recipe_id == RecipeRating.recipe_id)
+        .filter(Recipe.user_encrypted == user_encrypted)
+        .group_by(Recipe.recipe_id, Recipe.recipe_name, Recipe.user_encrypted)
+        .order_by(Recipe.recipe_name.asc(), Recipe.recipe_id.asc())
+        .limit(None)
+        .offset(0)
+        .all()
+    )
+
+########################
+# PREBUILT
+########################
+
+def _cached_review(review_id: int):
+    return db.session.connection().execute(review_rows_stmt(tuple(REVIEW_FIELDS), by_ids=True), {"ids": [review_id]}).all()
+
+def _cached_recipe(recipe_id: int):
+    conn = db.session.connection()
+    params = {"ids": [recipe_id]}
+    return [conn.execute(stmt, params).all() for stmt in recipe_detail_stmts(set(RECIPE_INCLUDES)).values()]
+
+def _cached_profile(user_encrypted: bytes):
+    return db.session.connection().execute(
+        PROFILE_RECIPES_STMT, {"user_encrypted": user_encrypted, "limit": None, "offset": 0}
+    ).all()
+
+def _cpu_per_call(fn, arg, iterations: int) -> float:
+    fn(arg)  # warm the compiled cache and the connection
+    db.session.rollback()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn(arg)
+        # Each request ends its transaction, and with it the session's connection
+        db.session.rollback()
+    return (time.process_time() - started) / iterations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per query and variant")
+    parser.add_argument("--recipe-id", type=int, help="recipe for the detail query (default: the lowest id)")
+    parser.add_argument("--review-id", type=int, help="review for the by-id query (default: the lowest id)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        recipe = db.session.get(Recipe, args.recipe_id) if args.recipe_id else Recipe.query.order_by(Recipe.recipe_id).first()
+        review_id = args.review_id or db.session.scalar(select(func.min(Review.review_id)))
+        if recipe is None or review_id is None:
+            sys.exit("Needs at least one recipe and one review")
+        recipe_id, user_encrypted = recipe.recipe_id, recipe.user_encrypted
+        db.session.rollback()
+
+        cases = [
+            ("review by id", review_id, _built_review, _cached_review),
+            ("recipe detail, all includes", recipe_id, _built_recipe, _cached_recipe),
+            ("profile recipes", user_encrypted, _built_profile, _cached_profile),
+        ]
+        print(f"{args.iterations} calls each, CPU µs per call")
+        print(f"{'query':<30} {'built':>9} {'cached':>9} {'saved':>9}")
+        for name, arg, built, cached in cases:
+            built_us = _cpu_per_call(built, arg, args.iterations) * 1e6
+            # Warm first, so the rate covers only the measured calls
+            cached(arg)
+            db.session.rollback()
+            statement_cache.reset()
+            cached_us = _cpu_per_call(cached, arg, args.iterations) * 1e6
+            stats = statement_cache.stats()
+            print(
+                f"{name:<30} {built_us:9.1f} {cached_us:9.1f} {built_us - cached_us:9.1f}"
+                f"   ({(built_us - cached_us) / built_us:.0%}, cache hit rate {stats['hit_rate']})"
+            )
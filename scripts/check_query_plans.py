@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Fail if any read endpoint's SQL needs a sequential scan.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/check_query_plans.py [--verbose]
+
+Each GET view below is called inside one transaction against a small seeded data set,
+every SELECT it issues is captured and run through EXPLAIN with enable_seqscan off,
+and the transaction is rolled back at the end, so nothing is left in the database.
+An endpoint that doesn't answer 200 fails the check; since its error handler rolls the
+session back, the setting and the seed are then put back before the next endpoint.
+With seq scans disabled the planner only picks one when no index can serve the query.
+Endpoints that intentionally read a whole table list it in their allowed set.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import g
+from sqlalchemy import event, select
+
+from app import create_app
+from app.extensions import db
+from app.models import (
+    Recipe,
+    RecipeComment,
+    RecipeIngredient,
+    RecipeInstruction,
+    RecipeRating,
+    RestaurantType,
+    Review,
+    RestTypeReviewRef,
+)
+from app.utils.auth import encrypt_user
+
+CHECK_USER = "query-plan-check@example.com"
+
+SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _checks(ids):
+    """
+    (endpoint, view kwargs, query string, tables allowed to be scanned in full)
+    """
+    return [
+        ("recipes.get_all_recipes", {}, "", {"recipes"}),
+        ("recipes.get_recipe", {"recipe_id": ids["recipe_id"]}, "", set()),
+        ("recipes.get_recipes_batch", {}, f"ids={ids['recipe_id']},{ids['recipe_id'] + 1}", set()),
+        ("recipes.get_recipe_comments", {"recipe_id": ids["recipe_id"]}, "", set()),
+        ("recipes.get_profile_recipes", {}, "", set()),
+        ("recipes.get_rated_recipes", {}, "", set()),
+        ("recipes.get_users_rating", {"recipe_id": ids["recipe_id"]}, "", set()),
+        ("reviews.get_all_reviews", {}, "", {"reviews", "rest_type_review_ref", "rest_types"}),
+        ("reviews.get_review", {"review_id": ids["review_id"]}, "", set()),
+        ("reviews.get_profile_reviews", {}, "", set()),
+        ("restaurant_types.get_restaurant_types", {}, "", {"rest_types"}),
+        ("profile.get_profile", {}, "recipes_limit=10&rated_limit=10&reviews_limit=10", set()),
+        ("sync.get_changes", {}, "since=0.0", set()),
+    ]
+
+
+def _seed():
+    user_encrypted = encrypt_user(CHECK_USER)
+
+    rest_type = RestaurantType(rest_type="Query Plan Check")
+    recipe = Recipe(
+        recipe_name="Query Plan Check",
+        user_encrypted=user_encrypted,
+        prep_time_in_min=10,
+        meal="dinner",
+        soph_submitted=False,
+    )
+    review = Review(
+        rest_name="Query Plan Check",
+        o_rating=5,
+        price=2,
+        taste=5,
+        experience=5,
+        city="Boston",
+        state_code="MA",
+        soph_submitted=False,
+        user_encrypted=user_encrypted,
+    )
+    db.session.add_all([rest_type, recipe, review])
+    db.session.flush()
+
+    db.session.add_all([
+        RecipeInstruction(recipe_id=recipe.recipe_id, instruction_order=0, instruction="Mix"),
+        RecipeIngredient(recipe_id=recipe.recipe_id, ingredient="Flour"),
+        RecipeComment(recipe_id=recipe.recipe_id, comment="Nice", user_encrypted=user_encrypted),
+        RecipeRating(recipe_id=recipe.recipe_id, user_encrypted=user_encrypted, rating=4),
+        RestTypeReviewRef(rest_type_id=rest_type.rest_type_id, review_id=review.review_id),
+    ])
+    db.session.flush()
+    return {"recipe_id": recipe.recipe_id, "review_id": review.review_id}
+
+
+def _begin():
+    """
+    Open the check transaction: seq scans off and the seed rows in place. Returns (connection, ids).
+    """
+    conn = db.session.connection()
+    conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    return conn, _seed()
+
+
+def _still_seeded(conn, ids) -> bool:
+    if conn.closed or conn.exec_driver_sql("SHOW enable_seqscan").scalar() != "off":
+        return False
+    return conn.execute(
+        select(Recipe.recipe_id).where(Recipe.recipe_id == ids["recipe_id"])
+    ).first() is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not just failures")
+    args = parser.parse_args()
+
+    app = create_app()
+    failures = 0
+    errors = 0
+
+    with app.app_context():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        conn, ids = _begin()
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            for endpoint, kwargs, query_string, allowed in _checks(ids):
+                captured.clear()
+                # Call the undecorated view so authenticated endpoints can run without a real token
+                view = app.view_functions[endpoint]
+                view = getattr(view, "__wrapped__", view)
+                with app.test_request_context(query_string=query_string):
+                    g.authlib_server_oauth2_token = {"sub": CHECK_USER}
+                    response = app.make_response(view(**kwargs))
+
+                # A view that fails rolls the session back, taking the seed and the setting with it
+                if response.status_code != 200 or not _still_seeded(conn, ids):
+                    errors += 1
+                    print(f"FAIL {endpoint}: returned {response.status}")
+                    if args.verbose:
+                        print(f"  {response.get_data(as_text=True).strip()}\n")
+                    event.remove(db.engine, "before_cursor_execute", capture)
+                    db.session.rollback()
+                    conn, ids = _begin()
+                    event.listen(db.engine, "before_cursor_execute", capture)
+                    continue
+
+                statements = list(captured)
+                if not statements:
+                    print(f"WARN {endpoint}: issued no SELECT")
+                    continue
+
+                endpoint_failed = False
+                for statement, parameters in statements:
+                    plan = "\n".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters))
+                    scanned = set(SEQ_SCAN.findall(plan)) - allowed
+                    if scanned:
+                        endpoint_failed = True
+                        failures += 1
+                        print(f"FAIL {endpoint}: sequential scan on {', '.join(sorted(scanned))}")
+                    if scanned or args.verbose:
+                        print(f"  {statement.strip()}\n{plan}\n")
+                if not endpoint_failed:
+                    print(f"ok   {endpoint}")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+            db.session.rollback()
+
+    if errors:
+        sys.exit(f"{errors} endpoint{'' if errors == 1 else 's'} failed" + (f", {failures} seq scan(s)" if failures else ""))
+    if failures:
+        sys.exit(f"{failures} quer{'y' if failures == 1 else 'ies'} need a sequential scan")
+    print("All query plans use indexes")
+
+
+if __name__ == "__main__":
+    main()
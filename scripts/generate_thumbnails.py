@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""
+Generate WebP thumbnails for recipe images, synchronously.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/generate_thumbnails.py                  # every recipe that has none yet
+    python scripts/generate_thumbnails.py --recipe-id 42   # one recipe, regenerating if needed
+
+New recipes get their thumbnails in the background right after they are created; this
+backfills older recipes and retries failures. Point S3_ENDPOINT_URL at a local S3 stand-in
+(e.g. `moto_server -p 9000` or MinIO) to try the pipeline without touching the real bucket.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db
+from app.models import Recipe
+from app.utils.images import generate_thumbnails
+
+def main(recipe_id: int | None) -> int:
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        query = db.session.query(Recipe.recipe_id, Recipe.rec_img_url).filter(Recipe.rec_img_url.isnot(None))
+        if recipe_id is not None:
+            query = query.filter(Recipe.recipe_id == recipe_id)
+        else:
+            query = query.filter(Recipe.rec_img_variants.is_(None))
+        rows = query.order_by(Recipe.recipe_id).all()
+        db.session.commit()
+
+        for row in rows:
+            try:
+                variants = generate_thumbnails(row.recipe_id, row.rec_img_url)
+            except Exception as e:
+                db.session.rollback()
+                failures += 1
+                print(f"recipe {row.recipe_id}: failed: {e}")
+                continue
+            if variants is None:
+                print(f"recipe {row.recipe_id}: skipped, image is not in our bucket")
+            else:
+                print(f"recipe {row.recipe_id}: {', '.join(f'{w}w' for w in variants)}")
+
+    print(f"{len(rows) - failures} of {len(rows)} recipe(s) done")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipe-id", type=int, help="only this recipe")
+    args = parser.parse_args()
+    sys.exit(main(args.recipe_id))
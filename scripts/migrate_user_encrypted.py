@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+"""
+Convert user_encrypted from 64-char hex text to 32-byte bytea, in place and in batches.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/migrate_user_encrypted.py prepare [--batch-size 5000] [--pause 0.05]
+    python scripts/migrate_user_encrypted.py swap
+
+prepare  Runs while the old API is still serving. Adds a shadow bytea column to each table,
+         keeps it in sync for new writes with a trigger, backfills existing rows in small
+         committed batches, validates a NOT NULL check, and builds the ratings indexes
+         CONCURRENTLY. Safe to re-run; tables that are already converted are skipped.
+         The backfill runs with session_replication_role = replica so the change_log
+         triggers from migration 0003 don't record every backfilled row. That needs a
+         superuser (or, on Postgres 15+, SET privilege on the parameter); without it the
+         script warns and each backfilled row also gets a change_log entry, so run
+         prepare before upgrading to 0003 in that case.
+swap     Run with the API stopped, right before deploying the code that writes bytes.
+         Replaces the hex column with the shadow column. Every statement is metadata-only,
+         so the exclusive locks are held for milliseconds regardless of table size.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app import create_app
+from app.extensions import db
+
+# table -> primary key column
+TABLES = {
+    "recipes": "recipe_id",
+    "recipescomments": "comment_id",
+    "recipe_ratings": "rating_id",
+    "reviews": "review_id",
+}
+
+SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION user_encrypted_bin_sync() RETURNS trigger AS $$
+BEGIN
+    NEW.user_encrypted_bin := decode(NEW.user_encrypted, 'hex');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _is_converted(conn, table: str) -> bool:
+    data_type = conn.execute(text(
+        "SELECT data_type FROM information_schema.columns "
+        "WHERE table_name = :table AND column_name = 'user_encrypted'"
+    ), {"table": table}).scalar()
+    return data_type == "bytea"
+
+
+@contextmanager
+def _triggers_disabled(conn):
+    """
+    Skip ordinary triggers (change_log's record_change) for the statements in the block.
+    Session-level on an autocommit connection, so it is reset before the connection goes back.
+    """
+    try:
+        conn.execute(text("SET session_replication_role = replica"))
+    except DBAPIError as e:
+        print(f"warning: could not disable triggers ({e.orig}); backfilled rows will be written to change_log")
+        yield
+        return
+    try:
+        yield
+    finally:
+        conn.execute(text("RESET session_replication_role"))
+
+
+def prepare(batch_size: int, pause: float):
+    with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(SYNC_FUNCTION))
+
+        for table, pk in TABLES.items():
+            if _is_converted(conn, table):
+                print(f"{table}: already bytea, skipping")
+                continue
+
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS user_encrypted_bin bytea"))
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_user_encrypted_bin_sync ON {table}"))
+            conn.execute(text(
+                f"CREATE TRIGGER {table}_user_encrypted_bin_sync "
+                f"BEFORE INSERT OR UPDATE OF user_encrypted ON {table} "
+                f"FOR EACH ROW EXECUTE FUNCTION user_encrypted_bin_sync()"
+            ))
+
+            # Rows inserted from here on are filled by the trigger, so backfill up to the current max id
+            max_id = conn.execute(text(f"SELECT coalesce(max({pk}), 0) FROM {table}")).scalar()
+            done = 0
+            with _triggers_disabled(conn):
+                for lo in range(0, max_id, batch_size):
+                    result = conn.execute(text(
+                        f"UPDATE {table} SET user_encrypted_bin = decode(user_encrypted, 'hex') "
+                        f"WHERE {pk} > :lo AND {pk} <= :hi AND user_encrypted_bin IS NULL"
+                    ), {"lo": lo, "hi": lo + batch_size})
+                    done += result.rowcount
+                    if pause:
+                        time.sleep(pause)
+            print(f"{table}: backfilled {done} rows")
+
+            # A validated CHECK lets the swap's SET NOT NULL skip its full-table scan
+            conn.execute(text(
+                f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_user_encrypted_bin_not_null"
+            ))
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_user_encrypted_bin_not_null "
+                f"CHECK (user_encrypted_bin IS NOT NULL) NOT VALID"
+            ))
+            conn.execute(text(f"ALTER TABLE {table} VALIDATE CONSTRAINT {table}_user_encrypted_bin_not_null"))
+
+        if not _is_converted(conn, "recipe_ratings"):
+            conn.execute(text(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS recipe_ratings_user_bin_uniq "
+                "ON recipe_ratings (recipe_id, user_encrypted_bin)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_recipe_ratings_user_bin "
+                "ON recipe_ratings (user_encrypted_bin)"
+            ))
+            print("recipe_ratings: built bytea indexes")
+
+
+def swap():
+    with db.engine.begin() as conn:
+        for table in TABLES:
+            if _is_converted(conn, table):
+                print(f"{table}: already bytea, skipping")
+                continue
+
+            conn.execute(text(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE"))
+            conn.execute(text(f"DROP TRIGGER {table}_user_encrypted_bin_sync ON {table}"))
+            # Also drops the old unique constraint and index on recipe_ratings
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN user_encrypted"))
+            conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN user_encrypted_bin TO user_encrypted"))
+            conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN user_encrypted SET NOT NULL"))
+            conn.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT {table}_user_encrypted_bin_not_null"))
+
+            if table == "recipe_ratings":
+                conn.execute(text(
+                    "ALTER TABLE recipe_ratings ADD CONSTRAINT unique_user_recipe_rating "
+                    "UNIQUE USING INDEX recipe_ratings_user_bin_uniq"
+                ))
+                conn.execute(text("ALTER INDEX idx_recipe_ratings_user_bin RENAME TO idx_recipe_ratings_user"))
+            print(f"{table}: swapped")
+
+        conn.execute(text("DROP FUNCTION IF EXISTS user_encrypted_bin_sync()"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("phase", choices=["prepare", "swap"])
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per committed UPDATE")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.phase == "prepare":
+            prepare(args.batch_size, args.pause)
+        else:
+            swap()
+
+
+if __name__ == "__main__":
+    main()
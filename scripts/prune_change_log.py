@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Delete change_log entries older than the sync retention window.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/prune_change_log.py [--days 30] [--batch-size 5000]
+
+Run it daily from cron or a systemd timer. The change log only grows otherwise: every write
+to a synced table adds an entry. Entries are deleted oldest first in small committed batches,
+after the horizon in change_log_horizon has been moved up to the newest of them. From then
+on /api/sync answers tokens older than the horizon with "resync": true, and those clients
+download the catalog again. --days defaults to CHANGE_LOG_RETENTION_DAYS.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.changes import prune_change_log
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=float, help="keep entries newer than this (default: CHANGE_LOG_RETENTION_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="entries per committed DELETE")
+    args = parser.parse_args()
+
+    app = create_app()
+    days = args.days if args.days is not None else app.config["CHANGE_LOG_RETENTION_DAYS"]
+    started = time.monotonic()
+    with app.app_context():
+        summary = prune_change_log(days, args.batch_size)
+
+    print(f"deleted {summary['deleted']} entries older than {days:g} days, "
+          f"horizon {summary['horizon'] or '(none)'}, {time.monotonic() - started:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Publish the public catalog snapshot (manifest plus changed shards), synchronously.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/publish_catalog.py
+
+Writes already trigger a debounced publish from the API workers; run this from cron or a
+systemd timer as well, e.g. every 15 minutes, so the snapshot catches up after failed or
+dropped publishes and picks up changes made outside the API. Safe to run at any time: it
+waits for any publish in progress and only uploads what changed. Uses the SNAPSHOT_*
+settings; SNAPSHOT_BACKEND=local SNAPSHOT_DIR=/tmp/catalog writes to a directory instead of S3.
+"""
+from __future__ import annotations
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.snapshots import snapshots
+
+def main() -> int:
+    app = create_app()
+    with app.app_context():
+        summary = snapshots.publish()
+
+    if summary["manifest_written"]:
+        print(f"published version {summary['version']}: {summary['written']} shard(s) written, "
+              f"{summary['unchanged']} unchanged, {summary['seconds']}s")
+    else:
+        print(f"version {summary['version']} is current ({summary['unchanged']} shard(s)), {summary['seconds']}s")
+    print(f"manifest: {snapshots.manifest_url() or '(snapshots are disabled for the API)'}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
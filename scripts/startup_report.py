@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Break down API worker startup cost.
+
+Usage (from the project root, with the venv active and .env present):
+    python scripts/startup_report.py [--top 20]
+
+Import cost is measured in a fresh interpreter with `python -X importtime -c "import run"`,
+with each module's self time grouped by top-level package. Init cost is measured by timing
+create_app() and app.startup.preload() in this process.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_costs() -> dict[str, int]:
+    """
+    Returns import time in microseconds per top-level package (sum of each module's self time).
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import run"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"Importing run.py failed:\n{proc.stderr}")
+
+    costs: dict[str, int] = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        # "import time:      self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        costs[package] += int(self_us)
+    return costs
+
+
+def init_costs() -> dict[str, float]:
+    """
+    Returns seconds spent in each startup step after imports.
+    """
+    sys.path.insert(0, ROOT)
+    steps: dict[str, float] = {}
+
+    start = time.perf_counter()
+    from app import create_app, startup
+    steps["import app"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app = create_app()
+    steps["create_app()"] = time.perf_counter() - start
+
+    startup.preload(app)
+    for name, seconds in startup.timings.items():
+        steps[f"preload: {name}"] = seconds
+    return steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=20, help="number of packages to show")
+    args = parser.parse_args()
+
+    costs = import_costs()
+    total = sum(costs.values())
+    print(f"Import cost of `import run`: {total / 1000:.1f} ms")
+    for package, us in sorted(costs.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+        print(f"  {package:<30} {us / 1000:8.1f} ms  {us / total:6.1%}")
+
+    print()
+    print("Init cost:")
+    for name, seconds in init_costs().items():
+        print(f"  {name:<30} {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
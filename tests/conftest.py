@@ -0,0 +1,167 @@
+# tests/conftest.py
+# The tests run against a scratch Postgres database on the server the PG* variables point at:
+# TEST_PGDATABASE, or PGDATABASE with a "_test" suffix. It is created when missing and rebuilt
+# from the models (db.create_all(), which installs the change_log triggers too) once per run,
+# and every table is emptied before each test. Tests that need it are skipped when the server
+# can't be reached. S3 is mocked in-process with moto.
+#
+#     pip install -r requirements-dev.txt
+#     python -m pytest -q
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# app.config reads the environment (and .env) once, on import
+load_dotenv()
+os.environ["PGDATABASE"] = os.environ.get("TEST_PGDATABASE") or os.environ.get("PGDATABASE", "sophs") + "_test"
+for _name, _value in {
+    "PGUSER": "postgres",
+    "PGPASSWORD": "postgres",
+    "PGPORT": "5432",
+    "AUTH0_DOMAIN": "tests.invalid",
+    "AUTH0_API_IDENTIFIER": "https://api.tests.invalid",
+    "ENCRYPTION_SECRET_KEY": "tests",
+}.items():
+    os.environ.setdefault(_name, _value)
+# Deterministic: background tasks run inline, nothing is buffered, published or limited
+# unless a test turns it on
+os.environ.update({
+    "BACKGROUND_EXECUTOR_MODE": "sync",
+    "WRITE_BEHIND_ENABLED": "0",
+    "SNAPSHOT_ENABLED": "0",
+    "RATE_LIMIT_ENABLED": "0",
+    "RATE_LIMIT_FILE": os.path.join(tempfile.mkdtemp(prefix="sophs-tests-"), "rate-limit"),
+})
+
+from authlib.jose import JsonWebKey, jwt
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from app import create_app, validator
+from app.extensions import db
+from app.models import Recipe, RecipeComment, RecipeRating, RestaurantType, RestTypeReviewRef, Review
+
+def _ensure_database(url):
+    # Connect to the server's maintenance database to create ours
+    engine = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        with engine.connect() as conn:
+            exists = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}).first()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+    finally:
+        engine.dispose()
+
+@pytest.fixture(scope="session")
+def _app():
+    app = create_app()
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    try:
+        _ensure_database(url)
+    except Exception as e:
+        pytest.skip(f"Postgres is not reachable at {url.render_as_string(hide_password=True)}: {e}")
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+@pytest.fixture
+def app(_app):
+    """
+    The app, with every table empty.
+    """
+    with _app.app_context():
+        tables = ", ".join(table.name for table in db.metadata.sorted_tables)
+        with db.engine.begin() as conn:
+            conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    yield _app
+    with _app.app_context():
+        db.session.remove()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture(scope="session")
+def _signing_key():
+    # Tokens are signed with a throwaway key that the validator is made to trust
+    key = JsonWebKey.generate_key("RSA", 2048, is_private=True, options={"kid": "tests"})
+    jwks = {"keys": [key.as_dict(is_private=False)]}
+    try:
+        # Newer Authlib verifies tokens with joserfc and wants its key types
+        from joserfc.jwk import KeySet
+        validator.public_key = KeySet.import_key_set(jwks)
+    except ImportError:
+        validator.public_key = JsonWebKey.import_key_set(jwks)
+    return key
+
+@pytest.fixture
+def auth_headers(_signing_key):
+    """
+    auth_headers(sub="tests|user", **claims) -> headers with a valid bearer token for sub.
+    """
+    def make(sub: str = "tests|user", **claims) -> dict:
+        now = int(time.time())
+        payload = {
+            "sub": sub,
+            "iss": validator.claims_options["iss"]["value"],
+            "aud": validator.claims_options["aud"]["value"],
+            "iat": now,
+            "exp": now + 300,
+            **claims,
+        }
+        token = jwt.encode({"alg": "RS256", "kid": "tests"}, payload, _signing_key).decode()
+        return {"Authorization": f"Bearer {token}"}
+    return make
+
+@pytest.fixture
+def seed(app):
+    """
+    A few rows in every table the read endpoints serve; returns their ids.
+    """
+    user = b"\x01" * 32
+    with app.app_context():
+        types = [RestaurantType(rest_type=name) for name in ("Italian", "Mexican", "Thai")]
+        recipes = [
+            Recipe(recipe_name=f"Recipe {i}", user_encrypted=user, prep_time_in_min=10 * i, meal="dinner",
+                   rec_img_url=f"https://cdn.tests.invalid/imgs/{i}.jpg", soph_submitted=i % 2 == 0)
+            for i in range(1, 6)
+        ]
+        reviews = [
+            Review(rest_name=name, o_rating=7.5, price=2, taste=8, experience=6.5, description="Good",
+                   city=city, state_code="MA", soph_submitted=False, user_encrypted=user)
+            for name, city in (("Joe's Pizza", "Boston"), ("Taco Town", "Cambridge"), ("joe's  pizza", "boston"))
+        ]
+        db.session.add_all(types + recipes + reviews)
+        db.session.flush()
+        db.session.add_all([
+            RecipeRating(recipe_id=recipes[0].recipe_id, user_encrypted=bytes([n]) * 32, rating=n)
+            for n in (3, 4, 5)
+        ])
+        db.session.add_all([
+            RecipeComment(recipe_id=recipes[0].recipe_id, user_encrypted=user, comment=f"Comment {n}")
+            for n in range(3)
+        ])
+        # The last review has no restaurant type
+        db.session.add_all([
+            RestTypeReviewRef(rest_type_id=types[0].rest_type_id, review_id=reviews[0].review_id),
+            RestTypeReviewRef(rest_type_id=types[1].rest_type_id, review_id=reviews[1].review_id),
+        ])
+        ids = {
+            "user": user,
+            "recipes": [r.recipe_id for r in recipes],
+            "reviews": [r.review_id for r in reviews],
+            "rest_types": {t.rest_type: t.rest_type_id for t in types},
+        }
+        db.session.commit()
+    return ids
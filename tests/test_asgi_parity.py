@@ -0,0 +1,172 @@
+# tests/test_asgi_parity.py
+# The async read path (app/asgi.py) must answer exactly like the Flask handlers: same status,
+# headers and body bytes, for every representation a client can ask for.
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+from werkzeug.datastructures import Headers
+
+from app.extensions import db
+from app.models import Recipe, Review
+
+ORIGIN = "https://sophsmenu.com"
+
+COMPARED_HEADERS = (
+    "content-type",
+    "content-encoding",
+    "vary",
+    "www-authenticate",
+    "access-control-allow-origin",
+    "access-control-allow-credentials",
+)
+
+READS = [
+    "/api/recipes",
+    "/api/recipes/",
+    "/api/recipes/{recipe}",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/{recipe}?include=",
+    "/api/recipes/{recipe}?include=rating",
+    "/api/recipes/{recipe}?include=ingredients,comments",
+    "/api/recipes/{recipe}?include=rating&include=comments",
+    "/api/recipes/{recipe}?include=bogus",
+    "/api/recipes/0",
+    "/api/recipes/2147483000",
+    "/api/reviews",
+    "/api/reviews/{review}",
+    "/api/reviews/{untyped_review}",
+    "/api/reviews/0",
+    "/api/reviews/2147483000",
+]
+
+FIELDS = [
+    "/api/recipes?fields=recipe_id,recipe_name",
+    "/api/recipes?fields=rec_img_srcset",
+    "/api/recipes?fields=",
+    "/api/recipes?fields=recipe_id,bogus",
+    "/api/recipes/{recipe}?fields=recipe_name&include=ingredients",
+    "/api/recipes/{recipe}?fields=user_encrypted,meal&include=",
+    "/api/reviews?fields=rest_name,o_rating",
+    "/api/reviews?fields=rest_type",
+    "/api/reviews/{review}?fields=review_id,user_encrypted,rest_type",
+    "/api/reviews?fields=description,nope",
+]
+
+MSGPACK_PATHS = ["/api/recipes", "/api/reviews?fields=rest_name", "/api/recipes/{recipe}", "/api/reviews/{review}", "/api/recipes/0"]
+MSGPACK_ACCEPTS = ["application/msgpack", "application/x-msgpack", "application/json;q=0.5, application/msgpack", "*/*"]
+
+ENCODING_PATHS = ["/api/recipes", "/api/reviews", "/api/recipes/{recipe}", "/api/recipes/0", "/api/recipes?fields=recipe_name"]
+ENCODINGS = ["gzip", "br", "zstd", "gzip;q=0.5, br;q=0", "identity", "*"]
+
+CASES = (
+    [(path, {}) for path in READS + FIELDS]
+    + [(path, {"Origin": origin}) for path in ("/api/recipes", "/api/reviews") for origin in (ORIGIN, "https://example.com")]
+    + [(path, {"Accept": accept}) for path in MSGPACK_PATHS for accept in MSGPACK_ACCEPTS]
+    + [("/api/reviews", {"Accept": "application/msgpack", "Accept-Encoding": "gzip"})]
+    + [(path, {"Accept-Encoding": encoding}) for path in ENCODING_PATHS for encoding in ENCODINGS]
+)
+
+# Tokens for /api/restaurant-types, made per test by the auth_headers fixture
+AUTH_CASES = ["none", "empty bearer", "basic", "expired", "wrong audience", "valid", "valid gzip"]
+
+@pytest.fixture(scope="module")
+def loop():
+    # One loop for the module: the async engine's pooled connections belong to the loop that opened them
+    from app import asgi
+
+    loop = asyncio.new_event_loop()
+    yield loop
+    if asgi._engine is not None:
+        loop.run_until_complete(asgi._engine.dispose())
+        asgi._engine = None
+    loop.close()
+
+@pytest.fixture
+def catalog(app, seed):
+    # Enough rows that the list bodies pass COMPRESSION_MIN_BYTES
+    with app.app_context():
+        db.session.add_all([
+            Recipe(recipe_name=f"Extra recipe {i}", user_encrypted=seed["user"], prep_time_in_min=i, meal="lunch",
+                   rec_img_url=f"https://cdn.tests.invalid/imgs/extra-{i}.jpg",
+                   rec_img_variants={"160": f"imgs/extra-{i}_w160.webp"} if i % 3 == 0 else None)
+            for i in range(30)
+        ])
+        # Non-ASCII text, for JSON escaping
+        db.session.add(Recipe(recipe_name="Crème brûlée 🍮", user_encrypted=seed["user"], prep_time_in_min=45, meal="dessert"))
+        db.session.add_all([
+            Review(rest_name=f"Place {i}", o_rating=i % 10 + 0.5, price=i % 4 + 1, taste=5, experience=5,
+                   description="Fine " * i, city="Somerville" if i else "Zürich", state_code="MA", user_encrypted=seed["user"])
+            for i in range(30)
+        ])
+        db.session.commit()
+    return {"recipe": seed["recipes"][0], "review": seed["reviews"][0], "untyped_review": seed["reviews"][2]}
+
+def _call_flask(app, path: str, headers: dict):
+    resp = app.test_client().get(path, headers=headers)
+    return resp.status_code, resp.headers, resp.get_data()
+
+async def _call_asgi(path: str, headers: dict):
+    from app.asgi import app as asgi_app
+
+    raw_path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": raw_path,
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi_app(scope, receive, send)
+    start, body = sent
+    return start["status"], Headers([(k.decode(), v.decode()) for k, v in start["headers"]]), body["body"]
+
+def _assert_same(app, loop, path: str, headers: dict):
+    f_status, f_headers, f_body = _call_flask(app, path, headers)
+    a_status, a_headers, a_body = loop.run_until_complete(_call_asgi(path, headers))
+
+    assert a_status == f_status
+    # 500 bodies embed driver error text
+    if f_status != 500:
+        assert a_body == f_body
+    for name in COMPARED_HEADERS:
+        # flask_cors echoes the configured origins when no Origin was sent; browsers never do that
+        if name.startswith("access-control") and "Origin" not in headers:
+            continue
+        assert a_headers.getlist(name) == f_headers.getlist(name), name
+    return f_status, f_headers
+
+@pytest.mark.parametrize("path,headers", CASES, ids=[f"{p} {sorted(h.items())}" for p, h in CASES])
+def test_same_response(app, loop, catalog, path, headers):
+    _assert_same(app, loop, path.format(**catalog), headers)
+
+@pytest.mark.parametrize("case", AUTH_CASES)
+def test_same_restaurant_types_response(app, loop, catalog, auth_headers, case):
+    headers = {
+        "none": {},
+        "empty bearer": {"Authorization": "Bearer"},
+        "basic": {"Authorization": "Basic abc"},
+        "expired": auth_headers(exp=int(time.time()) - 60),
+        "wrong audience": auth_headers(aud="someone-else"),
+        "valid": auth_headers(),
+        "valid gzip": {**auth_headers(), "Accept-Encoding": "gzip"},
+    }[case]
+    status, _ = _assert_same(app, loop, "/api/restaurant-types", headers)
+    assert status == (200 if case.startswith("valid") else 401)
+
+def test_cases_cover_each_representation(app, loop, catalog):
+    # Guard against a fixture too small to exercise compression or MessagePack
+    _, headers = _assert_same(app, loop, "/api/recipes", {"Accept-Encoding": "gzip"})
+    assert headers.get("Content-Encoding") == "gzip"
+    _, headers = _assert_same(app, loop, "/api/reviews", {"Accept": "application/msgpack"})
+    assert headers.get("Content-Type") == "application/msgpack"
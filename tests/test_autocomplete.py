@@ -0,0 +1,142 @@
+# tests/test_autocomplete.py
+# Review autocomplete (app/utils/autocomplete.py): the in-memory index and its Postgres fallback
+from __future__ import annotations
+
+from collections import Counter
+
+import pytest
+
+from app.extensions import db
+from app.models import Review
+from app.utils import autocomplete as autocomplete_module
+from app.utils.autocomplete import AutocompleteIndex, FieldIndex, _search_postgres, normalize
+
+SPELLINGS = {
+    "joe's pizza": Counter({"Joe's Pizza": 3, "joe's pizza": 1}),
+    "joey's": Counter({"Joey's": 4}),
+    "john's": Counter({"John's": 1}),
+    "jade": Counter({"Jade": 2}),
+    "pizza hut": Counter({"Pizza Hut": 5}),
+}
+
+# Reviews for the fallback parity test: spellings that group together, ties, non-ASCII
+REVIEWS = [
+    ("Joe's Pizza", "Boston"), ("joe's  pizza", "boston"), ("JOE'S PIZZA", "Boston "),
+    ("Joey's", "Brookline"), ("Joey's", "Brookline"), ("Joey's", "Brookline"),
+    ("John's", "Boston"), ("Jade", "Cambridge"), ("Jade", "Cambridge"),
+    ("Zur Linde", "Zürich"), ("zur linde", "ZÜRICH"), ("Straße 1", "Köln"),
+    ("100% Taco", "Somerville"), ("taco_time", "Somerville"), ("Taco Time", "Somerville"),
+]
+
+PREFIXES = ["", "j", "JO", "joe's  p", "joey", "b", "z", "zü", "ZÜR", "straß", "strass", "100%", "taco_", "taco ", "nothing"]
+
+def _values(results: list[dict]) -> list[tuple[str, int]]:
+    return [(r["value"], r["count"]) for r in results]
+
+def test_ranks_by_count_then_alphabetically():
+    index = FieldIndex(SPELLINGS)
+    # Ties (4 each) go alphabetically by key; the most common spelling stands for its group
+    assert _values(index.search("jo", 10)) == [("Joe's Pizza", 4), ("Joey's", 4), ("John's", 1)]
+    assert _values(index.search("j", 2)) == [("Joe's Pizza", 4), ("Joey's", 4)]
+    assert _values(index.search("", 1)) == [("Pizza Hut", 5)]
+    assert index.search("x", 10) == []
+
+def test_spelling_ties_go_to_the_first_in_sort_order():
+    index = FieldIndex({"jade": Counter({"jade": 2, "Jade": 2})})
+    assert _values(index.search("ja", 10)) == [("Jade", 4)]
+
+def test_cached_ranking_is_extended_for_a_larger_limit(monkeypatch):
+    monkeypatch.setattr(autocomplete_module, "RANK_CACHE_THRESHOLD", 2)
+    index = FieldIndex(SPELLINGS)
+    assert _values(index.search("j", 1)) == [("Joe's Pizza", 4)]
+    assert _values(index.search("j", 4)) == [("Joe's Pizza", 4), ("Joey's", 4), ("Jade", 2), ("John's", 1)]
+
+def test_overlay_folds_into_the_base_at_overlay_max(monkeypatch):
+    monkeypatch.setattr(autocomplete_module, "OVERLAY_MAX", 3)
+    spellings = {key: Counter(counter) for key, counter in SPELLINGS.items()}
+    base = FieldIndex(spellings)
+    index = base
+    added = [("jolly", "Jolly"), ("joe's pizza", "Joe's Pizza"), ("jam", "Jam")]
+    for key, value in added:
+        counter = spellings.setdefault(key, Counter())
+        counter[value] += 1
+        index = index.with_value(key, counter)
+
+    # At OVERLAY_MAX the changes still live in the overlay, over the shared base
+    assert index.keys is base.keys
+    assert index.added_keys == ["jam", "jolly"]
+    assert len(index.overrides) == 3
+    assert len(index) == len(SPELLINGS) + 2
+    assert _values(index.search("jo", 10)) == [("Joe's Pizza", 5), ("Joey's", 4), ("John's", 1), ("Jolly", 1)]
+
+    spellings["zed"] = Counter({"Zed": 1})
+    folded = index.with_value("zed", spellings["zed"])
+    # One more and the overlay is folded into a new base
+    assert folded.added_keys == [] and folded.overrides == {}
+    assert folded.keys == sorted(spellings)
+    for prefix in ("", "j", "jo", "z"):
+        assert folded.search(prefix, 10) == FieldIndex(spellings).search(prefix, 10)
+
+    # Readers holding an older index still see what it had
+    assert _values(base.search("jo", 10)) == [("Joe's Pizza", 4), ("Joey's", 4), ("John's", 1)]
+    assert index.search("z", 10) == []
+
+def test_normalize_matches_postgres_lower(app):
+    values = ["Joe's  Pizza", " ZÜRICH ", "Straße", "ÀÉÎ Õü", "Σίσυφος"]
+    with app.app_context():
+        keys = [
+            db.session.scalar(db.select(db.func.lower(db.func.btrim(db.func.regexp_replace(value, r"\s+", " ", "g")))))
+            for value in values
+        ]
+        db.session.rollback()
+    assert [normalize(value) for value in values] == keys
+
+@pytest.fixture
+def reviews(app):
+    with app.app_context():
+        db.session.add_all([
+            Review(rest_name=name, o_rating=7, price=2, taste=7, experience=7, description="",
+                   city=city, state_code="MA", user_encrypted=b"\x03" * 32)
+            for name, city in REVIEWS
+        ])
+        db.session.commit()
+
+@pytest.mark.parametrize("field", ["rest_name", "city"])
+def test_memory_and_postgres_agree(app, reviews, field):
+    index = AutocompleteIndex()
+    index.init_app(app)
+    with app.app_context():
+        index.load()
+        for prefix in PREFIXES:
+            for limit in (1, 3, 25):
+                assert index.search(field, prefix, limit) == _search_postgres(field, prefix, limit), (prefix, limit)
+        db.session.rollback()
+
+def test_cold_index_answers_from_postgres_and_loads(app, reviews):
+    index = AutocompleteIndex()
+    index.init_app(app)
+    with app.app_context():
+        # The background executor runs inline in the tests, so the load is done on return
+        assert _values(index.search("rest_name", "joe", 10)) == [("JOE'S PIZZA", 3), ("Joey's", 3)]
+        assert index.stats()["served_from"] == {"memory": 0, "postgres": 1}
+        assert index.stats()["loaded"]
+        assert _values(index.search("rest_name", "joe", 10)) == [("JOE'S PIZZA", 3), ("Joey's", 3)]
+        assert index.stats()["served_from"] == {"memory": 1, "postgres": 1}
+
+def test_created_review_is_suggested_by_this_worker(app, client, seed, auth_headers, monkeypatch):
+    index = AutocompleteIndex()
+    index.init_app(app)
+    monkeypatch.setattr("app.routes.reviews.autocomplete", index)
+    with app.app_context():
+        index.load()
+    assert _values(index.search("city", "somer", 10)) == []
+
+    resp = client.put("/api/reviews/", headers=auth_headers(), json={
+        "rest_name": "Joe's Pizza", "rest_type": "Italian", "o_rating": 8, "price": 2, "taste": 8,
+        "experience": 8, "description": "Again", "city": "Somerville", "state_code": "MA",
+    })
+    assert resp.status_code == 200, resp.get_json()
+    assert _values(index.search("city", "somer", 10)) == [("Somerville", 1)]
+    with app.app_context():
+        assert index.search("rest_name", "joe", 10) == _search_postgres("rest_name", "joe", 10)
+        db.session.rollback()
@@ -0,0 +1,125 @@
+# tests/test_background.py
+# The background executor (app/utils/background.py). The suite runs with
+# BACKGROUND_EXECUTOR_MODE=sync; the queue tests make thread-mode executors of their own.
+from __future__ import annotations
+
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app.extensions import db
+from app.utils.background import BackgroundExecutor, background
+
+@pytest.fixture
+def executor(app, monkeypatch):
+    """
+    executor(BACKGROUND_WORKERS=1, ...) -> a thread-mode BackgroundExecutor with that config.
+    """
+    made = []
+
+    def make(**config) -> BackgroundExecutor:
+        monkeypatch.setitem(app.config, "BACKGROUND_EXECUTOR_MODE", "thread")
+        for name, value in config.items():
+            monkeypatch.setitem(app.config, name, value)
+        ex = BackgroundExecutor()
+        ex.init_app(app)
+        made.append(ex)
+        return ex
+
+    yield make
+    for ex in made:
+        # Only the app's own executor should see db.session commits
+        event.remove(db.session, "after_commit", ex._on_commit)
+        event.remove(db.session, "after_soft_rollback", ex._on_rollback)
+        ex.drain(5)
+
+def _blocker(ex: BackgroundExecutor):
+    """
+    Occupy ex's only worker until the returned event is set.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(10)
+
+    assert ex.submit("block", block)
+    assert started.wait(5)
+    return release
+
+def test_after_commit_runs_once_the_session_commits(app):
+    ran = []
+    with app.app_context():
+        background.after_commit("note", ran.append, "committed")
+        assert ran == []
+        db.session.commit()
+        assert ran == ["committed"]
+        # Once
+        db.session.commit()
+        assert ran == ["committed"]
+
+def test_after_commit_is_dropped_on_rollback(app):
+    ran = []
+    with app.app_context():
+        background.after_commit("note", ran.append, "rolled back")
+        db.session.rollback()
+        db.session.commit()
+    assert ran == []
+
+def test_failed_task_is_counted_not_raised(app):
+    def fail():
+        raise RuntimeError("boom")
+
+    before = background.stats()["tasks"].get("fail", {}).get("failed", 0)
+    assert background.submit("fail", fail) is True
+    assert background.stats()["tasks"]["fail"]["failed"] == before + 1
+
+def test_tasks_run_in_an_app_context(app):
+    seen = []
+    with app.app_context():
+        background.after_commit("context", lambda: seen.append(db.session.connection().scalar(db.text("SELECT 1"))))
+        db.session.commit()
+    assert seen == [1]
+
+def test_submit_drops_when_the_queue_is_full(executor):
+    ex = executor(BACKGROUND_WORKERS=1, BACKGROUND_QUEUE_SIZE=1, BACKGROUND_SUBMIT_TIMEOUT=0.01)
+    release = _blocker(ex)
+    ran = []
+    try:
+        assert ex.submit("queued", ran.append, 1) is True
+        # The worker is busy and the queue holds one task: this one waits submit_timeout, then is dropped
+        assert ex.submit("dropped", ran.append, 2) is False
+        assert ex.stats()["rejected"] == 1
+        assert ex.stats()["queue_depth"] == 1
+    finally:
+        release.set()
+    assert ex.drain(5) is True
+    assert ran == [1]
+
+def test_drain_finishes_queued_tasks_then_refuses_more(executor):
+    ex = executor(BACKGROUND_WORKERS=2, BACKGROUND_QUEUE_SIZE=10)
+    ran = []
+    lock = threading.Lock()
+
+    def record(n):
+        with lock:
+            ran.append(n)
+
+    for n in range(5):
+        assert ex.submit("record", record, n)
+    assert ex.drain(5) is True
+    assert sorted(ran) == [0, 1, 2, 3, 4]
+
+    assert ex.submit("late", record, 5) is False
+    assert ex.stats()["rejected"] == 1
+    assert 5 not in ran
+
+def test_drain_gives_up_after_its_timeout(executor):
+    ex = executor(BACKGROUND_WORKERS=1, BACKGROUND_QUEUE_SIZE=5)
+    release = _blocker(ex)
+    try:
+        assert ex.drain(0.1) is False
+    finally:
+        release.set()
+    assert ex.drain(5) is True
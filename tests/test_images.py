@@ -0,0 +1,196 @@
+# tests/test_images.py
+# Recipe image size limits and thumbnails (app/utils/images.py), with S3 mocked by moto
+from __future__ import annotations
+
+import io
+
+import pytest
+import requests
+from moto import mock_aws
+from PIL import Image
+
+from app.extensions import db
+from app.models import Recipe
+from app.utils import s3
+from app.utils.images import ImageTooLarge, generate_thumbnails, render_thumbnails, variant_key
+
+BUCKET = "tests-bucket"
+CDN = "https://cdn.tests.invalid"
+
+@pytest.fixture
+def bucket(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "tests")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "tests")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.setenv("S3_BUCKET_NAME", BUCKET)
+    monkeypatch.setenv("S3_UPLOAD_PREFIX", "imgs")
+    monkeypatch.setenv("CLOUDFRONT_IMG_BASE_URL", CDN)
+    monkeypatch.delenv("S3_ENDPOINT_URL", raising=False)
+    with mock_aws():
+        # The process-wide client has to be created inside the mock
+        monkeypatch.setattr(s3, "_s3", None)
+        client = s3.s3_client()
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+    s3._s3 = None
+
+def _image(width: int, height: int, fmt: str = "PNG") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 80, 40)).save(buf, fmt)
+    return buf.getvalue()
+
+def _size(data: bytes) -> tuple[int, int]:
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == "WEBP"
+        return img.size
+
+def _recipe(app, img_url: str) -> int:
+    with app.app_context():
+        recipe = Recipe(recipe_name="Soup", user_encrypted=b"\x03" * 32, prep_time_in_min=5, meal="lunch", rec_img_url=img_url)
+        db.session.add(recipe)
+        db.session.commit()
+        return recipe.recipe_id
+
+def _variants(app, recipe_id: int):
+    with app.app_context():
+        return db.session.get(Recipe, recipe_id).rec_img_variants
+
+######################
+# render_thumbnails
+######################
+
+def test_thumbnails_keep_aspect_ratio(app):
+    with app.app_context():
+        out = render_thumbnails(_image(1000, 500))
+    assert {width: _size(data) for width, data in out.items()} == {160: (160, 80), 320: (320, 160), 640: (640, 320)}
+
+def test_never_upscales(app):
+    with app.app_context():
+        # Between two widths: only the ones below the original
+        assert sorted(render_thumbnails(_image(400, 300))) == [160, 320]
+        # Smaller than every width: one variant at its own size
+        out = render_thumbnails(_image(100, 50))
+    assert {width: _size(data) for width, data in out.items()} == {100: (100, 50)}
+
+def test_widths_come_from_config(app, monkeypatch):
+    monkeypatch.setitem(app.config, "THUMBNAIL_WIDTHS", (200,))
+    with app.app_context():
+        assert sorted(render_thumbnails(_image(1000, 500))) == [200]
+
+def test_pixel_cap_is_checked_before_decoding(app, monkeypatch):
+    monkeypatch.setitem(app.config, "THUMBNAIL_MAX_PIXELS", 100_000)
+    with app.app_context():
+        with pytest.raises(ImageTooLarge):
+            render_thumbnails(_image(1000, 500))
+        # At the cap is fine
+        assert render_thumbnails(_image(400, 250))
+
+######################
+# generate_thumbnails
+######################
+
+def test_generate_uploads_and_stores_variants(app, bucket):
+    key = "imgs/user/photo.jpg"
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=_image(500, 500, "JPEG"))
+    recipe_id = _recipe(app, f"{CDN}/{key}")
+
+    with app.app_context():
+        variants = generate_thumbnails(recipe_id, f"{CDN}/{key}")
+
+    assert variants == {"160": variant_key(key, 160), "320": variant_key(key, 320)}
+    assert _variants(app, recipe_id) == variants
+    for width, thumb_key in variants.items():
+        obj = bucket.get_object(Bucket=BUCKET, Key=thumb_key)
+        assert obj["ContentType"] == "image/webp"
+        assert _size(obj["Body"].read())[0] == int(width)
+
+def test_generate_skips_recipe_that_moved_to_another_image(app, bucket):
+    key = "imgs/user/old.png"
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=_image(300, 300))
+    recipe_id = _recipe(app, f"{CDN}/imgs/user/new.png")
+
+    # The task for the old image finishes after the recipe was pointed at the new one
+    with app.app_context():
+        assert generate_thumbnails(recipe_id, f"{CDN}/{key}") is None
+    assert _variants(app, recipe_id) is None
+
+def test_generate_ignores_images_outside_the_bucket(app, bucket):
+    recipe_id = _recipe(app, "https://elsewhere.invalid/photo.png")
+    with app.app_context():
+        assert generate_thumbnails(recipe_id, "https://elsewhere.invalid/photo.png") is None
+
+def test_generate_refuses_oversized_object_without_reading_it(app, bucket, monkeypatch):
+    key = "imgs/user/huge.png"
+    data = _image(300, 300)
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=data)
+    recipe_id = _recipe(app, f"{CDN}/{key}")
+    monkeypatch.setitem(app.config, "RECIPE_IMAGE_MAX_BYTES", len(data) - 1)
+
+    with app.app_context():
+        with pytest.raises(ImageTooLarge):
+            generate_thumbnails(recipe_id, f"{CDN}/{key}")
+    assert _variants(app, recipe_id) is None
+    assert bucket.list_objects_v2(Bucket=BUCKET, Prefix="imgs/user/huge_")["KeyCount"] == 0
+
+def test_generate_refuses_decompression_bombs(app, bucket, monkeypatch):
+    key = "imgs/user/bomb.png"
+    # A few KB of PNG, 36 megapixels once decoded
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=_image(6000, 6000))
+    recipe_id = _recipe(app, f"{CDN}/{key}")
+    monkeypatch.setitem(app.config, "THUMBNAIL_MAX_PIXELS", 1_000_000)
+
+    with app.app_context():
+        with pytest.raises(ImageTooLarge):
+            generate_thumbnails(recipe_id, f"{CDN}/{key}")
+    assert _variants(app, recipe_id) is None
+
+######################
+# Upload endpoints
+######################
+
+def _create(client, auth_headers, img_url: str):
+    return client.put("/api/recipes", headers=auth_headers(), json={
+        "recipe_name": "Toast",
+        "ingredients": ["bread"],
+        "instructions": ["toast it"],
+        "prep_time": 3,
+        "meal": "breakfast",
+        "img_public_url": img_url,
+    })
+
+def test_presign_returns_a_put_url(client, auth_headers, bucket):
+    resp = client.post("/api/recipes/presign-image-upload", headers=auth_headers(), json={"contentType": "image/png"})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert set(body) == {"uploadUrl", "key", "publicUrl"}
+    assert body["key"].startswith("imgs/") and body["key"].endswith(".png")
+    assert body["publicUrl"] == f"{CDN}/{body['key']}"
+
+    # Clients upload with a plain PUT of the file to uploadUrl
+    data = _image(20, 20)
+    put = requests.put(body["uploadUrl"], data=data, headers={"Content-Type": "image/png"})
+    assert put.status_code == 200
+    obj = bucket.get_object(Bucket=BUCKET, Key=body["key"])
+    assert obj["Body"].read() == data
+    assert obj["ContentType"] == "image/png"
+
+def test_create_recipe_refuses_oversized_upload(app, client, auth_headers, bucket, monkeypatch):
+    key = "imgs/user/big.png"
+    data = _image(300, 300)
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=data)
+    monkeypatch.setitem(app.config, "RECIPE_IMAGE_MAX_BYTES", len(data) - 1)
+
+    resp = _create(client, auth_headers, f"{CDN}/{key}")
+    assert resp.status_code == 400
+    assert "limit" in resp.get_json()["message"]
+    with app.app_context():
+        assert db.session.query(Recipe).count() == 0
+
+def test_create_recipe_makes_thumbnails(app, client, auth_headers, bucket):
+    key = "imgs/user/toast.png"
+    bucket.put_object(Bucket=BUCKET, Key=key, Body=_image(200, 100))
+
+    resp = _create(client, auth_headers, f"{CDN}/{key}")
+    assert resp.status_code == 200
+    # BACKGROUND_EXECUTOR_MODE=sync: the thumbnail task ran on commit
+    assert _variants(app, resp.get_json()["recipe_id"]) == {"160": variant_key(key, 160)}
@@ -0,0 +1,108 @@
+# tests/test_rate_limit.py
+# Token buckets shared through the memory-mapped file (app/utils/rate_limit.py)
+from __future__ import annotations
+
+import multiprocessing
+
+import pytest
+
+from app.utils import auth, rate_limit
+from app.utils.rate_limit import RateLimiter
+
+@pytest.fixture
+def make_limiter(app, tmp_path, monkeypatch):
+    """
+    make_limiter({"route": {"user": "2/60"}}) -> a RateLimiter on its own file, which
+    @rate_limited uses for the rest of the test.
+    """
+    def make(limits: dict) -> RateLimiter:
+        monkeypatch.setitem(app.config, "RATE_LIMIT_ENABLED", True)
+        monkeypatch.setitem(app.config, "RATE_LIMIT_FILE", str(tmp_path / "rate-limit"))
+        monkeypatch.setitem(app.config, "RATE_LIMIT_SLOTS", 1024)
+        monkeypatch.setitem(app.config, "RATE_LIMITS", limits)
+        limiter = RateLimiter()
+        limiter.init_app(app)
+        monkeypatch.setattr(rate_limit, "limiter", limiter)
+        return limiter
+    return make
+
+def _comment(client, recipe_id: int, headers: dict):
+    return client.put(f"/api/recipes/{recipe_id}", json={"comment": "Again"}, headers=headers)
+
+def test_over_the_limit_gets_429_with_retry_after(client, seed, auth_headers, make_limiter):
+    make_limiter({"add_comment": {"user": "2/60"}})
+    recipe_id = seed["recipes"][0]
+    headers = auth_headers()
+
+    assert [_comment(client, recipe_id, headers).status_code for _ in range(2)] == [200, 200]
+    resp = _comment(client, recipe_id, headers)
+    assert resp.status_code == 429
+    assert resp.get_json() == {"message": "Too many requests, please try again later"}
+    # One token every 30 seconds
+    assert 1 <= int(resp.headers["Retry-After"]) <= 30
+
+    # Buckets are per user
+    assert _comment(client, recipe_id, auth_headers(sub="tests|other")).status_code == 200
+
+def test_limits_only_their_route(client, seed, auth_headers, make_limiter):
+    make_limiter({"add_comment": {"user": "1/60"}})
+    headers = auth_headers()
+    assert _comment(client, seed["recipes"][0], headers).status_code == 200
+    assert _comment(client, seed["recipes"][0], headers).status_code == 429
+    resp = client.put(f"/api/recipes/{seed['recipes'][0]}/rating", json={"rating": 4}, headers=headers)
+    assert resp.status_code == 200
+
+def test_disabled_limiter_allows_everything(client, seed, auth_headers, make_limiter, monkeypatch):
+    limiter = make_limiter({"add_comment": {"user": "1/60"}})
+    monkeypatch.setattr(limiter, "enabled", False)
+    headers = auth_headers()
+    assert [_comment(client, seed["recipes"][0], headers).status_code for _ in range(3)] == [200, 200, 200]
+
+def test_user_is_hashed_once_per_request(client, seed, auth_headers, make_limiter, monkeypatch):
+    make_limiter({"add_comment": {"user": "5/60"}})
+    calls = []
+    encrypt_user = auth.encrypt_user
+    monkeypatch.setattr(auth, "encrypt_user", lambda sub: calls.append(sub) or encrypt_user(sub))
+
+    assert _comment(client, seed["recipes"][0], auth_headers()).status_code == 200
+    # Once for the limiter's key, reused by the view
+    assert calls == ["tests|user"]
+
+def test_refused_request_refunds_the_buckets_that_allowed_it(make_limiter):
+    limiter = make_limiter({"route": {"user": "2/86400", "ip": "1/86400"}})
+
+    assert limiter.check("route", {"user": "a", "ip": "10.0.0.1"}) == 0
+    # The IP is out of tokens; the user's token taken for this request is put back ...
+    assert limiter.check("route", {"user": "a", "ip": "10.0.0.1"}) > 0
+    # ... so the user still has one left for a request from another address
+    assert limiter.check("route", {"user": "a", "ip": "10.0.0.2"}) == 0
+    assert limiter.check("route", {"user": "a", "ip": "10.0.0.3"}) > 0
+
+def test_missing_key_skips_its_bucket(make_limiter):
+    limiter = make_limiter({"route": {"user": "1/86400", "ip": "1/86400"}})
+    # Unauthenticated: only the IP bucket applies
+    assert limiter.check("route", {"user": None, "ip": "10.0.0.1"}) == 0
+    assert limiter.check("route", {"user": "a", "ip": "10.0.0.2"}) == 0
+
+def _take_tokens(limiter: RateLimiter, attempts: int, allowed):
+    taken = sum(limiter.check("route", {"user": "shared"}) == 0 for _ in range(attempts))
+    with allowed.get_lock():
+        allowed.value += taken
+
+def test_buckets_are_shared_across_processes(make_limiter):
+    limiter = make_limiter({"route": {"user": "50/86400"}})
+    # Open the table in this process first: each worker has to map the file itself after forking
+    assert limiter.check("route", {"user": "shared"}) == 0
+
+    ctx = multiprocessing.get_context("fork")
+    allowed = ctx.Value("i", 0)
+    workers = [ctx.Process(target=_take_tokens, args=(limiter, 25, allowed)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    # 100 attempts between them, and exactly the 49 tokens that were left
+    assert allowed.value == 49
+    assert limiter.check("route", {"user": "shared"}) > 0
@@ -0,0 +1,66 @@
+# tests/test_statement_cache.py
+# Compiled-cache hit/miss counting (app/utils/statement_cache.py)
+from __future__ import annotations
+
+import gc
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import event, literal_column, select
+from sqlalchemy.engine import Engine
+
+from app.extensions import db
+from app.utils.statement_cache import StatementCacheStats
+
+@pytest.fixture
+def counter(app):
+    stats = StatementCacheStats()
+    stats.init_app(app)
+    yield stats
+    event.remove(Engine, "after_cursor_execute", stats._after_cursor_execute)
+
+def _new_statement():
+    # A label no earlier statement used, so the first execution compiles it
+    return select(literal_column("1").label(f"c_{uuid.uuid4().hex}"))
+
+def _run(app, stmt, times: int):
+    with app.app_context():
+        with db.engine.connect() as conn:
+            for _ in range(times):
+                if isinstance(stmt, str):
+                    conn.exec_driver_sql(stmt)
+                else:
+                    conn.execute(stmt)
+
+def test_counts_hits_and_misses(app, counter):
+    _run(app, _new_statement(), 3)
+    _run(app, "SELECT 1", 2)
+
+    stats = counter.stats()
+    # Driver SQL isn't compiled, so isn't counted
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+def test_reset_starts_counting_again(app, counter):
+    stmt = _new_statement()
+    _run(app, stmt, 2)
+    counter.reset()
+    assert counter.stats()["hits"] == 0
+    assert counter.stats()["hit_rate"] is None
+
+    _run(app, stmt, 2)
+    assert (counter.stats()["misses"], counter.stats()["hits"]) == (0, 2)
+
+def test_counts_of_exited_threads_are_kept(app, counter):
+    stmt = _new_statement()
+    _run(app, stmt, 1)
+    threads = [threading.Thread(target=_run, args=(app, stmt, 5)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+
+    stats = counter.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 20)
@@ -0,0 +1,155 @@
+# tests/test_sync.py
+# The /api/sync feed over the change_log triggers (app/utils/changes.py)
+from __future__ import annotations
+
+from sqlalchemy import delete, insert, text, update
+
+from app.extensions import db
+from app.models import ChangeLog, Recipe, RecipeComment
+from app.utils.changes import parse_token, prune_change_log
+
+USER = b"\x02" * 32
+
+def _sync(client, since=None, **params):
+    if since is not None:
+        params["since"] = since
+    resp = client.get("/api/sync", query_string=params)
+    assert resp.status_code == 200, resp.get_data(as_text=True)
+    return resp.get_json()["body"]
+
+def _add_recipe(conn, name: str) -> int:
+    return conn.execute(
+        insert(Recipe).values(recipe_name=name, user_encrypted=USER, prep_time_in_min=5, meal="lunch").returning(Recipe.recipe_id)
+    ).scalar_one()
+
+def _ids(changes, entity="recipe"):
+    return [c["id"] for c in changes if c["entity"] == entity]
+
+def test_start_token_then_changes_in_commit_order(app, client):
+    start = _sync(client)["next"]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            first = _add_recipe(conn, "First")
+        with db.engine.begin() as conn:
+            second = _add_recipe(conn, "Second")
+
+    body = _sync(client, start)
+    assert _ids(body["changes"]) == [first, second]
+    assert body["changes"][0]["data"]["recipe_name"] == "First"
+    assert body["has_more"] is False
+    assert _sync(client, body["next"])["changes"] == []
+
+def test_late_commit_is_not_skipped(app, client):
+    start = _sync(client)["next"]
+    with app.app_context():
+        slow = db.engine.connect()
+        try:
+            # The older transaction writes first but commits last
+            slow_tx = slow.begin()
+            slow_id = _add_recipe(slow, "Slow")
+            with db.engine.begin() as conn:
+                fast_id = _add_recipe(conn, "Fast")
+
+            # The fast entry is held back while an older transaction is still running ...
+            held = _sync(client, start)
+            assert held["changes"] == []
+            assert held["next"] == start
+
+            slow_tx.commit()
+        finally:
+            slow.close()
+
+    # ... so nobody gets a token past the slow one's entry before it is visible
+    body = _sync(client, held["next"])
+    assert _ids(body["changes"]) == [slow_id, fast_id]
+
+def test_pages_follow_the_token(app, client):
+    start = _sync(client)["next"]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            ids = [_add_recipe(conn, f"Recipe {i}") for i in range(5)]
+
+    seen, token = [], start
+    while True:
+        body = _sync(client, token, limit=2)
+        seen += _ids(body["changes"])
+        token = body["next"]
+        if not body["has_more"]:
+            break
+    assert seen == ids
+
+def test_deleted_rows_become_tombstones(app, client):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            kept = _add_recipe(conn, "Kept")
+            gone = _add_recipe(conn, "Gone")
+            comment_id = conn.execute(
+                insert(RecipeComment).values(recipe_id=kept, user_encrypted=USER, comment="Nice").returning(RecipeComment.comment_id)
+            ).scalar_one()
+    start = _sync(client)["next"]
+
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(delete(RecipeComment).where(RecipeComment.comment_id == comment_id))
+            conn.execute(update(Recipe).where(Recipe.recipe_id == gone).values(recipe_name="Renamed"))
+            conn.execute(delete(Recipe).where(Recipe.recipe_id == gone))
+            # Created and deleted between two syncs: the client never saw it, but gets a tombstone
+            brief = _add_recipe(conn, "Brief")
+            conn.execute(delete(Recipe).where(Recipe.recipe_id == brief))
+
+    changes = _sync(client, start)["changes"]
+    assert {"entity": "comment", "id": comment_id, "deleted": True} in changes
+    assert {"entity": "recipe", "id": gone, "deleted": True} in changes
+    assert {"entity": "recipe", "id": brief, "deleted": True} in changes
+    # One change per entity, its latest
+    assert len(changes) == 3
+
+def test_invalid_token(client, app):
+    resp = client.get("/api/sync?since=nope")
+    assert resp.status_code == 400
+
+def _age_entries(app, days: float):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text("UPDATE change_log SET changed_at = now() - make_interval(days => :days)"), {"days": days})
+
+def test_pruned_token_gets_resync(app, client):
+    start = _sync(client)["next"]
+    with app.app_context():
+        with db.engine.begin() as conn:
+            old = [_add_recipe(conn, f"Old {i}") for i in range(3)]
+    _age_entries(app, 40)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            new = _add_recipe(conn, "New")
+        summary = prune_change_log(30, batch_size=2)
+        remaining = db.session.query(ChangeLog.entity_id).all()
+        db.session.commit()
+    assert summary["deleted"] == len(old)
+    assert [r.entity_id for r in remaining] == [new]
+
+    # Entries after the start token are gone, so its client has to download the catalog again
+    body = _sync(client, start)
+    assert body == {"changes": [], "next": body["next"], "has_more": False, "resync": True}
+    # ... and can sync on from the token that came with the resync
+    assert _ids(_sync(client, body["next"])["changes"]) == []
+
+    # The horizon itself is still a good token: nothing after it was pruned
+    body = _sync(client, summary["horizon"])
+    assert "resync" not in body
+    assert _ids(body["changes"]) == [new]
+
+def test_head_token_survives_pruning_everything(app, client):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            _add_recipe(conn, "Only")
+    head = _sync(client)["next"]
+    _age_entries(app, 40)
+    with app.app_context():
+        summary = prune_change_log(30)
+    assert summary["horizon"] == head
+
+    # With an empty change_log the head token falls back to the horizon instead of 0.0
+    assert _sync(client)["next"] == head
+    assert parse_token(head) > (0, 0)
+    assert "resync" not in _sync(client, head)
@@ -0,0 +1,171 @@
+# tests/test_write_buffer.py
+# Write-behind for ratings and comments (app/utils/write_buffer.py)
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import RecipeComment, RecipeRating
+from app.routes import recipes as recipe_routes
+from app.utils.auth import encrypt_user
+from app.utils.write_buffer import WriteBuffer, WriteNotConfirmed
+
+USER = b"\x07" * 32
+OTHER = b"\x08" * 32
+
+@pytest.fixture
+def make_buffer(app, monkeypatch):
+    """
+    make_buffer(WRITE_BEHIND_FLUSH_MS=..., ...) -> an enabled WriteBuffer with that config,
+    which the rating and comment views use for the rest of the test.
+    """
+    made = []
+
+    def make(**config) -> WriteBuffer:
+        monkeypatch.setitem(app.config, "WRITE_BEHIND_ENABLED", True)
+        for name, value in config.items():
+            monkeypatch.setitem(app.config, name, value)
+        buffer = WriteBuffer()
+        buffer.init_app(app)
+        monkeypatch.setattr(recipe_routes, "write_buffer", buffer)
+        made.append(buffer)
+        return buffer
+
+    yield make
+    for buffer in made:
+        buffer.close(5)
+
+@pytest.fixture
+def statements(app):
+    """
+    Every SQL statement run while the test does.
+    """
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+def _ratings(app, recipe_id: int) -> dict[bytes, int]:
+    with app.app_context():
+        rows = db.session.execute(
+            select(RecipeRating.user_encrypted, RecipeRating.rating).where(RecipeRating.recipe_id == recipe_id)
+        ).all()
+        db.session.rollback()
+    return {bytes(r.user_encrypted): r.rating for r in rows}
+
+def _comments(app, recipe_id: int) -> list[str]:
+    with app.app_context():
+        rows = db.session.scalars(
+            select(RecipeComment.comment).where(RecipeComment.recipe_id == recipe_id).order_by(RecipeComment.comment_id)
+        ).all()
+        db.session.rollback()
+    return rows
+
+def test_repeated_votes_coalesce_into_one_upsert(app, seed, make_buffer, statements):
+    buffer = make_buffer(WRITE_BEHIND_FLUSH_MS=200)
+    recipe_id = seed["recipes"][1]
+
+    votes = [buffer.submit_rating(recipe_id, USER, rating) for rating in (1, 2, 5)]
+    votes.append(buffer.submit_rating(recipe_id, OTHER, 3))
+    for pending in votes:
+        pending.result(5)
+
+    # The last vote per user wins
+    assert _ratings(app, recipe_id) == {USER: 5, OTHER: 3}
+    upserts = [s for s in statements if s.startswith("INSERT INTO recipe_ratings")]
+    assert len(upserts) == 1
+    assert "ON CONFLICT" in upserts[0]
+    stats = buffer.stats()
+    assert (stats["flushes"], stats["items"], stats["coalesced"]) == (1, 2, 2)
+
+def test_ack_comes_after_the_commit(app, seed, make_buffer):
+    buffer = make_buffer(WRITE_BEHIND_FLUSH_MS=200)
+    recipe_id = seed["recipes"][1]
+
+    pending = buffer.submit_comment(recipe_id, USER, "Buffered")
+    # Still buffered: not acked, not in the table
+    with pytest.raises(WriteNotConfirmed):
+        pending.result(0)
+    assert _comments(app, recipe_id) == []
+
+    pending.result(5)
+    # Visible to any other connection as soon as it is acked
+    assert _comments(app, recipe_id) == ["Buffered"]
+
+def test_failed_batch_is_retried_row_by_row(app, seed, make_buffer):
+    buffer = make_buffer(WRITE_BEHIND_FLUSH_MS=200)
+    recipe_id = seed["recipes"][1]
+
+    good = [buffer.submit_comment(recipe_id, USER, f"Good {n}") for n in range(2)]
+    # No such recipe: the batch insert fails on the foreign key
+    bad = buffer.submit_comment(2147483000, USER, "Orphan")
+    rating = buffer.submit_rating(recipe_id, USER, 4)
+
+    with pytest.raises(IntegrityError):
+        bad.result(5)
+    for pending in good + [rating]:
+        pending.result(5)
+
+    assert _comments(app, recipe_id) == ["Good 0", "Good 1"]
+    assert _ratings(app, recipe_id) == {USER: 4}
+    stats = buffer.stats()
+    assert (stats["flushes"], stats["fallbacks"], stats["failed_items"]) == (1, 1, 1)
+
+def test_views_answer_once_the_write_is_committed(app, client, seed, auth_headers, make_buffer):
+    make_buffer(WRITE_BEHIND_FLUSH_MS=10)
+    recipe_id = seed["recipes"][1]
+    headers = auth_headers()
+
+    resp = client.put(f"/api/recipes/{recipe_id}/rating", json={"rating": 2}, headers=headers)
+    assert resp.status_code == 200
+    assert _ratings(app, recipe_id) == {encrypt_user("tests|user"): 2}
+
+    resp = client.put(f"/api/recipes/{recipe_id}", json={"comment": " Buffered "}, headers=headers)
+    assert resp.status_code == 200
+    assert _comments(app, recipe_id) == ["Buffered"]
+
+def test_unconfirmed_write_answers_503(app, client, seed, auth_headers, make_buffer):
+    buffer = make_buffer(WRITE_BEHIND_FLUSH_MS=1000, WRITE_BEHIND_ACK_TIMEOUT=0.05)
+    recipe_id = seed["recipes"][1]
+
+    resp = client.put(f"/api/recipes/{recipe_id}/rating", json={"rating": 2}, headers=auth_headers())
+    assert resp.status_code == 503
+    assert "could not be confirmed" in resp.get_json()["message"]
+    resp = client.put(f"/api/recipes/{recipe_id}", json={"comment": "Late"}, headers=auth_headers())
+    assert resp.status_code == 503
+
+    # The writes weren't lost, just late
+    buffer.close(5)
+    assert _ratings(app, recipe_id) == {encrypt_user("tests|user"): 2}
+    assert _comments(app, recipe_id) == ["Late"]
+
+def test_close_flushes_then_views_write_directly(app, client, seed, auth_headers, make_buffer):
+    buffer = make_buffer(WRITE_BEHIND_FLUSH_MS=60000)
+    recipe_id = seed["recipes"][1]
+
+    pending = buffer.submit_comment(recipe_id, USER, "Before close")
+    buffer.close(5)
+    pending.result(0)
+    assert not buffer.accepting
+    with pytest.raises(WriteNotConfirmed):
+        buffer.submit_comment(recipe_id, USER, "Refused").result(0)
+
+    flushes = buffer.stats()["flushes"]
+    resp = client.put(f"/api/recipes/{recipe_id}", json={"comment": "After close"}, headers=auth_headers())
+    assert resp.status_code == 200
+    resp = client.put(f"/api/recipes/{recipe_id}/rating", json={"rating": 5}, headers=auth_headers())
+    assert resp.status_code == 200
+
+    assert _comments(app, recipe_id) == ["Before close", "After close"]
+    assert _ratings(app, recipe_id) == {encrypt_user("tests|user"): 5}
+    # Written by the views themselves, not the buffer
+    assert buffer.stats()["flushes"] == flushes
+    assert buffer.stats()["buffered"] == 0